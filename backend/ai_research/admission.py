@@ -0,0 +1,169 @@
+"""
+アドミッション制御・負荷制限
+エンドポイント種別ごとに同時に受け付けるリクエスト数（実行中 + 順番待ち）の上限を設け、
+超えた分は Retry-After 付きで即座に断る（検出器の後ろに無制限に溜めない）
+
+- 上限に達したリクエストは 503、負荷が高い間のプレビューフレームは 429 で先に断る
+- 検出の順番待ち時間（指数移動平均）が閾値を超え続けたら縮退モードに入り、
+  hybrid / cascade を opencv に切り替える（待ち時間が回復したら自動で戻す）
+"""
+
+import math
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True)
+class Rejection:
+    """受付を断る理由"""
+    status_code: int  # 429: プレビューの間引き / 503: 受付上限
+    retry_after: int  # 再送までの秒数
+    detail: str
+
+
+class _EndpointGate:
+    """1種別分の受付状態"""
+
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max(1, max_in_flight)
+        self.in_flight = 0
+        self.latency_ms = 0.0  # 受付から応答までの時間(ms)の指数移動平均
+        self.queue_wait_ms = 0.0  # 順番待ち時間(ms)の指数移動平均
+        self.counters = {"admitted": 0, "rejected": 0, "shed_previews": 0}
+
+
+class AdmissionController:
+    """エンドポイント種別ごとの受付上限と縮退モードを管理するクラス（スレッドセーフ）"""
+
+    def __init__(
+        self,
+        max_in_flight: Dict[str, int],
+        preview_shed_ratio: float = 0.5,
+        degrade_queue_wait_ms: float = 500.0,
+        recover_queue_wait_ms: float = 100.0,
+        smoothing: float = 0.2
+    ):
+        """
+        初期化
+
+        Args:
+            max_in_flight: 種別ごとの同時受付数の上限（実行中 + 順番待ち）
+            preview_shed_ratio: 検出の受付数が上限のこの割合以上になったらプレビューを断る
+            degrade_queue_wait_ms: 検出の順番待ち時間の平均がこれを超えたら縮退モードに入る
+            recover_queue_wait_ms: 縮退中に順番待ち時間の平均がこれを下回ったら通常に戻す
+            smoothing: 指数移動平均の係数（大きいほど直近の値を重視）
+        """
+        self._gates = {
+            kind: _EndpointGate(limit)
+            for kind, limit in max_in_flight.items()
+        }
+        self.preview_shed_ratio = preview_shed_ratio
+        self.degrade_queue_wait_ms = degrade_queue_wait_ms
+        self.recover_queue_wait_ms = recover_queue_wait_ms
+        self.smoothing = smoothing
+        self._degraded = False
+        self._counters = {"degrade_events": 0, "recover_events": 0, "downgraded_requests": 0}
+        self._lock = threading.Lock()
+
+    def try_admit(self, kind: str, is_preview: bool = False) -> Optional[Rejection]:
+        """
+        リクエストの受付を試みる（受け付けた場合は処理後に release を呼ぶ）
+
+        Args:
+            kind: エンドポイント種別 ("detect" / "evaluate" / "preprocess")
+            is_preview: プレビューフレームか（受付数が上限の preview_shed_ratio に達したら最終撮影より先に断る）
+
+        Returns:
+            断る場合は Rejection、受け付けた場合は None
+        """
+        with self._lock:
+            gate = self._gates[kind]
+            if is_preview and gate.in_flight >= gate.max_in_flight * self.preview_shed_ratio:
+                gate.counters["shed_previews"] += 1
+                return Rejection(429, self._retry_after(gate), "高負荷のためプレビューを一時停止しています")
+            if gate.in_flight >= gate.max_in_flight:
+                gate.counters["rejected"] += 1
+                return Rejection(503, self._retry_after(gate), "混雑しています。しばらくしてから再送してください")
+            gate.in_flight += 1
+            gate.counters["admitted"] += 1
+            return None
+
+    def release(self, kind: str, latency_ms: float) -> None:
+        """
+        受け付けたリクエストの処理完了
+
+        Args:
+            kind: エンドポイント種別
+            latency_ms: 受付から応答までの時間(ms)（Retry-After の見積もりに使用）
+        """
+        with self._lock:
+            gate = self._gates[kind]
+            gate.in_flight -= 1
+            gate.latency_ms += self.smoothing * (latency_ms - gate.latency_ms)
+
+    def record_queue_wait(self, kind: str, queue_wait_ms: float) -> None:
+        """
+        実行スレッドでの順番待ち時間を記録し、検出の縮退モードを切り替える
+        （入る閾値と戻る閾値を分けて、境界付近で切り替えが振動しないようにする）
+
+        Args:
+            kind: 処理の種別
+            queue_wait_ms: スレッドプールで実行が始まるまでの待ち時間(ms)
+        """
+        with self._lock:
+            gate = self._gates.get(kind)
+            if gate is None:
+                return
+            gate.queue_wait_ms += self.smoothing * (queue_wait_ms - gate.queue_wait_ms)
+
+            if kind != "detect":
+                return
+            if not self._degraded and gate.queue_wait_ms > self.degrade_queue_wait_ms:
+                self._degraded = True
+                self._counters["degrade_events"] += 1
+            elif self._degraded and gate.queue_wait_ms < self.recover_queue_wait_ms:
+                self._degraded = False
+                self._counters["recover_events"] += 1
+
+    def degrade_mode(self, mode: str) -> str:
+        """
+        縮退中は hybrid / cascade を opencv に切り替えた検出モードを返す
+
+        Args:
+            mode: リクエストの検出モード
+        """
+        with self._lock:
+            if not self._degraded or mode not in ("hybrid", "cascade"):
+                return mode
+            self._counters["downgraded_requests"] += 1
+            return "opencv"
+
+    @property
+    def degraded(self) -> bool:
+        """縮退モード中か"""
+        with self._lock:
+            return self._degraded
+
+    def _retry_after(self, gate: _EndpointGate) -> int:
+        """再送までの秒数（上限まで埋まった列が捌ける時間を直近の応答時間で見積もる、最低1秒）"""
+        return max(1, math.ceil(gate.latency_ms / 1000))
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """種別ごとの受付数・拒否数・平均待ち時間と縮退状態"""
+        with self._lock:
+            return {
+                "degraded": self._degraded,
+                **self._counters,
+                "endpoints": {
+                    kind: {
+                        "in_flight": gate.in_flight,
+                        "max_in_flight": gate.max_in_flight,
+                        "queue_wait_ms": round(gate.queue_wait_ms, 2),
+                        "latency_ms": round(gate.latency_ms, 2),
+                        **gate.counters
+                    }
+                    for kind, gate in self._gates.items()
+                }
+            }
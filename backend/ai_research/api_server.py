@@ -6,25 +6,35 @@
 - ハイブリッドモード（フロントエンド用）
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
+from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable, TypeVar, NamedTuple
+from dataclasses import replace
 from pathlib import Path
-import shutil
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import copy
 import logging
 import os
 from dotenv import load_dotenv
 import base64
-import io
-from PIL import Image
+import threading
+import time
+import numpy as np
 
-from detector import BentoBoxDetector, DetectionMode
+from detector import BentoBoxDetector, DetectionConfig, DetectionMode, DetectionResult, MetadataLevel
 from evaluator import ModelEvaluator
 from plot_results import ResultVisualizer
 from experiment_metadata import ExperimentMetadata
 from image_preprocessor import ImagePreprocessor
+from log_sink import create_log_sink
+from worker_pool import DetectorWorkerPool
+from result_cache import DetectionResultCache
+from preview_tracker import PreviewTrack, PreviewTracker
+from batch_scheduler import YoloBatchScheduler
+from admission import AdmissionController
 
 # 環境変数読み込み
 load_dotenv()
@@ -40,21 +50,32 @@ app = FastAPI(
     version="3.0.0"
 )
 
-# CORS設定
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # グローバル変数
 detector: Optional[BentoBoxDetector] = None
 evaluator: Optional[ModelEvaluator] = None
 visualizer: Optional[ResultVisualizer] = None
 metadata_manager: Optional[ExperimentMetadata] = None
 preprocessor: Optional[ImagePreprocessor] = None
+worker_pool: Optional[DetectorWorkerPool] = None
+result_cache: Optional[DetectionResultCache] = None
+preview_tracker: Optional[PreviewTracker] = None
+batch_scheduler: Optional[YoloBatchScheduler] = None
+admission: Optional[AdmissionController] = None
+
+# CPU負荷の高い同期処理を実行するスレッドプール（エンドポイント種別ごと、実行中の件数）
+executors: Dict[str, ThreadPoolExecutor] = {}
+executor_active: Dict[str, int] = {}
+# 応答を待たずに実行する後処理（研究用データの保存など）、完了まで参照を保持する
+background_jobs: set = set()
+
+T = TypeVar("T")
+
+# キャリブレーションの世代（無効化のたびに進め、古いキャッシュを参照しないようにする）
+# "*" は全セッション共通の世代。ワーカープロセス内のキャッシュにも同じキーで反映される
+calibration_generation: Dict[str, int] = {"*": 0}
+
+# ウォームアップ状態（/ready で公開）
+warmup_state: Dict[str, Any] = {"status": "pending", "report": {}}
 
 # 環境変数から設定取得
 HOST = os.getenv("HOST", "0.0.0.0")
@@ -64,6 +85,34 @@ YOLO_CONFIG_PATH = os.getenv("YOLO_CONFIG_PATH")
 CONFIDENCE_THRESHOLD = float(os.getenv("CONFIDENCE_THRESHOLD", "0.5"))
 NMS_THRESHOLD = float(os.getenv("NMS_THRESHOLD", "0.4"))
 PX_TO_MM_RATIO = float(os.getenv("PX_TO_MM_RATIO", "1.0"))
+YOLO_BACKEND = os.getenv("YOLO_BACKEND", "pytorch")
+ONNX_EXPORT_IMGSZ = int(os.getenv("ONNX_EXPORT_IMGSZ", "640"))
+# リクエスト種別ごとのYOLO推論サイズ（未設定はモデルの既定サイズ、リクエストで上書き可）
+YOLO_IMGSZ_PREVIEW = int(os.getenv("YOLO_IMGSZ_PREVIEW") or 0) or None
+YOLO_IMGSZ_FINAL = int(os.getenv("YOLO_IMGSZ_FINAL") or 0) or None
+# プレビューフレームの検出モード（既定はOpenCV）
+PREVIEW_MODE = os.getenv("PREVIEW_MODE", "opencv")
+PYRAMID_TOLERANCE_PX = float(os.getenv("PYRAMID_TOLERANCE_PX", "16.0"))
+PYRAMID_MIN_SIDE = int(os.getenv("PYRAMID_MIN_SIDE", "480"))
+METADATA_LEVEL = os.getenv("METADATA_LEVEL", "full")
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", "0.6"))
+TRACKING_MARGIN = float(os.getenv("TRACKING_MARGIN", "0.25"))
+
+# 参照カードによる自動キャリブレーション（結果は撮影セッション・画像サイズごとにキャッシュ）
+ENABLE_AUTO_CALIBRATION = os.getenv("ENABLE_AUTO_CALIBRATION", "false").lower() == "true"
+CARD_TYPE = os.getenv("CARD_TYPE", "credit_card")
+CARD_CALIBRATION_TTL = float(os.getenv("CARD_CALIBRATION_TTL", "300"))
+CARD_CALIBRATION_MAX_USES = int(os.getenv("CARD_CALIBRATION_MAX_USES", "0"))
+
+# 検出ログ（非同期追記）
+LOG_SINK = os.getenv("LOG_SINK", "jsonl")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "1000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "50"))
+LOG_FLUSH_INTERVAL = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0"))
+LOG_OVERFLOW_POLICY = os.getenv("LOG_OVERFLOW_POLICY", "drop")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
 
 OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", "./outputs"))
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads"))
@@ -71,27 +120,84 @@ MODELS_DIR = Path(os.getenv("MODELS_DIR", "./models"))
 TEST_IMAGES_DIR = Path(os.getenv("TEST_IMAGES_DIR", "./test_images"))
 TEST_IMAGES_CROPPED_DIR = Path(os.getenv("TEST_IMAGES_CROPPED_DIR", "./test_images_cropped"))
 EVALUATION_DEFAULT_FOLDER = os.getenv("EVALUATION_DEFAULT_FOLDER", "./test_images_cropped")
+EVALUATION_BATCH_SIZE = int(os.getenv("EVALUATION_BATCH_SIZE", "8"))
+
+# 起動時ウォームアップ
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_RESOLUTIONS = [
+    tuple(int(v) for v in size.lower().split("x"))
+    for size in os.getenv("WARMUP_RESOLUTIONS", "640x480,1280x960,1920x1440").split(",")
+    if size.strip()
+]
+WARMUP_RUNS = int(os.getenv("WARMUP_RUNS", "3"))
 
+# 検出ワーカープロセス数（0: APIプロセス内で検出）
+DETECTOR_WORKERS = int(os.getenv("DETECTOR_WORKERS", "0"))
+# ワーカーの応答を待つ時間上限(秒、超えたワーカーは再起動)
+DETECTOR_WORKER_TIMEOUT = float(os.getenv("DETECTOR_WORKER_TIMEOUT", "60"))
 
-def calculate_dynamic_px_to_mm_ratio(bento_width_mm: float, bento_height_mm: float, image_path: str) -> float:
+# YOLOマイクロバッチ（同時に届いたリクエストのYOLO推論を1回にまとめる、ワーカープール無効時のみ）
+# 既定では最終撮影のみ有効（プレビューは待ち時間を加えない）
+YOLO_BATCH_FINAL = os.getenv("YOLO_BATCH_FINAL", "true").lower() == "true"
+YOLO_BATCH_PREVIEW = os.getenv("YOLO_BATCH_PREVIEW", "false").lower() == "true"
+YOLO_BATCH_MAX_SIZE = int(os.getenv("YOLO_BATCH_MAX_SIZE", "8"))
+YOLO_BATCH_MAX_WAIT_MS = float(os.getenv("YOLO_BATCH_MAX_WAIT_MS", "5"))
+
+# 同期処理（検出・評価・前処理）を実行するスレッド数（エンドポイント種別ごと）
+# 検出: 0はワーカープール有効時はワーカー数、マイクロバッチ有効時はYOLO_BATCH_MAX_SIZE、それ以外は1
+# （YOLOのPyTorch推論はスレッド間で直列化される）
+DETECT_EXECUTOR_THREADS = int(os.getenv("DETECT_EXECUTOR_THREADS", "0"))
+EVALUATE_EXECUTOR_THREADS = int(os.getenv("EVALUATE_EXECUTOR_THREADS", "1"))
+PREPROCESS_EXECUTOR_THREADS = int(os.getenv("PREPROCESS_EXECUTOR_THREADS", "1"))
+
+# アドミッション制御（エンドポイント種別ごとの同時受付数の上限、超えた分は Retry-After 付きで断る）
+# 検出: 0は検出スレッド数の4倍
+DETECT_MAX_IN_FLIGHT = int(os.getenv("DETECT_MAX_IN_FLIGHT", "0"))
+EVALUATE_MAX_IN_FLIGHT = int(os.getenv("EVALUATE_MAX_IN_FLIGHT", "2"))
+PREPROCESS_MAX_IN_FLIGHT = int(os.getenv("PREPROCESS_MAX_IN_FLIGHT", "4"))
+# 検出の受付数が上限のこの割合に達したらプレビューフレームを429で断る（最終撮影を優先）
+PREVIEW_SHED_RATIO = float(os.getenv("PREVIEW_SHED_RATIO", "0.5"))
+# 検出の順番待ち時間の平均がDEGRADE_QUEUE_WAIT_MSを超えたら hybrid / cascade を opencv に切り替え、
+# RECOVER_QUEUE_WAIT_MSを下回ったら戻す
+DEGRADE_QUEUE_WAIT_MS = float(os.getenv("DEGRADE_QUEUE_WAIT_MS", "500"))
+RECOVER_QUEUE_WAIT_MS = float(os.getenv("RECOVER_QUEUE_WAIT_MS", "100"))
+# 受け付けるリクエストボディの上限（Content-Length で判定、本文を受信する前に413で断る）
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "20"))
+# アドミッション制御の対象（POSTのパス → エンドポイント種別）
+ADMISSION_ROUTES: Dict[str, str] = {
+    "/detect": "detect",
+    "/detect/dynamic-size": "detect",
+    "/detect/base64": "detect",
+    "/detect/raw": "detect",
+    "/evaluate": "evaluate",
+    "/preprocess/batch": "preprocess",
+    "/preprocess/single": "preprocess"
+}
+
+# 検出結果キャッシュ（同一画像の再送時に検出を再実行しない、0で無効）
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "256"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "600"))
+
+# プレビューのトラッキング（セッションごとに前フレームのbbox周辺のみ探索）
+TRACKING_SESSION_TTL = float(os.getenv("TRACKING_SESSION_TTL", "2.0"))
+TRACKING_MAX_SESSIONS = int(os.getenv("TRACKING_MAX_SESSIONS", "1000"))
+
+
+def calculate_dynamic_px_to_mm_ratio(bento_width_mm: float, bento_height_mm: float, image: np.ndarray) -> float:
     """
     実際の弁当サイズと画像サイズから変換係数を動的計算
     
     Args:
         bento_width_mm: 実際の弁当幅（mm）
         bento_height_mm: 実際の弁当奥行き（mm）
-        image_path: 画像ファイルパス
+        image: デコード済み画像
         
     Returns:
         float: 計算されたpx_to_mm_ratio
     """
     try:
-        import cv2
-        
-        # 画像読み込み
-        image = cv2.imread(image_path)
-        if image is None:
-            logger.warning(f"画像読み込み失敗: {image_path}")
+        if image is None or image.size == 0:
+            logger.warning("画像が空のため変換係数を計算できません")
             return 0.1862  # デフォルト値
             
         height_px, width_px = image.shape[:2]
@@ -111,27 +217,59 @@ def calculate_dynamic_px_to_mm_ratio(bento_width_mm: float, bento_height_mm: flo
         return 0.1862  # エラー時はデフォルト値
 
 
-def update_detector_with_dynamic_ratio(bento_width_mm: Optional[float], bento_height_mm: Optional[float], image_path: str):
+def calibration_session_key(session_id: Optional[str]) -> Optional[str]:
     """
-    検出器のpx_to_mm_ratioを動的に更新
+    キャリブレーションキャッシュのセッションキー（世代付き）
     
     Args:
-        bento_width_mm: 弁当幅（mm）
-        bento_height_mm: 弁当奥行き（mm）  
-        image_path: 画像パス
+        session_id: 端末・撮影セッションの識別子（省略時はキャッシュしない）
+    """
+    if not session_id:
+        return None
+    return f"{session_id}#{calibration_generation['*']}.{calibration_generation.get(session_id, 0)}"
+
+
+def build_detection_config(
+    confidence_threshold: float,
+    bento_width_mm: Optional[float],
+    bento_height_mm: Optional[float],
+    image: np.ndarray,
+    metadata: Optional[MetadataLevel] = None,
+    yolo_imgsz: Optional[int] = None,
+    session_id: Optional[str] = None
+) -> DetectionConfig:
     """
-    global detector
+    リクエストごとの検出設定を作成（共有の検出器は変更しない）
     
-    if detector and bento_width_mm and bento_height_mm:
-        # 動的に変換係数を計算して更新
-        new_ratio = calculate_dynamic_px_to_mm_ratio(bento_width_mm, bento_height_mm, image_path)
-        detector.px_to_mm_ratio = new_ratio
-        logger.info(f"検出器の変換係数を更新: {new_ratio:.4f} mm/px")
-    else:
-        # デフォルト値を使用
-        if detector:
-            detector.px_to_mm_ratio = 0.1862
-            logger.info("デフォルト変換係数を使用: 0.1862 mm/px")
+    Args:
+        confidence_threshold: 信頼度閾値
+        bento_width_mm: 弁当幅（mm）※指定時は画像サイズから変換係数を計算
+        bento_height_mm: 弁当奥行き（mm）
+        image: デコード済み画像
+        metadata: 明るさ・角度の計算レベル（省略時は検出器の既定値）
+        yolo_imgsz: YOLO推論サイズ（省略時はモデルの既定サイズ）
+        session_id: 端末・撮影セッションの識別子（自動キャリブレーション結果の再利用単位）
+        
+    Returns:
+        DetectionConfig: このリクエスト用の検出設定
+    """
+    changes: Dict[str, Any] = {"confidence_threshold": confidence_threshold}
+    
+    if bento_width_mm and bento_height_mm:
+        # 動的に変換係数を計算
+        changes["px_to_mm_ratio"] = calculate_dynamic_px_to_mm_ratio(bento_width_mm, bento_height_mm, image)
+    
+    if metadata is not None:
+        changes["metadata_level"] = metadata
+    
+    if yolo_imgsz:
+        changes["yolo_imgsz"] = yolo_imgsz
+    
+    calibration_session = calibration_session_key(session_id)
+    if calibration_session:
+        changes["calibration_session"] = calibration_session
+    
+    return detector.default_config.replace(**changes)
 
 
 # リクエスト/レスポンスモデル
@@ -161,14 +299,21 @@ class DetectionResponse(BaseModel):
     success: bool
     brightness: float
     angle: float
+    tilt_deg: Optional[float] = None  # metadata=fast の場合のみ（検出領域の傾き）
     message: str = ""
     # 追加: フレーム内の位置情報（リアルタイムガイド用）
     position_info: Optional[Dict[str, Any]] = None
 
 
-class Base64DetectionRequest(BaseModel):
-    """Base64画像検出リクエスト"""
-    image_base64: str
+class UploadDetection(NamedTuple):
+    """アップロード画像の検出結果（デコード済みフレームは後続の処理で再利用する）"""
+    result: DetectionResult
+    image_size: Tuple[int, int]  # (高さ, 幅)
+    image: Optional[np.ndarray]  # 検出結果キャッシュにヒットした場合はデコードしないためNone
+
+
+class FrameDetectionOptions(BaseModel):
+    """撮影フレーム検出のオプション（/detect/base64 のJSON・/detect/raw のクエリパラメータ共通）"""
     filename: str = "image.jpg"
     mode: DetectionMode = "hybrid"
     confidence_threshold: float = 0.5
@@ -177,6 +322,17 @@ class Base64DetectionRequest(BaseModel):
     # 追加: 動的サイズ対応
     bento_width_mm: Optional[float] = None
     bento_height_mm: Optional[float] = None
+    # 追加: 明るさ・角度の計算レベル（省略時: プレビューは"none"、それ以外はMETADATA_LEVEL）
+    metadata: Optional[MetadataLevel] = None
+    # 追加: 端末・撮影セッションID（プレビューのトラッキング・自動キャリブレーション結果の再利用）
+    session_id: Optional[str] = None
+    # 追加: YOLO推論サイズ（省略時: プレビューはYOLO_IMGSZ_PREVIEW、それ以外はYOLO_IMGSZ_FINAL）
+    yolo_imgsz: Optional[int] = None
+
+
+class Base64DetectionRequest(FrameDetectionOptions):
+    """Base64画像検出リクエスト"""
+    image_base64: str
 
 
 class EvaluationRequest(BaseModel):
@@ -253,7 +409,8 @@ def calculate_position_info(bbox: Dict[str, float], image_width: int, image_heig
 @app.on_event("startup")
 async def startup_event():
     """サーバー起動時の初期化"""
-    global detector, evaluator, visualizer, metadata_manager, preprocessor
+    global detector, evaluator, visualizer, metadata_manager, preprocessor, worker_pool, result_cache, preview_tracker
+    global batch_scheduler, admission
     
     # ディレクトリ作成
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -263,16 +420,96 @@ async def startup_event():
     TEST_IMAGES_CROPPED_DIR.mkdir(parents=True, exist_ok=True)
     
     # モジュール初期化
-    detector = BentoBoxDetector(
+    log_sink = create_log_sink(
+        LOG_SINK,
+        OUTPUT_DIR / "logs",
+        max_bytes=LOG_MAX_BYTES,
+        backup_count=LOG_BACKUP_COUNT,
+        queue_size=LOG_QUEUE_SIZE,
+        batch_size=LOG_BATCH_SIZE,
+        flush_interval=LOG_FLUSH_INTERVAL,
+        overflow_policy=LOG_OVERFLOW_POLICY,
+        sample_rate=LOG_SAMPLE_RATE
+    )
+    
+    detector_kwargs = dict(
         yolo_weights_path=YOLO_WEIGHTS_PATH,
         yolo_config_path=YOLO_CONFIG_PATH,
         confidence_threshold=CONFIDENCE_THRESHOLD,
         nms_threshold=NMS_THRESHOLD,
         output_dir=str(OUTPUT_DIR),
-        px_to_mm_ratio=PX_TO_MM_RATIO
+        px_to_mm_ratio=PX_TO_MM_RATIO,
+        enable_auto_calibration=ENABLE_AUTO_CALIBRATION,
+        card_type=CARD_TYPE,
+        card_calibration_ttl=CARD_CALIBRATION_TTL,
+        card_calibration_max_uses=CARD_CALIBRATION_MAX_USES,
+        pyramid_tolerance_px=PYRAMID_TOLERANCE_PX,
+        pyramid_min_side=PYRAMID_MIN_SIDE,
+        metadata_level=METADATA_LEVEL,
+        cascade_threshold=CASCADE_THRESHOLD,
+        tracking_margin=TRACKING_MARGIN,
+        yolo_backend=YOLO_BACKEND,
+        onnx_export_imgsz=ONNX_EXPORT_IMGSZ,
+        calibration_dir=str(TEST_IMAGES_CROPPED_DIR)
     )
+    # ワーカープール有効時の検出はすべてワーカーが行うため、APIプロセスではYOLOモデルを読み込まない
+    # （キャリブレーション・ログ・設定の既定値に使う。YOLOを使う評価は初回にモデルを読み込む）
+    detector = BentoBoxDetector(**detector_kwargs, log_sink=log_sink, load_yolo=DETECTOR_WORKERS <= 0)
+    
+    # ワーカープール（各プロセスがモデルを保持し、フレームは共有メモリで受け渡す）
+    if DETECTOR_WORKERS > 0:
+        worker_pool = DetectorWorkerPool(
+            DETECTOR_WORKERS,
+            detector_kwargs,
+            warmup_resolutions=WARMUP_RESOLUTIONS if WARMUP_ENABLED else None,
+            warmup_runs=WARMUP_RUNS,
+            request_timeout=DETECTOR_WORKER_TIMEOUT
+        )
+        logger.info(f"検出ワーカープール: {DETECTOR_WORKERS}プロセス")
+    
+    # YOLOマイクロバッチ（ワーカープール有効時は各ワーカーが個別に推論するため使わない）
+    # バッチ次元が固定のONNXモデルはまとめても1枚ずつの推論になり、待ち時間が増えるだけなので使わない
+    if (YOLO_BATCH_FINAL or YOLO_BATCH_PREVIEW) and detector.yolo_model is not None and worker_pool is None:
+        if detector.supports_batch_inference:
+            batch_scheduler = YoloBatchScheduler(detector, YOLO_BATCH_MAX_SIZE, YOLO_BATCH_MAX_WAIT_MS)
+            logger.info(f"YOLOマイクロバッチ: 最大{YOLO_BATCH_MAX_SIZE}枚 / 最大待ち{YOLO_BATCH_MAX_WAIT_MS}ms")
+        else:
+            logger.info("YOLOマイクロバッチ: 無効（ONNXモデルのバッチ次元が固定）")
     
-    evaluator = ModelEvaluator(detector, output_dir=str(OUTPUT_DIR))
+    # 同期処理用のスレッドプール（イベントループでは入出力のみを行う）
+    # マイクロバッチはバッチ内の枚数分のリクエストが同時に待てるだけのスレッドが必要
+    default_detect_threads = DETECTOR_WORKERS if worker_pool else (YOLO_BATCH_MAX_SIZE if batch_scheduler else 1)
+    executor_threads = {
+        "detect": DETECT_EXECUTOR_THREADS or default_detect_threads,
+        "evaluate": EVALUATE_EXECUTOR_THREADS,
+        "preprocess": PREPROCESS_EXECUTOR_THREADS
+    }
+    for kind, threads in executor_threads.items():
+        executors[kind] = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix=f"{kind}-executor")
+        executor_active[kind] = 0
+    logger.info(f"同期処理スレッド数: {executor_threads}")
+    
+    # アドミッション制御（スレッドプールの前で受付数を制限し、無制限に順番待ちさせない）
+    admission = AdmissionController(
+        {
+            "detect": DETECT_MAX_IN_FLIGHT or executors["detect"]._max_workers * 4,
+            "evaluate": EVALUATE_MAX_IN_FLIGHT,
+            "preprocess": PREPROCESS_MAX_IN_FLIGHT
+        },
+        preview_shed_ratio=PREVIEW_SHED_RATIO,
+        degrade_queue_wait_ms=DEGRADE_QUEUE_WAIT_MS,
+        recover_queue_wait_ms=RECOVER_QUEUE_WAIT_MS
+    )
+    
+    if RESULT_CACHE_SIZE > 0:
+        result_cache = DetectionResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL)
+    preview_tracker = PreviewTracker(TRACKING_MAX_SESSIONS, TRACKING_SESSION_TTL)
+    
+    evaluator = ModelEvaluator(
+        detector,
+        output_dir=str(OUTPUT_DIR),
+        batch_size=EVALUATION_BATCH_SIZE
+    )
     visualizer = ResultVisualizer(output_dir=str(OUTPUT_DIR / "visualizations"))
     metadata_manager = ExperimentMetadata(output_dir=str(OUTPUT_DIR))
     preprocessor = ImagePreprocessor()
@@ -280,9 +517,299 @@ async def startup_event():
     logger.info("FastAPIサーバー起動完了（YOLOv8 + 3モード対応）")
     logger.info(f"Host: {HOST}, Port: {PORT}")
     logger.info(f"YOLO Weights: {YOLO_WEIGHTS_PATH}")
-    logger.info(f"モデル: YOLOv8 (Ultralytics)")
-    logger.info(f"画像前処理: 有効")
+    logger.info(f"YOLO推論バックエンド: {YOLO_BACKEND + '（ワーカーで読み込み）' if worker_pool else detector.yolo_backend}")
+    logger.info("モデル: YOLOv8 (Ultralytics)")
+    logger.info("画像前処理: 有効")
     logger.info(f"研究用評価フォルダ: {EVALUATION_DEFAULT_FOLDER}")
+    logger.info(f"検出ログ: {LOG_SINK} ({OUTPUT_DIR / 'logs'})")
+    
+    # ウォームアップはバックグラウンドで実行（完了まで /ready は503）
+    if WARMUP_ENABLED or worker_pool is not None:
+        warmup_state.clear()
+        warmup_state.update(status="pending", report={})
+        threading.Thread(target=run_warmup, name="detector-warmup", daemon=True).start()
+    else:
+        warmup_state["status"] = "ready"
+
+
+def run_warmup() -> None:
+    """全モードのウォームアップを実行し、完了したら ready にする（バックグラウンドスレッド）"""
+    warmup_state["status"] = "running"
+    warmup_state["started_at"] = time.time()
+    try:
+        if worker_pool is not None:
+            # 各ワーカーはモデル読み込み後に自身でウォームアップする（APIプロセスでは検出しない）
+            worker_pool.wait_ready()
+        elif WARMUP_ENABLED:
+            warmup_state["report"] = detector.warm_up(WARMUP_RESOLUTIONS, runs=WARMUP_RUNS)
+        warmup_state["status"] = "ready"
+        logger.info(f"ウォームアップ完了 ({time.time() - warmup_state['started_at']:.1f}秒)")
+    except Exception as e:
+        # ウォームアップの失敗でサービスを止めない（初回リクエストが遅くなるだけ）
+        warmup_state["status"] = "ready"
+        warmup_state["error"] = str(e)
+        logger.error(f"ウォームアップエラー（ウォームアップなしで受付開始）: {e}")
+    finally:
+        warmup_state["finished_at"] = time.time()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """サーバー停止時の後処理（ワーカー停止・未書き込みのログを書き切る）"""
+    for executor in executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    if batch_scheduler:
+        batch_scheduler.close()
+    if worker_pool:
+        worker_pool.close()
+    if detector:
+        detector.log_sink.close()
+
+
+async def run_blocking(kind: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    CPU負荷の高い同期処理を種別ごとのスレッドプールで実行（イベントループを止めない）
+    スレッド数を超えた呼び出しはプールのキューで順番待ちになる（待ち時間は縮退モードの判定に使う）
+    
+    Args:
+        kind: 処理の種別 ("detect" / "evaluate" / "preprocess")
+        func: 実行する関数
+        *args, **kwargs: 関数の引数
+    """
+    loop = asyncio.get_running_loop()
+    submitted_at = time.perf_counter()
+    
+    def run() -> T:
+        if admission:
+            admission.record_queue_wait(kind, (time.perf_counter() - submitted_at) * 1000)
+        return func(*args, **kwargs)
+    
+    executor_active[kind] += 1
+    try:
+        return await loop.run_in_executor(executors[kind], run)
+    finally:
+        executor_active[kind] -= 1
+
+
+def run_in_background(kind: str, func: Callable[..., Any], *args, **kwargs) -> None:
+    """
+    同期処理を種別ごとのスレッドプールに登録し、完了を待たずに戻る（失敗はログに記録するのみ）
+    他の種別のスレッドプールが埋まっていても、呼び出し元の応答を遅らせない
+    
+    Args:
+        kind: 処理の種別 ("detect" / "evaluate" / "preprocess")
+        func: 実行する関数
+        *args, **kwargs: 関数の引数
+    """
+    task = asyncio.ensure_future(run_blocking(kind, func, *args, **kwargs))
+    background_jobs.add(task)
+    
+    def finished(task: asyncio.Future) -> None:
+        background_jobs.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"バックグラウンド処理エラー ({kind}): {task.exception()}")
+    
+    task.add_done_callback(finished)
+
+
+@app.middleware("http")
+async def admission_middleware(request: Request, call_next):
+    """
+    エンドポイント種別ごとの受付上限を確認してからリクエストを処理する
+    本文（マルチパート・JSON）を受信・解析する前に判定し、断るリクエストのアップロードを待たない
+    
+    - Content-Length が MAX_UPLOAD_MB を超える場合は 413
+    - 上限に達している場合は 503（クエリの is_preview=true のプレビューは先に 429）を Retry-After 付きで返す
+    
+    Args:
+        request: リクエスト
+        call_next: 後続の処理
+    """
+    kind = ADMISSION_ROUTES.get(request.url.path) if request.method == "POST" else None
+    if kind is None or not admission:
+        return await call_next(request)
+    
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_MB * 1024 * 1024:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"リクエストが大きすぎます（上限 {MAX_UPLOAD_MB:g}MB）"}
+        )
+    
+    is_preview = request.query_params.get("is_preview", "").lower() in ("1", "true", "yes", "on")
+    rejection = admission.try_admit(kind, is_preview)
+    if rejection is not None:
+        logger.warning(f"受付上限のためリクエストを拒否: {kind} ({rejection.status_code}, Retry-After={rejection.retry_after}秒)")
+        return JSONResponse(
+            status_code=rejection.status_code,
+            content={"detail": rejection.detail},
+            headers={"Retry-After": str(rejection.retry_after)}
+        )
+    
+    started_at = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        admission.release(kind, (time.perf_counter() - started_at) * 1000)
+
+
+# CORS設定（アドミッション制御より後に登録して外側に置き、429/503 の応答にもCORSヘッダーを付ける）
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def degrade_detection_mode(mode: DetectionMode) -> Tuple[DetectionMode, str]:
+    """
+    高負荷（縮退モード）中は hybrid / cascade を opencv に切り替える
+    
+    Args:
+        mode: リクエストの検出モード
+        
+    Returns:
+        実際に使う検出モードと、レスポンスの message に付ける注記（切り替えない場合は空文字）
+    """
+    effective_mode = admission.degrade_mode(mode) if admission else mode
+    if effective_mode == mode:
+        return mode, ""
+    logger.info(f"高負荷のため検出モードを切り替え: {mode} → {effective_mode}")
+    return effective_mode, f"（高負荷のため {mode} → {effective_mode} に切り替え）"
+
+
+async def run_detection(
+    image: np.ndarray,
+    mode: DetectionMode,
+    filename: str,
+    config: DetectionConfig,
+    prior_bbox: Optional[List[int]] = None,
+    is_preview: bool = False
+) -> DetectionResult:
+    """
+    検出を実行（ワーカープール有効時は空いているワーカープロセスで実行、
+    YOLOを使うモードはマイクロバッチ有効時に他のリクエストとまとめて推論）
+    
+    Args:
+        image: デコード済み画像
+        mode: 検出モード
+        filename: ファイル名
+        config: リクエストごとの検出設定
+        prior_bbox: 前フレームの [x, y, w, h]（プレビューのトラッキング用）
+        is_preview: プレビューフレームか（マイクロバッチの有効/無効を切り替える）
+    """
+    if worker_pool is not None:
+        # 空きワーカー待ちの間もイベントループを止めない
+        result = await run_blocking(
+            "detect", worker_pool.detect, image, mode, config, filename, prior_bbox=prior_bbox
+        )
+        detector._save_log(result)
+        return result
+    if batch_scheduler is not None and mode in ("yolo", "hybrid") and (
+        YOLO_BATCH_PREVIEW if is_preview else YOLO_BATCH_FINAL
+    ):
+        return await run_blocking("detect", batch_scheduler.detect, image, mode, filename, config)
+    return await run_blocking(
+        "detect", detector.detect_array,
+        image, mode=mode, filename=filename, config=config, prior_bbox=prior_bbox
+    )
+
+
+def result_cache_key(image_data: bytes, session_id: Optional[str], *params: Any):
+    """
+    検出結果キャッシュのキー
+    既定の設定（変換係数・キャリブレーション等）と、自動キャリブレーション時は
+    セッションのキャリブレーション結果の状態（有効期限切れ・再利用回数の上限・再検出で変わる）も含める
+    
+    Args:
+        image_data: エンコード済み画像バイト列
+        session_id: 端末・撮影セッションの識別子
+        *params: リクエストごとの検出設定
+        
+    Returns:
+        キャッシュキー（キャリブレーションの状態がこのプロセスから見えずキャッシュできない場合はNone）
+    """
+    calibration_session = calibration_session_key(session_id)
+    calibration_state = None
+    if detector.enable_auto_calibration and calibration_session:
+        if worker_pool is not None:
+            # キャリブレーション結果は各ワーカープロセスが保持しているため、期限切れを判定できない
+            return None
+        calibration_state = detector.calibration_cache.session_state(calibration_session)
+    return DetectionResultCache.make_key(
+        image_data, *params, detector.default_config, detector.enable_auto_calibration,
+        calibration_session, calibration_state
+    )
+
+
+async def detect_upload(
+    image_data: bytes,
+    mode: DetectionMode,
+    filename: str,
+    confidence_threshold: float,
+    bento_width_mm: Optional[float],
+    bento_height_mm: Optional[float],
+    metadata: Optional[MetadataLevel],
+    prior: Optional[PreviewTrack] = None,
+    yolo_imgsz: Optional[int] = None,
+    session_id: Optional[str] = None,
+    is_preview: bool = False
+) -> UploadDetection:
+    """
+    アップロード画像バイト列から検出（同一画像・同一設定の結果はキャッシュから返す）
+    画像のデコードはここで1回だけ行い、変換係数の計算・検出・呼び出し元の後続処理で共有する
+    
+    Args:
+        image_data: エンコード済み画像バイト列
+        mode: 検出モード
+        filename: ファイル名
+        confidence_threshold: 信頼度閾値
+        bento_width_mm: 弁当幅（mm）
+        bento_height_mm: 弁当奥行き（mm）
+        metadata: 明るさ・角度の計算レベル
+        prior: 同じセッションの前フレームのトラッキング状態（同じ解像度の場合のみ使用）
+        yolo_imgsz: YOLO推論サイズ
+        session_id: 端末・撮影セッションの識別子
+        is_preview: プレビューフレームか
+        
+    Returns:
+        UploadDetection: 検出結果・画像の (高さ, 幅)・デコード済みフレーム
+    """
+    cache_params = (
+        mode, confidence_threshold, bento_width_mm, bento_height_mm, metadata, yolo_imgsz,
+        prior.bbox if prior else None
+    )
+    cache_key = result_cache_key(image_data, session_id, *cache_params) if result_cache is not None else None
+    if cache_key is not None:
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            result, image_size = cached
+            logger.info(f"検出結果キャッシュヒット: {filename}")
+            # 呼び出し元が結果を書き換えてもキャッシュに影響しないよう複製して返す
+            return UploadDetection(replace(copy.deepcopy(result), filename=filename), image_size, None)
+    
+    # アップロード画像をメモリ上でデコード（ディスクを経由しない）
+    try:
+        image = await run_blocking("detect", detector.decode_image, image_data)
+    except Exception as e:
+        logger.error(f"画像デコードエラー: {e}")
+        raise HTTPException(status_code=400, detail="画像のデコードに失敗しました")
+    
+    # リクエストごとの検出設定（弁当サイズ指定時は動的変換係数）
+    config = build_detection_config(
+        confidence_threshold, bento_width_mm, bento_height_mm, image, metadata, yolo_imgsz, session_id
+    )
+    image_size = image.shape[:2]
+    prior_bbox = prior.prior_bbox(image_size) if prior else None
+    result = await run_detection(image, mode, filename, config, prior_bbox, is_preview)
+    
+    if cache_key is not None:
+        # 検出中にキャリブレーションを検出し直した場合は、この結果が使った変換係数の状態で保存する
+        cache_key = result_cache_key(image_data, session_id, *cache_params)
+        result_cache.put(cache_key, (copy.deepcopy(result), image_size))
+    return UploadDetection(result, image_size, image)
 
 
 @app.get("/")
@@ -294,19 +821,23 @@ async def root():
         "yolo_version": "YOLOv8 (Ultralytics)",
         "modes": {
             "opencv": "OpenCV単体モード（研究用）",
+            "opencv_pyramid": "OpenCV粗密探索モード（縮小画像で検出→原寸で境界精密化）",
             "yolo": "YOLOv8単体モード（研究用）",
-            "hybrid": "ハイブリッドモード（フロントエンド推奨・最高精度）"
+            "hybrid": "ハイブリッドモード（フロントエンド推奨・最高精度）",
+            "cascade": "カスケードモード（OpenCVの品質スコアが低い場合のみハイブリッドへ昇格）"
         },
         "endpoints": {
             "detect": "POST /detect - 単一画像検出（マルチパート）",
             "detect_base64": "POST /detect/base64 - Base64画像検出",
+            "detect_raw": "POST /detect/raw - バイナリ画像検出（ボディに画像バイト列、オプションはクエリ）",
             "evaluate": "POST /evaluate - フォルダ評価",
             "experiment": "POST /experiment/setup - 実験セットアップ",
             "preprocess_batch": "POST /preprocess/batch - 画像一括前処理",
             "preprocess_single": "POST /preprocess/single - 単一画像前処理",
             "results": "GET /results - 結果取得",
             "visualizations": "GET /visualizations - グラフ一覧",
-            "health": "GET /health - ヘルスチェック"
+            "health": "GET /health - ヘルスチェック",
+            "ready": "GET /ready - レディネスチェック（ウォームアップ完了まで503）"
         },
         "features": {
             "auto_crop": "お弁当箱の自動切り取り",
@@ -319,53 +850,92 @@ async def root():
 @app.get("/health")
 async def health_check():
     """ヘルスチェック"""
+    # ワーカープール有効時はワーカーが読み込んだモデルの状態を返す
+    if worker_pool is not None:
+        yolo_loaded = "yolo" in worker_pool.detector_info.get("available_modes", [])
+        yolo_backend = worker_pool.detector_info.get("yolo_backend")
+    else:
+        yolo_loaded = detector.yolo_model is not None if detector else False
+        yolo_backend = detector.yolo_backend if detector else None
     return {
         "status": "healthy",
         "detector_ready": detector is not None,
-        "yolo_loaded": detector.yolo_model is not None if detector else False,
+        "yolo_loaded": yolo_loaded,
+        "yolo_backend": yolo_backend,
         "yolo_version": "YOLOv8 (Ultralytics)",
-        "modes_available": ["opencv", "yolov8" if detector and detector.yolo_model else None, "hybrid" if detector and detector.yolo_model else None]
+        "modes_available": ["opencv", "opencv_pyramid", "yolov8" if yolo_loaded else None, "hybrid" if yolo_loaded else None, "cascade" if yolo_loaded else None],
+        "log_sink": dict(detector.log_sink.stats) if detector else {},
+        "ready": warmup_state["status"] == "ready",
+        "worker_pool": {
+            "workers": worker_pool.num_workers,
+            "idle": worker_pool.idle_workers,
+            **worker_pool.stats
+        } if worker_pool else None,
+        "result_cache": result_cache.stats if result_cache else None,
+        "preview_tracking": preview_tracker.stats if preview_tracker else None,
+        "calibration_cache": detector.calibration_cache.stats if detector and detector.enable_auto_calibration else None,
+        "yolo_batching": batch_scheduler.stats if batch_scheduler else None,
+        "admission": admission.stats if admission else None,
+        "executors": {
+            kind: {"threads": executor._max_workers, "active": executor_active[kind]}
+            for kind, executor in executors.items()
+        }
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    レディネスチェック
+    起動時のウォームアップが完了するまで503を返す（ロードバランサーの振り分け判定用）
+    ウォームアップ結果として各モード・解像度のcold/warm処理時間を返す
+    """
+    ready = detector is not None and warmup_state["status"] == "ready"
+    content = {
+        "ready": ready,
+        "warmup": warmup_state
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
+
+
 @app.post("/detect", response_model=DetectionResponse)
 async def detect_bento_box(
     file: UploadFile = File(...),
     mode: DetectionMode = "hybrid",
     confidence_threshold: float = 0.5,
     bento_width_mm: Optional[float] = None,
-    bento_height_mm: Optional[float] = None
+    bento_height_mm: Optional[float] = None,
+    metadata: Optional[MetadataLevel] = None,
+    yolo_imgsz: Optional[int] = None,
+    session_id: Optional[str] = None
 ):
     """
     単一画像での弁当箱検出（マルチパートフォーム）
     
     Args:
         file: アップロード画像
-        mode: 検出モード (opencv/yolo/hybrid)
+        mode: 検出モード (opencv/opencv_pyramid/yolo/hybrid/cascade)
         confidence_threshold: 信頼度閾値
         bento_width_mm: 弁当幅（mm）※指定時に動的変換係数計算
         bento_height_mm: 弁当奥行き（mm）※指定時に動的変換係数計算
+        metadata: 明るさ・角度の計算レベル (none/fast/full、省略時はMETADATA_LEVEL)
+        yolo_imgsz: YOLO推論サイズ（省略時はYOLO_IMGSZ_FINAL）
+        session_id: 端末・撮影セッションの識別子（自動キャリブレーション結果を再利用）
     """
     if not detector:
         raise HTTPException(status_code=500, detail="検出器が初期化されていません")
     
-    # ファイル保存
-    upload_path = UPLOAD_DIR / file.filename
-    try:
-        with open(upload_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        logger.error(f"ファイル保存エラー: {e}")
-        raise HTTPException(status_code=500, detail="ファイル保存に失敗しました")
+    image_data = await file.read()
     
     try:
-        # 弁当サイズが指定されている場合、動的に変換係数を更新
-        if bento_width_mm and bento_height_mm:
-            update_detector_with_dynamic_ratio(bento_width_mm, bento_height_mm, str(upload_path))
-        
-        # 検出実行
-        detector.confidence_threshold = confidence_threshold
-        result = detector.detect(str(upload_path), mode=mode)
+        # 検出実行（弁当サイズ指定時は動的変換係数、高負荷時は opencv に切り替え）
+        mode, degrade_note = degrade_detection_mode(mode)
+        result, _, _ = await detect_upload(
+            image_data, mode, file.filename, confidence_threshold,
+            bento_width_mm, bento_height_mm, metadata,
+            yolo_imgsz=yolo_imgsz or YOLO_IMGSZ_FINAL,
+            session_id=session_id
+        )
         
         return DetectionResponse(
             status="success",
@@ -377,20 +947,15 @@ async def detect_bento_box(
             success=result.success,
             brightness=result.brightness,
             angle=result.angle,
-            message="検出成功" if result.success else "検出失敗"
+            tilt_deg=result.tilt_deg,
+            message=("検出成功" if result.success else "検出失敗") + degrade_note
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"検出エラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        # アップロードファイル削除（オプション）
-        if upload_path.exists():
-            try:
-                upload_path.unlink()
-            except Exception:
-                pass
 
 
 @app.post("/detect/dynamic-size", response_model=DetectionResponse)
@@ -399,7 +964,10 @@ async def detect_with_dynamic_size(
     mode: DetectionMode = "hybrid",
     confidence_threshold: float = 0.5,
     bento_width_mm: float = 185.0,
-    bento_height_mm: float = 110.0
+    bento_height_mm: float = 110.0,
+    metadata: Optional[MetadataLevel] = None,
+    yolo_imgsz: Optional[int] = None,
+    session_id: Optional[str] = None
 ):
     """
     動的弁当サイズ対応検出エンドポイント（アプリ連携専用）
@@ -410,26 +978,24 @@ async def detect_with_dynamic_size(
         confidence_threshold: 信頼度閾値
         bento_width_mm: 弁当幅（mm）
         bento_height_mm: 弁当奥行き（mm）
+        metadata: 明るさ・角度の計算レベル (none/fast/full、省略時はMETADATA_LEVEL)
+        yolo_imgsz: YOLO推論サイズ（省略時はYOLO_IMGSZ_FINAL）
+        session_id: 端末・撮影セッションの識別子（自動キャリブレーション結果を再利用）
     """
     if not detector:
         raise HTTPException(status_code=500, detail="検出器が初期化されていません")
     
-    # ファイル保存
-    upload_path = UPLOAD_DIR / file.filename
-    try:
-        with open(upload_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        logger.error(f"ファイル保存エラー: {e}")
-        raise HTTPException(status_code=500, detail="ファイル保存に失敗しました")
+    image_data = await file.read()
     
     try:
-        # 動的変換係数計算・更新
-        update_detector_with_dynamic_ratio(bento_width_mm, bento_height_mm, str(upload_path))
-        
-        # 検出実行
-        detector.confidence_threshold = confidence_threshold
-        result = detector.detect(str(upload_path), mode=mode)
+        # 動的変換係数を含む検出実行（高負荷時は opencv に切り替え）
+        mode, degrade_note = degrade_detection_mode(mode)
+        result, _, _ = await detect_upload(
+            image_data, mode, file.filename, confidence_threshold,
+            bento_width_mm, bento_height_mm, metadata,
+            yolo_imgsz=yolo_imgsz or YOLO_IMGSZ_FINAL,
+            session_id=session_id
+        )
         
         # レスポンス情報に変換係数情報を追加
         response = DetectionResponse(
@@ -442,94 +1008,119 @@ async def detect_with_dynamic_size(
             success=result.success,
             brightness=result.brightness,
             angle=result.angle,
-            message=f"検出成功 (変換係数: {detector.px_to_mm_ratio:.4f} mm/px)" if result.success else "検出失敗"
+            tilt_deg=result.tilt_deg,
+            message=(
+                f"検出成功 (変換係数: {result.px_to_mm_ratio:.4f} mm/px)" if result.success else "検出失敗"
+            ) + degrade_note
         )
         
-        logger.info(f"動的サイズ検出完了: {bento_width_mm}×{bento_height_mm}mm, 係数={detector.px_to_mm_ratio:.4f}")
+        logger.info(f"動的サイズ検出完了: {bento_width_mm}×{bento_height_mm}mm, 係数={result.px_to_mm_ratio:.4f}")
         return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"動的サイズ検出エラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        # アップロードファイル削除
-        if upload_path.exists():
-            try:
-                upload_path.unlink()
-            except Exception:
-                pass
 
 
 @app.post("/detect/base64", response_model=DetectionResponse)
 async def detect_from_base64(request: Base64DetectionRequest):
     """
-    Base64エンコード画像から検出（フロントエンド推奨）
-    プレビューモード対応で高速化
+    Base64エンコード画像から検出
+    プレビューモード対応で高速化（画像はバイナリで送れる /detect/raw の方が軽量）
     
     Args:
         request: Base64検出リクエスト
-            - is_preview=True: OpenCV高速モード強制、位置情報付与
+            - is_preview=True: PREVIEW_MODE（既定はOpenCV高速モード）強制、位置情報付与、メタデータ計算省略
+              session_id 指定時は前フレームのbbox周辺のみ探索（トラッキング）
             - is_preview=False: 通常検出
+    
+    受付上限の確認はJSONの解析前に行うため、高負荷時にプレビューを先に断る(429)のは
+    クエリにも is_preview=true を付けた場合のみ
     """
     if not detector or not preprocessor:
         raise HTTPException(status_code=500, detail="検出器が初期化されていません")
     
-    upload_path = None
-    
     try:
-        # Base64デコード
         image_data = base64.b64decode(request.image_base64)
+    except Exception as e:
+        logger.error(f"Base64デコードエラー: {e}")
+        raise HTTPException(status_code=400, detail="画像のデコードに失敗しました")
+    
+    return await detect_frame(image_data, request)
+
+
+@app.post("/detect/raw", response_model=DetectionResponse)
+async def detect_from_raw(http_request: Request, options: FrameDetectionOptions = Depends()):
+    """
+    バイナリ画像から検出（フロントエンド推奨）
+    リクエストボディに画像ファイルのバイト列をそのまま送る（Content-Type: application/octet-stream 等）
+    Base64化によるサイズ増加・JSON解析がなく、受信したバイト列を直接デコードする
+    
+    Args:
+        http_request: リクエスト（ボディが画像バイト列）
+        options: クエリパラメータで指定する検出オプション（/detect/base64 と同じ項目）
+    """
+    if not detector or not preprocessor:
+        raise HTTPException(status_code=500, detail="検出器が初期化されていません")
+    
+    image_data = await http_request.body()
+    if not image_data:
+        raise HTTPException(status_code=400, detail="画像データが空です")
+    
+    return await detect_frame(image_data, options)
+
+
+async def detect_frame(image_data: bytes, options: FrameDetectionOptions) -> DetectionResponse:
+    """
+    撮影フレームの検出（/detect/base64・/detect/raw 共通）
+    
+    Args:
+        image_data: エンコード済み画像バイト列
+        options: 検出オプション
+    """
+    try:
+        # プレビューモードの場合はPREVIEW_MODE（既定はOpenCV）を強制
+        detection_mode = PREVIEW_MODE if options.is_preview else options.mode
         
-        # 画像情報取得（位置情報計算用）
-        image = Image.open(io.BytesIO(image_data))
-        image_width, image_height = image.size
-        
-        # 画像保存（uploadsフォルダ）
-        upload_path = UPLOAD_DIR / request.filename
-        with open(upload_path, "wb") as f:
-            f.write(image_data)
-        
-        # 弁当サイズが指定されている場合、動的に変換係数を更新
-        if request.bento_width_mm and request.bento_height_mm:
-            update_detector_with_dynamic_ratio(
-                request.bento_width_mm, 
-                request.bento_height_mm, 
-                str(upload_path)
-            )
+        # 高負荷（縮退モード）中は hybrid / cascade を opencv に切り替え
+        detection_mode, degrade_note = degrade_detection_mode(detection_mode)
         
-        # 研究用データとしてtest_imagesにもコピー（成功時のみ）
-        test_images_dir = Path("./test_images")
-        test_images_dir.mkdir(parents=True, exist_ok=True)
+        # YOLO推論サイズはプレビュー/最終撮影で別の既定値
+        yolo_imgsz = options.yolo_imgsz or (YOLO_IMGSZ_PREVIEW if options.is_preview else YOLO_IMGSZ_FINAL)
         
-        # プレビューモードの場合はOpenCV強制
-        detection_mode = "opencv" if request.is_preview else request.mode
+        # プレビューではフロントエンドが明るさ・角度を使わないため計算しない
+        metadata = options.metadata
+        if metadata is None and options.is_preview:
+            metadata = "none"
+        
+        # プレビューは同じセッションの前フレームのbbox周辺のみ探索（見失った場合はフレーム全体）
+        tracking_session = options.session_id if options.is_preview and preview_tracker else None
+        prior = preview_tracker.get(tracking_session) if tracking_session else None
+        
+        # 検出実行（弁当サイズ指定時は動的変換係数、画像サイズは位置情報計算用）
+        result, (image_height, image_width), image = await detect_upload(
+            image_data,
+            detection_mode,
+            options.filename,
+            options.confidence_threshold,
+            options.bento_width_mm,
+            options.bento_height_mm,
+            metadata,
+            prior,
+            yolo_imgsz,
+            options.session_id,
+            options.is_preview
+        )
         
-        # 検出実行
-        detector.confidence_threshold = request.confidence_threshold
-        result = detector.detect(str(upload_path), mode=detection_mode)
+        if tracking_session:
+            had_prior = prior is not None and prior.prior_bbox((image_height, image_width)) is not None
+            preview_tracker.record(tracking_session, result, (image_height, image_width), had_prior)
         
-        # 検出成功時、元画像とトリミング画像の両方を保存（研究用データ収集）
+        # 検出成功時、元画像とトリミング画像の両方を保存（研究用データ収集、応答は保存を待たない）
         if result.success and result.confidence >= 0.5:
-            # 元画像をtest_imagesに保存
-            test_image_path = test_images_dir / request.filename
-            shutil.copy2(str(upload_path), str(test_image_path))
-            logger.info(f"✅ 元画像を研究用データとして保存: {test_image_path}")
-            
-            # トリミング画像をtest_images_croppedに保存
-            try:
-                cropped_filename = f"cropped_{request.filename}"
-                cropped_output = TEST_IMAGES_CROPPED_DIR / cropped_filename
-                preprocess_result = preprocessor.process_file(
-                    test_image_path,
-                    cropped_output,
-                    detect_bento=True,
-                    enhance=False  # フロントエンドから送られる画像は既に最適化されているため
-                )
-                if preprocess_result['status'] == 'success':
-                    logger.info(f"✂️ トリミング画像を保存: {cropped_output}")
-            except Exception as crop_error:
-                logger.warning(f"⚠️ トリミング処理に失敗（検出は続行）: {crop_error}")
+            run_in_background("preprocess", save_research_capture, image_data, options.filename, image)
         
         # 位置情報を計算（成功時のみ）
         position_info = None
@@ -550,21 +1141,80 @@ async def detect_from_base64(request: Base64DetectionRequest):
             success=result.success,
             brightness=result.brightness,
             angle=result.angle,
-            message="検出成功" if result.success else "検出失敗",
+            tilt_deg=result.tilt_deg,
+            message=("検出成功" if result.success else "検出失敗") + degrade_note,
             position_info=position_info
         )
     
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Base64検出エラー: {e}")
+        logger.error(f"フレーム検出エラー: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def save_research_capture(image_data: bytes, filename: str, image: Optional[np.ndarray] = None) -> None:
+    """
+    検出に成功した撮影画像を研究用データとして保存
+    元画像はエンコード済みのバイト列をそのままtest_imagesに書き込み、
+    弁当箱を切り取った画像はデコード済みフレームから作成してtest_images_croppedに保存する
     
-    finally:
-        # アップロードファイル削除
-        if upload_path and upload_path.exists():
-            try:
-                upload_path.unlink()
-            except Exception as e:
-                logger.warning(f"ファイル削除失敗: {e}")
+    Args:
+        image_data: エンコード済み画像バイト列
+        filename: 保存ファイル名
+        image: デコード済みフレーム（省略時のみバイト列からデコード）
+    """
+    # 元画像をtest_imagesに保存
+    test_images_dir = Path("./test_images")
+    test_images_dir.mkdir(parents=True, exist_ok=True)
+    test_image_path = test_images_dir / filename
+    with open(test_image_path, "wb") as f:
+        f.write(image_data)
+    logger.info(f"✅ 元画像を研究用データとして保存: {test_image_path}")
+    
+    # トリミング画像をtest_images_croppedに保存
+    try:
+        cropped_filename = f"cropped_{filename}"
+        cropped_output = TEST_IMAGES_CROPPED_DIR / cropped_filename
+        if image is None:
+            image = detector.decode_image(image_data)
+        preprocess_result = preprocessor.process_image(
+            image,
+            cropped_output,
+            detect_bento=True,
+            enhance=False,  # フロントエンドから送られる画像は既に最適化されているため
+            input_path=test_image_path
+        )
+        if preprocess_result['status'] == 'success':
+            logger.info(f"✂️ トリミング画像を保存: {cropped_output}")
+    except Exception as crop_error:
+        logger.warning(f"⚠️ トリミング処理に失敗（検出は続行）: {crop_error}")
+
+
+@app.delete("/calibration")
+async def invalidate_calibration(session_id: Optional[str] = None):
+    """
+    キャッシュ済みの自動キャリブレーション結果を破棄（カメラ位置・ズーム・カードを変えた場合）
+    次のフレームで参照カードを検出し直す
+    
+    Args:
+        session_id: 対象の端末・撮影セッション（省略時は全セッション）
+    """
+    if not detector:
+        raise HTTPException(status_code=500, detail="検出器が初期化されていません")
+    
+    if session_id:
+        calibration_generation[session_id] = calibration_generation.get(session_id, 0) + 1
+    else:
+        calibration_generation["*"] += 1
+        detector.invalidate_calibration()
+    
+    logger.info(f"キャリブレーションを無効化: {session_id or '全セッション'}")
+    return {
+        "status": "success",
+        "session_id": session_id,
+        "message": "キャリブレーション結果を破棄しました"
+    }
 
 
 @app.post("/evaluate")
@@ -594,9 +1244,12 @@ async def evaluate_folder(request: EvaluationRequest, background_tasks: Backgrou
         )
     
     try:
-        # 評価実行
-        detector.confidence_threshold = request.confidence_threshold
-        summary = evaluator.evaluate_folder(str(folder_path))
+        # 評価実行（リクエストの閾値は検出器を変更せず設定として渡す）
+        config = detector.default_config.replace(confidence_threshold=request.confidence_threshold)
+        if worker_pool is not None:
+            # ワーカープール有効時はAPIプロセスのYOLOモデルを初回の評価で読み込む
+            await run_blocking("evaluate", detector.load_yolo_model)
+        summary = await run_blocking("evaluate", evaluator.evaluate_folder, str(folder_path), config=config)
         
         # バックグラウンドでグラフ生成
         if request.generate_graphs:
@@ -715,25 +1368,15 @@ async def get_visualization(filename: str):
 @app.get("/logs")
 async def list_logs(limit: int = 50):
     """
-    ログファイル一覧
+    検出ログ一覧（新しい順）
     
     Args:
         limit: 取得件数上限
     """
-    logs_dir = OUTPUT_DIR / "logs"
-    
-    if not logs_dir.exists():
+    if not detector:
         return {"status": "success", "logs": []}
     
-    log_files = sorted(logs_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
-    log_files = log_files[:limit]
-    
-    logs = []
-    for log_file in log_files:
-        import json
-        with open(log_file, 'r', encoding='utf-8') as f:
-            log_data = json.load(f)
-            logs.append(log_data)
+    logs = detector.log_sink.read_recent(limit)
     
     return {
         "status": "success",
@@ -749,6 +1392,8 @@ async def clear_outputs():
     """
     try:
         # ログクリア
+        if detector:
+            detector.log_sink.clear()
         logs_dir = OUTPUT_DIR / "logs"
         if logs_dir.exists():
             for f in logs_dir.glob("*"):
@@ -800,7 +1445,9 @@ async def preprocess_batch(
             raise HTTPException(status_code=404, detail=f"入力ディレクトリが見つかりません: {input_dir}")
         
         # 一括処理実行
-        summary = preprocessor.batch_process(
+        summary = await run_blocking(
+            "preprocess",
+            preprocessor.batch_process,
             input_path,
             output_path,
             pattern="*.jpg",
@@ -852,7 +1499,9 @@ async def preprocess_single(
             raise HTTPException(status_code=404, detail=f"ファイルが見つかりません: {input_path}")
         
         # 処理実行
-        result = preprocessor.process_file(
+        result = await run_blocking(
+            "preprocess",
+            preprocessor.process_file,
             input_path,
             output_path,
             detect_bento=detect_bento,
@@ -0,0 +1,255 @@
+"""
+YOLOマイクロバッチ・スケジューラ
+同時に届いた検出リクエストのYOLO推論を、最大 max_wait_ms 待つか max_batch_size 枚集まった時点で
+1回のバッチ推論にまとめ、結果を各リクエストへ返す
+
+- YOLOの推論設定（推論用の信頼度閾値・推論サイズ）が同じリクエストだけを同じバッチにまとめる
+- バッチ推論後の精密化（OpenCV）は各リクエストのスレッドで並列に実行する
+- 待ち時間・バッチサイズのヒストグラムを記録（待ち時間の上限を調整するため）
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ヒストグラムのバケット上限（待ち時間はms、バッチサイズは枚数）
+WAIT_BUCKETS_MS = (0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32)
+
+
+class Histogram:
+    """固定バケットの累積ヒストグラム（スレッドセーフ）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        初期化
+
+        Args:
+            buckets: 各バケットの上限（昇順）、上限を超えた値は "+Inf" に数える
+        """
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """値を1件記録"""
+        with self._lock:
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            self._counts[index] += 1
+            self._count += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """バケットごとの件数（その上限以下の累積件数）・件数・合計・平均"""
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[f"le_{bound:g}"] = cumulative
+            buckets["le_inf"] = self._count
+            return {
+                "buckets": buckets,
+                "count": self._count,
+                "sum": round(self._sum, 3),
+                "mean": round(self._sum / self._count, 3) if self._count else 0.0
+            }
+
+
+@dataclass
+class _BatchItem:
+    """バッチ待ちの1リクエスト"""
+    image: np.ndarray
+    config: Any
+    key: Hashable
+    submitted_at: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+
+
+class YoloBatchScheduler:
+    """YOLO推論をマイクロバッチにまとめるスケジューラ（専用スレッドで推論）"""
+
+    def __init__(self, detector, max_batch_size: int = 8, max_wait_ms: float = 5.0):
+        """
+        初期化
+
+        Args:
+            detector: YOLOモデルを読み込んだ BentoBoxDetector
+            max_batch_size: 1回の推論にまとめる最大枚数
+            max_wait_ms: 最初のリクエストから追加のリクエストを待つ最大時間(ms)
+        """
+        self.detector = detector
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max(0.0, max_wait_ms)
+        self.wait_histogram = Histogram(WAIT_BUCKETS_MS)
+        self.batch_size_histogram = Histogram(BATCH_SIZE_BUCKETS)
+        self._counters = {"requests": 0, "batches": 0, "errors": 0}
+        self._counter_lock = threading.Lock()
+        self._queue: "queue.Queue[Optional[_BatchItem]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="yolo-batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def infer(self, image: np.ndarray, config=None) -> Tuple[Any, float]:
+        """
+        YOLO推論をバッチに登録し、結果が出るまで待つ
+
+        Args:
+            image: 入力画像(BGR)
+            config: 検出設定（推論用の信頼度閾値・推論サイズが同じリクエストとだけまとめる）
+
+        Returns:
+            yolo_result: この画像のYOLO推論結果（バッチ推論に失敗した場合はNone）
+            yolo_time_ms: バッチ推論時間を枚数で割った時間(ms)
+
+        Raises:
+            Exception: 推論以外のバッチ処理で失敗した場合はその例外
+        """
+        if self._closed:
+            return None, 0.0
+        resolved = self.detector._resolve_config(config)
+        key = (self.detector._yolo_inference_confidence(resolved), resolved.yolo_imgsz)
+        item = _BatchItem(image=image, config=resolved, key=key)
+        self._queue.put(item)
+        return item.future.result()
+
+    def detect(
+        self,
+        image: np.ndarray,
+        mode,
+        filename: str = "image.jpg",
+        config=None,
+        ground_truth: Optional[Dict[str, float]] = None
+    ):
+        """
+        YOLOをバッチ推論してから1フレーム分の検出を実行（yolo / hybrid モード用）
+
+        Args:
+            image: 入力画像(BGR)
+            mode: 検出モード
+            filename: 結果・ログに記録するファイル名
+            config: 検出設定
+            ground_truth: 正解データ（誤差計算用）
+
+        Returns:
+            DetectionResult: 検出結果（推論時間にはバッチ推論時間の配分を含む）
+        """
+        yolo_result, yolo_time_ms = self.infer(image, config)
+        return self.detector._detect_frame(
+            image, mode, ground_truth, filename,
+            yolo_result=yolo_result,
+            extra_time_ms=yolo_time_ms,
+            config=config
+        )
+
+    def _run(self) -> None:
+        """バッチを組み立てて推論するループ（専用スレッド）"""
+        held: List[_BatchItem] = []
+        while True:
+            first = held.pop(0) if held else self._queue.get()
+            if first is None:
+                break
+
+            # 保留中のうち同じ推論設定のものを先に加える
+            batch = [first]
+            for item in [item for item in held if item.key == first.key]:
+                if len(batch) >= self.max_batch_size:
+                    break
+                batch.append(item)
+                held.remove(item)
+
+            # 最初のリクエストから max_wait_ms までの間に届いたものを加える
+            deadline = first.submitted_at + self.max_wait_ms / 1000
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                if item.key == first.key:
+                    batch.append(item)
+                else:
+                    held.append(item)
+
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # 結果を返す前に失敗した場合も、待っているリクエストを止めたままにしない
+                logger.error(f"YOLOバッチ処理エラー: {e}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+            if stopping:
+                break
+
+        # 停止後に残ったリクエストは各自の単体推論に切り替えさせる
+        for item in held:
+            item.future.set_result((None, 0.0))
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.future.set_result((None, 0.0))
+
+    def _run_batch(self, batch: List[_BatchItem]) -> None:
+        """1バッチ分のYOLO推論を実行し、各リクエストへ結果を返す"""
+        started_at = time.perf_counter()
+        for item in batch:
+            self.wait_histogram.observe((started_at - item.submitted_at) * 1000)
+        self.batch_size_histogram.observe(len(batch))
+
+        try:
+            results = list(self.detector._run_yolo([item.image for item in batch], batch[0].config))
+            if len(results) != len(batch):
+                raise ValueError(f"推論結果の数が画像数と一致しません: {len(results)} / {len(batch)}")
+            yolo_time_ms = (time.perf_counter() - started_at) * 1000 / len(batch)
+        except Exception as e:
+            # 失敗時は各リクエストが _detect_frame 内で単体推論する（detect_batch と同じ扱い）
+            logger.error(f"YOLOバッチ推論エラー（画像ごとの推論に切替）: {e}")
+            results, yolo_time_ms = [None] * len(batch), 0.0
+            with self._counter_lock:
+                self._counters["errors"] += 1
+
+        with self._counter_lock:
+            self._counters["requests"] += len(batch)
+            self._counters["batches"] += 1
+        for item, result in zip(batch, results):
+            item.future.set_result((result, yolo_time_ms))
+
+    def close(self) -> None:
+        """スケジューラを停止（待機中のリクエストは単体推論に切り替わる）"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """リクエスト数・バッチ数と、待ち時間(ms)・バッチサイズのヒストグラム"""
+        with self._counter_lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_wait_ms": self.wait_histogram.snapshot(),
+            "batch_size": self.batch_size_histogram.snapshot()
+        }
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+参照カード検出ベンチマーク
+旧実装（原寸画像の全輪郭を多角形近似してから面積で除外）と
+縮小画像での探索 + 原寸での角の精密化を行う新実装を、
+サンプル画像をカメラ相当の解像度に拡大したフレームで比較し、
+変換係数(px_to_mm_ratio)が許容誤差内で一致することも確認する
+カードを塗りつぶしたフレーム（カードなし、実運用で最も多いケース）も計測する
+"""
+
+import argparse
+import glob
+import logging
+import os
+import time
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from reference_card_detector import ReferenceCardDetector
+
+
+# サンプル画像の拡大率（1.0はそのまま、4.0で約3000x2300px）
+SCALES: List[float] = [1.0, 2.0, 4.0, 5.3]
+
+
+def legacy_detect_card(
+    detector: ReferenceCardDetector,
+    image: np.ndarray
+) -> Optional[Tuple[int, int, int, int]]:
+    """
+    旧実装の detect_card（比較用にそのまま保持）
+
+    Args:
+        detector: カードサイズ情報を持つ検出器
+        image: 入力画像(BGR)
+
+    Returns:
+        (x, y, width, height) カードのバウンディングボックス、見つからない場合はNone
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    card_candidates = []
+    for contour in contours:
+        epsilon = 0.02 * cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, epsilon, True)
+
+        if len(approx) == 4:
+            x, y, w, h = cv2.boundingRect(approx)
+
+            image_area = image.shape[0] * image.shape[1]
+            contour_area = w * h
+            if contour_area < image_area * 0.05 or contour_area > image_area * 0.5:
+                continue
+
+            aspect_ratio = w / h if w > h else h / w
+            expected_ratio = detector.card_info['aspect_ratio']
+            if abs(aspect_ratio - expected_ratio) / expected_ratio < 0.15:
+                card_candidates.append({
+                    'bbox': (x, y, w, h),
+                    'score': abs(aspect_ratio - expected_ratio)
+                })
+
+    if not card_candidates:
+        return None
+    return min(card_candidates, key=lambda c: c['score'])['bbox']
+
+
+def bbox_to_ratio(detector: ReferenceCardDetector, bbox: Optional[Tuple[int, int, int, int]]) -> Optional[float]:
+    """カードのbboxから変換係数を計算（calculate_px_to_mm_ratio と同じ式）"""
+    if bbox is None:
+        return None
+    _, _, w, h = bbox
+    ratio_long = detector.card_info['width'] / max(w, h)
+    ratio_short = detector.card_info['height'] / min(w, h)
+    return (ratio_long + ratio_short) / 2
+
+
+def remove_card(image: np.ndarray, bbox: Tuple[int, int, int, int]) -> np.ndarray:
+    """
+    カード領域を周囲の背景色で塗りつぶした「カードなし」フレームを生成
+
+    Args:
+        image: 入力画像(BGR)
+        bbox: カードの (x, y, w, h)
+    """
+    x, y, w, h = bbox
+    pad = max(4, min(w, h) // 10)
+    x1, y1 = max(0, x - pad), max(0, y - pad)
+    x2, y2 = min(image.shape[1], x + w + pad), min(image.shape[0], y + h + pad)
+    ring = np.concatenate([
+        image[y1:y2, x1:x1 + pad].reshape(-1, 3),
+        image[y1:y2, x2 - pad:x2].reshape(-1, 3),
+        image[y1:y1 + pad, x1:x2].reshape(-1, 3),
+        image[y2 - pad:y2, x1:x2].reshape(-1, 3),
+    ])
+    result = image.copy()
+    result[y1:y2, x1:x2] = np.median(ring, axis=0).astype(np.uint8)
+    return result
+
+
+def time_call(func, image: np.ndarray, repeat: int) -> float:
+    """関数の平均実行時間(ms)を計測"""
+    func(image)  # ウォームアップ
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(image)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run_benchmark(
+    image_dir: str,
+    card_type: str = 'credit_card',
+    repeat: int = 5,
+    tolerance: float = 0.01
+) -> bool:
+    """
+    全サンプル画像・全拡大率でベンチマークを実行
+
+    Args:
+        image_dir: サンプル画像フォルダ
+        card_type: カードタイプ
+        repeat: 各計測の繰り返し回数
+        tolerance: 変換係数の許容相対誤差
+
+    Returns:
+        旧実装でカードが見つかった全フレームで、新実装の変換係数が許容誤差内だったかどうか
+    """
+    detector = ReferenceCardDetector(card_type=card_type)
+    image_paths = sorted(
+        glob.glob(os.path.join(image_dir, "*.jpg")) + glob.glob(os.path.join(image_dir, "*.png"))
+    )
+    if not image_paths:
+        print(f"画像が見つかりません: {image_dir}")
+        return False
+
+    all_match = True
+    totals = {scale: [0.0, 0.0] for scale in SCALES}
+    no_card_totals = {scale: [0.0, 0.0] for scale in SCALES}
+
+    print("\n" + "=" * 90)
+    print("【参照カード検出ベンチマーク】")
+    print("=" * 90)
+    print(
+        f"{'画像':<28} {'解像度':<11} {'旧実装(ms)':>10} {'新実装(ms)':>10} "
+        f"{'高速化':>7} {'旧 mm/px':>9} {'新 mm/px':>9} {'誤差':>7}"
+    )
+    print("-" * 90)
+
+    for path in image_paths:
+        source = cv2.imread(path)
+        if source is None:
+            continue
+
+        for scale in SCALES:
+            if scale == 1.0:
+                image = source
+            else:
+                image = cv2.resize(source, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+
+            legacy_bbox = legacy_detect_card(detector, image)
+            frames = [(os.path.basename(path), image, totals)]
+            if legacy_bbox is not None:
+                frames.append((f"{os.path.basename(path)} (カードなし)", remove_card(image, legacy_bbox), no_card_totals))
+
+            for label, frame, frame_totals in frames:
+                legacy_ratio = bbox_to_ratio(detector, legacy_detect_card(detector, frame))
+                new_ratio = bbox_to_ratio(detector, detector.detect_card(frame))
+
+                if legacy_ratio is None:
+                    error = None
+                    match = new_ratio is None
+                else:
+                    error = abs(new_ratio - legacy_ratio) / legacy_ratio if new_ratio else None
+                    match = error is not None and error <= tolerance
+                all_match = all_match and match
+
+                legacy_ms = time_call(lambda img: legacy_detect_card(detector, img), frame, repeat)
+                new_ms = time_call(detector.detect_card, frame, repeat)
+                frame_totals[scale][0] += legacy_ms
+                frame_totals[scale][1] += new_ms
+
+                print(
+                    f"{label[:28]:<28} "
+                    f"{f'{frame.shape[1]}x{frame.shape[0]}':<11} "
+                    f"{legacy_ms:>10.2f} "
+                    f"{new_ms:>10.2f} "
+                    f"{legacy_ms / new_ms if new_ms > 0 else float('inf'):>6.1f}x "
+                    f"{legacy_ratio if legacy_ratio else float('nan'):>9.4f} "
+                    f"{new_ratio if new_ratio else float('nan'):>9.4f} "
+                    f"{f'{error * 100:.2f}%' if error is not None else '-':>7}"
+                    f"{'' if match else '  ✗'}"
+                )
+
+    print("-" * 90)
+    for scale, (legacy_total, new_total) in totals.items():
+        speedup = legacy_total / new_total if new_total > 0 else float('inf')
+        print(f"拡大率 x{scale:<4} 合計: 旧 {legacy_total:.1f}ms / 新 {new_total:.1f}ms ({speedup:.1f}x)")
+    for scale, (legacy_total, new_total) in no_card_totals.items():
+        speedup = legacy_total / new_total if new_total > 0 else float('inf')
+        print(f"拡大率 x{scale:<4} カードなし合計: 旧 {legacy_total:.1f}ms / 新 {new_total:.1f}ms ({speedup:.1f}x)")
+    print(f"変換係数の一致（許容誤差 {tolerance * 100:.1f}%）: {'✓' if all_match else '✗'}")
+    print("=" * 90 + "\n")
+    return all_match
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="参照カード検出ベンチマーク")
+    parser.add_argument(
+        "--image-dir",
+        default=os.getenv("TEST_IMAGES_CROPPED_DIR", "./test_images_cropped"),
+        help="サンプル画像フォルダ"
+    )
+    parser.add_argument("--card-type", default="credit_card", help="カードタイプ")
+    parser.add_argument("--repeat", type=int, default=5, help="計測の繰り返し回数")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="変換係数の許容相対誤差")
+    args = parser.parse_args()
+
+    # 検出ごとのログ出力は計測の邪魔になるため抑制
+    logging.getLogger("reference_card_detector").setLevel(logging.ERROR)
+
+    ok = run_benchmark(args.image_dir, args.card_type, args.repeat, args.tolerance)
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+_refine_bbox マイクロベンチマーク
+旧実装（行・列ごとのPythonループ）と射影ベースの新実装を
+複数の解像度で比較し、出力bboxが一致することも確認する
+"""
+
+import argparse
+import time
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+from detector import BentoBoxDetector
+
+
+# 比較する解像度（幅, 高さ）
+RESOLUTIONS: List[Tuple[int, int]] = [
+    (640, 480),
+    (1280, 960),
+    (1920, 1440),
+    (3024, 4032),
+    (4000, 3000),
+]
+
+
+def legacy_refine_bbox(image: np.ndarray, bbox: List[int]) -> List[int]:
+    """
+    旧実装の _refine_bbox（比較用にそのまま保持）
+
+    Args:
+        image: 元画像
+        bbox: [x, y, w, h]
+
+    Returns:
+        refined_bbox: 調整後の [x, y, w, h]
+    """
+    if bbox == [0, 0, 0, 0]:
+        return bbox
+
+    x, y, w, h = bbox
+    x = max(0, x)
+    y = max(0, y)
+    w = min(w, image.shape[1] - x)
+    h = min(h, image.shape[0] - y)
+
+    roi = image[y:y+h, x:x+w]
+    if roi.size == 0:
+        return bbox
+
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    for i in range(h):
+        if np.any(binary[i, :] > 0):
+            dy = i
+            break
+    else:
+        dy = 0
+
+    for i in range(h-1, -1, -1):
+        if np.any(binary[i, :] > 0):
+            h_new = i - dy + 1
+            break
+    else:
+        h_new = h - dy
+
+    for j in range(w):
+        if np.any(binary[:, j] > 0):
+            dx = j
+            break
+    else:
+        dx = 0
+
+    for j in range(w-1, -1, -1):
+        if np.any(binary[:, j] > 0):
+            w_new = j - dx + 1
+            break
+    else:
+        w_new = w - dx
+
+    x_new = x + dx
+    y_new = y + dy
+
+    if w_new < w * 0.5 or h_new < h * 0.5:
+        return bbox
+
+    return [int(x_new), int(y_new), int(w_new), int(h_new)]
+
+
+def create_frame(width: int, height: int, seed: int = 0) -> Tuple[np.ndarray, List[int]]:
+    """
+    ベンチマーク用の合成フレームを生成
+    暗い背景上に明るい弁当箱を描画し、ノイズを加える
+
+    Args:
+        width: 画像幅
+        height: 画像高さ
+        seed: 乱数シード
+
+    Returns:
+        image: 合成画像(BGR)
+        bbox: 弁当箱を少し大きめに囲む [x, y, w, h]（検出器の粗いbboxを想定）
+    """
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+
+    box_w, box_h = int(width * 0.6), int(height * 0.5)
+    x1, y1 = (width - box_w) // 2, (height - box_h) // 2
+    cv2.rectangle(image, (x1, y1), (x1 + box_w, y1 + box_h), (190, 200, 210), -1)
+
+    # 粗いbbox（周囲に余白を持たせる）
+    margin = max(4, int(min(width, height) * 0.05))
+    bbox = [x1 - margin, y1 - margin, box_w + 2 * margin, box_h + 2 * margin]
+    return image, bbox
+
+
+def time_call(func, image: np.ndarray, bbox: List[int], repeat: int) -> float:
+    """関数の平均実行時間(ms)を計測"""
+    func(image, list(bbox))  # ウォームアップ
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(image, list(bbox))
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run_benchmark(repeat: int = 20) -> bool:
+    """
+    全解像度でベンチマークを実行
+
+    Args:
+        repeat: 各計測の繰り返し回数
+
+    Returns:
+        全解像度で出力bboxが一致したかどうか
+    """
+    detector = BentoBoxDetector(output_dir="./outputs")
+    all_match = True
+
+    print("\n" + "=" * 70)
+    print("【_refine_bbox ベンチマーク】")
+    print("=" * 70)
+    print(f"{'解像度':<14} {'旧実装(ms)':>12} {'新実装(ms)':>12} {'高速化':>8}  {'一致':<4}")
+    print("-" * 70)
+
+    for width, height in RESOLUTIONS:
+        image, bbox = create_frame(width, height)
+
+        legacy_bbox = legacy_refine_bbox(image, list(bbox))
+        new_bbox = detector._refine_bbox(image, list(bbox))
+        match = legacy_bbox == new_bbox
+        all_match = all_match and match
+
+        legacy_ms = time_call(legacy_refine_bbox, image, bbox, repeat)
+        new_ms = time_call(detector._refine_bbox, image, bbox, repeat)
+        speedup = legacy_ms / new_ms if new_ms > 0 else float('inf')
+
+        print(
+            f"{f'{width}x{height}':<14} "
+            f"{legacy_ms:>12.2f} "
+            f"{new_ms:>12.2f} "
+            f"{speedup:>7.1f}x  "
+            f"{'✓' if match else '✗'}"
+        )
+        if not match:
+            print(f"  旧: {legacy_bbox} / 新: {new_bbox}")
+
+    print("=" * 70 + "\n")
+    return all_match
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="_refine_bbox マイクロベンチマーク")
+    parser.add_argument("--repeat", type=int, default=20, help="計測の繰り返し回数")
+    args = parser.parse_args()
+
+    ok = run_benchmark(repeat=args.repeat)
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,161 @@
+"""
+キャリブレーションキャッシュ
+参照カードから求めた変換係数(px_to_mm_ratio)を、撮影セッション（端末・固定カメラ）と
+画像サイズごとに保持し、同じ撮影条件ではカード検出を毎フレーム実行しないようにする
+
+- 有効期間(TTL)または再利用回数の上限を超えたら、次のフレームでカードを検出し直す
+- カードが見つからなかった結果も短時間だけ保持（カードのない撮影で毎フレーム探索しない）
+- セッション単位・全体の明示的な無効化に対応（カメラ位置・ズームを変えた場合など）
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+CalibrationKey = Tuple[str, int, int]
+
+
+@dataclass
+class _CalibrationEntry:
+    """1撮影条件分のキャリブレーション結果"""
+    ratio: Optional[float]  # None はカード検出失敗
+    stored_at: float
+    serial: int  # 保存ごとに増える通し番号（同じキーの再検出を区別する）
+    uses: int = 0
+
+
+class CalibrationCache:
+    """セッション + 画像サイズをキーにした変換係数キャッシュ（スレッドセーフ）"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300.0,
+        max_uses: int = 0,
+        negative_ttl_seconds: float = 10.0,
+        max_entries: int = 256
+    ):
+        """
+        初期化
+
+        Args:
+            ttl_seconds: 変換係数の有効期間(秒、0以下で無期限)
+            max_uses: 1回の検出結果を再利用する最大フレーム数（0で無制限）
+            negative_ttl_seconds: カード検出失敗を保持する期間(秒、0以下で保持しない)
+            max_entries: 保持する最大件数（超えたら最も古く使われたものから破棄）
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_uses = max_uses
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[CalibrationKey, _CalibrationEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_serial = 0
+        self._counters = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0}
+
+    @staticmethod
+    def make_key(session: str, image_size: Tuple[int, int]) -> CalibrationKey:
+        """キャッシュキー（セッション, 高さ, 幅）"""
+        return session, int(image_size[0]), int(image_size[1])
+
+    def lookup(self, session: str, image_size: Tuple[int, int]) -> Tuple[bool, Optional[float]]:
+        """
+        キャッシュ済みの変換係数を取得
+
+        Args:
+            session: 撮影セッション（端末・固定カメラ）の識別子
+            image_size: 画像の (高さ, 幅)
+
+        Returns:
+            found: 有効なエントリがあったか
+            ratio: 変換係数（カード検出失敗を保持している場合は None）
+        """
+        key = self.make_key(session, image_size)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return False, None
+
+            if not self._is_valid(entry):
+                del self._entries[key]
+                self._counters["stale"] += 1
+                self._counters["misses"] += 1
+                return False, None
+
+            entry.uses += 1
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return True, entry.ratio
+
+    def _is_valid(self, entry: _CalibrationEntry) -> bool:
+        """エントリが有効期間内かつ再利用回数の上限未満か（_lock を取った状態で呼ぶ）"""
+        ttl = self.ttl_seconds if entry.ratio is not None else self.negative_ttl_seconds
+        expired = ttl > 0 and time.monotonic() - entry.stored_at > ttl
+        used_up = self.max_uses > 0 and entry.uses >= self.max_uses
+        return not (expired or used_up)
+
+    def session_state(self, session: str) -> Tuple[Tuple[int, int, int], ...]:
+        """
+        セッションの有効なエントリの識別子（再利用回数は消費しない）
+        有効期限切れ・再利用回数の上限到達・再検出・無効化で値が変わるため、
+        キャリブレーション結果に依存する検出結果のキャッシュキーに含める
+
+        Args:
+            session: 撮影セッションの識別子
+
+        Returns:
+            (高さ, 幅, 通し番号) のタプル
+        """
+        with self._lock:
+            return tuple(sorted(
+                (key[1], key[2], entry.serial)
+                for key, entry in self._entries.items()
+                if key[0] == session and self._is_valid(entry)
+            ))
+
+    def store(self, session: str, image_size: Tuple[int, int], ratio: Optional[float]) -> None:
+        """
+        カード検出の結果を保存
+
+        Args:
+            session: 撮影セッションの識別子
+            image_size: 画像の (高さ, 幅)
+            ratio: 変換係数（None はカード検出失敗）
+        """
+        if ratio is None and self.negative_ttl_seconds <= 0:
+            return
+        key = self.make_key(session, image_size)
+        with self._lock:
+            self._entries[key] = _CalibrationEntry(ratio=ratio, stored_at=time.monotonic(), serial=self._next_serial)
+            self._next_serial += 1
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session: Optional[str] = None) -> int:
+        """
+        キャリブレーション結果を破棄
+
+        Args:
+            session: 対象セッション（省略時は全セッション）
+
+        Returns:
+            破棄した件数
+        """
+        with self._lock:
+            if session is None:
+                keys = list(self._entries)
+            else:
+                keys = [key for key in self._entries if key[0] == session]
+            for key in keys:
+                del self._entries[key]
+            self._counters["invalidations"] += 1
+            return len(keys)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """ヒット/ミス等の統計"""
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries)}
@@ -4,6 +4,7 @@ YOLOv8 (Ultralytics) + OpenCV による3モード検出
 - OpenCV単体モード
 - YOLOv8単体モード
 - YOLOv8 + OpenCV 併用モード（ハイブリッド）
+- カスケードモード（OpenCVの品質スコアが低い場合のみハイブリッドへ昇格）
 
 改善版: 参照カードによる自動キャリブレーション対応
 """
@@ -11,12 +12,18 @@ YOLOv8 (Ultralytics) + OpenCV による3モード検出
 import cv2
 import numpy as np
 import time
-import json
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Literal
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Tuple, Optional, Literal, Sequence
+from dataclasses import dataclass, asdict, field, replace
 import logging
+import threading
+
+from frame_analysis import FrameAnalysis
+from hybrid_pipeline import HybridPipeline
+from log_sink import create_log_sink
+from calibration_cache import CalibrationCache
+from onnx_backend import ORT_AVAILABLE, YoloBackend, load_onnx_yolo
 
 # 参照カード検出モジュール
 try:
@@ -38,7 +45,35 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-DetectionMode = Literal["opencv", "yolo", "hybrid"]
+DetectionMode = Literal["opencv", "opencv_pyramid", "yolo", "hybrid", "cascade"]
+
+# 画像メタデータ（明るさ・傾き角度）の計算レベル
+# - "none": 計算しない（0.0を返す）
+# - "fast": サムネイルの明るさ + 検出領域の最小外接矩形から傾き(tilt_deg)を推定（angleは計算しない）
+# - "full": 全画素の明るさ + 画像全体のHough変換による角度推定（従来方式、既定）
+MetadataLevel = Literal["none", "fast", "full"]
+
+
+@dataclass(frozen=True)
+class DetectionConfig:
+    """
+    1回の検出呼び出しに適用する設定（不変）
+    検出器インスタンスの状態を書き換えずにリクエストごとの設定を渡すため、
+    複数スレッドから同じ検出器（読み込み済みモデル）を共有できる
+    """
+    confidence_threshold: float = 0.5
+    px_to_mm_ratio: float = 1.0
+    metadata_level: MetadataLevel = "full"
+    pyramid_tolerance_px: float = 16.0
+    pyramid_min_side: int = 480
+    cascade_threshold: float = 0.6
+    tracking_margin: float = 0.25
+    yolo_imgsz: Optional[int] = None  # YOLO推論サイズ（Noneはモデルの既定サイズ）
+    calibration_session: Optional[str] = None  # 自動キャリブレーション結果を共有する撮影セッション（Noneは毎回検出）
+    
+    def replace(self, **changes) -> "DetectionConfig":
+        """一部の値を変更した新しい設定を返す"""
+        return replace(self, **changes)
 
 
 @dataclass
@@ -54,11 +89,30 @@ class DetectionResult:
     confidence: float
     bbox: Dict[str, float]  # {"x": int, "y": int, "width": int, "height": int, "width_mm": float, "height_mm": float}
     success: bool
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)  # ステージ別処理時間(ハイブリッドのみ)
+    px_to_mm_ratio: float = 0.0  # この検出で使用した換算係数（自動キャリブレーション結果を含む）
+    escalated: bool = False  # カスケードモードでOpenCVの品質不足によりハイブリッドへ昇格したか
+    tracked: bool = False  # 前フレームのbbox周辺ROIのみで検出できたか（プレビューのトラッキング）
+    tilt_deg: Optional[float] = None  # 検出領域の傾き(度、-45〜45、metadata_level="fast"のみ)
     
 
 class BentoBoxDetector:
     """弁当箱検出クラス（YOLOv8対応 + 自動キャリブレーション対応）"""
     
+    # 通常閾値で検出できなかった場合に使う低閾値
+    FALLBACK_CONFIDENCE = 0.2
+    
+    # OpenCV品質スコア: 減点しないbbox面積比の範囲、エッジ支持率を調べる帯幅(短辺に対する比)
+    QUALITY_AREA_RANGE = (0.05, 0.9)
+    QUALITY_EDGE_BAND = 0.02
+    
+    # トラッキング: ROIの最小マージン(px)、前フレームからの面積変化の許容範囲
+    TRACKING_MIN_MARGIN_PX = 24
+    TRACKING_AREA_RANGE = (0.5, 2.0)
+    
+    # 輪郭検出用エッジ（Canny閾値・前段ぼかし・クロージングのカーネルサイズ）
+    CONTOUR_EDGE_PARAMS = {"low": 30, "high": 100, "blur_ksize": 7, "close_ksize": 3}
+    
     def __init__(
         self, 
         yolo_weights_path: Optional[str] = None,
@@ -68,7 +122,19 @@ class BentoBoxDetector:
         output_dir: str = "./outputs",
         px_to_mm_ratio: float = 1.0,
         enable_auto_calibration: bool = False,
-        card_type: str = 'credit_card'
+        card_type: str = 'credit_card',
+        pyramid_tolerance_px: float = 16.0,
+        pyramid_min_side: int = 480,
+        metadata_level: MetadataLevel = "full",
+        cascade_threshold: float = 0.6,
+        tracking_margin: float = 0.25,
+        log_sink=None,
+        yolo_backend: YoloBackend = "pytorch",
+        onnx_export_imgsz: int = 640,
+        calibration_dir: str = "./test_images_cropped",
+        card_calibration_ttl: float = 300.0,
+        card_calibration_max_uses: int = 0,
+        load_yolo: bool = True
     ):
         """
         初期化
@@ -82,14 +148,46 @@ class BentoBoxDetector:
             px_to_mm_ratio: ピクセルからmmへの換算係数(デフォルト値)
             enable_auto_calibration: 参照カードによる自動キャリブレーションを有効化
             card_type: カードタイプ ('credit_card', 'business_card', 'custom_card')
+            pyramid_tolerance_px: ピラミッドモードの許容誤差(px、原寸換算)。
+                縮小率はこの値の1/2以下に抑え、原寸での精密化はこの幅の帯内で行う
+            pyramid_min_side: ピラミッドモードで縮小画像の短辺がこれを下回らないようにする
+            metadata_level: 画像メタデータ（明るさ・角度）の既定の計算レベル ("none", "fast", "full")
+            cascade_threshold: カスケードモードでOpenCV結果を採用する品質スコアの下限（未満はハイブリッドへ昇格）
+            tracking_margin: トラッキング時に前フレームのbboxを各辺に広げる割合（bboxの幅・高さに対する比）
+            log_sink: 検出ログの出力先（省略時は logs/detections.jsonl へ非同期追記）
+            yolo_backend: YOLOの推論バックエンド
+                - "pytorch": Ultralytics (PyTorch)
+                - "onnx": ONNXへエクスポートしてONNX Runtime(CPU)で推論
+                - "onnx_int8": さらに calibration_dir の画像で静的INT8量子化
+            onnx_export_imgsz: ONNXエクスポート時の入力サイズ（推論サイズは DetectionConfig.yolo_imgsz）
+            calibration_dir: INT8量子化のキャリブレーション画像フォルダ
+            card_calibration_ttl: 参照カードから求めた変換係数を同じ撮影セッション・画像サイズで再利用する期間(秒)
+            card_calibration_max_uses: 変換係数を再利用する最大フレーム数（0で無制限）
+            load_yolo: 初期化時にYOLOモデルを読み込むか（Falseの場合は load_yolo_model で後から読み込む）
+        
+        confidence_threshold / px_to_mm_ratio / pyramid_* / metadata_level / cascade_threshold /
+        tracking_margin は
+        既定の DetectionConfig になり、検出呼び出しごとに config で上書きできる
         """
-        self.confidence_threshold = confidence_threshold
+        self.default_config = DetectionConfig(
+            confidence_threshold=confidence_threshold,
+            px_to_mm_ratio=px_to_mm_ratio,
+            metadata_level=metadata_level,
+            pyramid_tolerance_px=pyramid_tolerance_px,
+            pyramid_min_side=pyramid_min_side,
+            cascade_threshold=cascade_threshold,
+            tracking_margin=tracking_margin
+        )
         self.nms_threshold = nms_threshold
         self.output_dir = Path(output_dir)
         self.log_dir = self.output_dir / "logs"
         self.log_dir.mkdir(parents=True, exist_ok=True)
-        self.px_to_mm_ratio = px_to_mm_ratio
+        self.log_sink = log_sink if log_sink is not None else create_log_sink("jsonl", self.log_dir)
         self.enable_auto_calibration = enable_auto_calibration
+        self._yolo_lock = threading.Lock()
+        self.calibration_cache = CalibrationCache(
+            ttl_seconds=card_calibration_ttl, max_uses=card_calibration_max_uses
+        )
         
         # 参照カード検出器の初期化
         self.card_detector = None
@@ -101,23 +199,91 @@ class BentoBoxDetector:
         
         # YOLOv8モデル初期化
         self.yolo_model = None
-        if YOLO_AVAILABLE and yolo_weights_path:
-            try:
-                # YOLOv8モデルを読み込み
-                self.yolo_model = YOLO(yolo_weights_path)
-                logger.info(f"YOLOv8モデルを読み込みました: {yolo_weights_path}")
-            except Exception as e:
-                logger.warning(f"YOLOv8モデルの読み込みに失敗: {e}")
-        elif not YOLO_AVAILABLE:
-            logger.warning("ultralytics がインストールされていません")
+        self.yolo_backend: YoloBackend = "pytorch"
+        self.yolo_weights_path = yolo_weights_path
+        self._yolo_load_options = {
+            "backend": yolo_backend,
+            "onnx_export_imgsz": onnx_export_imgsz,
+            "calibration_dir": calibration_dir
+        }
+        if load_yolo:
+            self.load_yolo_model()
         
-    def detect_opencv(self, image: np.ndarray) -> Tuple[List[int], float, float]:
+    def load_yolo_model(self) -> bool:
+        """
+        YOLOv8モデルを読み込む（読み込み済みの場合は何もしない）
+        load_yolo=False で生成した検出器は、YOLOを使う処理の前にこれを呼ぶ
+        
+        Returns:
+            モデルが使用可能か
+        """
+        with self._yolo_lock:
+            if self.yolo_model is not None or not self.yolo_weights_path:
+                return self.yolo_model is not None
+            
+            yolo_weights_path = self.yolo_weights_path
+            yolo_backend = self._yolo_load_options["backend"]
+            if yolo_backend != "pytorch":
+                if ORT_AVAILABLE:
+                    try:
+                        self.yolo_model = load_onnx_yolo(
+                            yolo_weights_path,
+                            int8=(yolo_backend == "onnx_int8"),
+                            calibration_dir=self._yolo_load_options["calibration_dir"],
+                            export_imgsz=self._yolo_load_options["onnx_export_imgsz"]
+                        )
+                        self.yolo_backend = yolo_backend
+                        logger.info(f"YOLOv8モデルを読み込みました（{yolo_backend}）: {self.yolo_model.onnx_path}")
+                    except Exception as e:
+                        logger.warning(f"ONNXバックエンドの準備に失敗（PyTorchで読み込み）: {e}")
+                else:
+                    logger.warning("onnxruntime がインストールされていません（PyTorchで読み込み）")
+            
+            if self.yolo_model is None and YOLO_AVAILABLE:
+                try:
+                    # YOLOv8モデルを読み込み
+                    self.yolo_model = YOLO(yolo_weights_path)
+                    logger.info(f"YOLOv8モデルを読み込みました: {yolo_weights_path}")
+                except Exception as e:
+                    logger.warning(f"YOLOv8モデルの読み込みに失敗: {e}")
+            elif self.yolo_model is None and not YOLO_AVAILABLE:
+                logger.warning("ultralytics がインストールされていません")
+            
+            return self.yolo_model is not None
+    
+    @property
+    def supports_batch_inference(self) -> bool:
+        """複数画像を1回の推論にまとめられるか（ONNXはバッチ次元が動的なモデルのみ）"""
+        if self.yolo_model is None:
+            return False
+        return self.yolo_backend == "pytorch" or self.yolo_model.dynamic_batch
+    
+    @property
+    def confidence_threshold(self) -> float:
+        """既定の信頼度閾値（変更は config で行う）"""
+        return self.default_config.confidence_threshold
+    
+    @property
+    def px_to_mm_ratio(self) -> float:
+        """既定のピクセル→mm換算係数（変更は config で行う）"""
+        return self.default_config.px_to_mm_ratio
+    
+    def _resolve_config(self, config: Optional[DetectionConfig]) -> DetectionConfig:
+        """呼び出しごとの設定（省略時は既定の設定）"""
+        return config if config is not None else self.default_config
+    
+    def detect_opencv(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None
+    ) -> Tuple[List[int], float, float]:
         """
         OpenCV単体での検出
         シンプルなアルゴリズムを維持（既に良好な性能）
         
         Args:
             image: 入力画像
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
             
         Returns:
             bbox: [x, y, w, h]
@@ -125,54 +291,426 @@ class BentoBoxDetector:
             inference_time: 推論時間(ms)
         """
         start_time = time.time()
+        analysis = FrameAnalysis.of(image, analysis)
         
-        # グレースケール変換
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # エッジ検出 → 最大面積の輪郭を検出（シンプル = 強い）
+        bbox = self._frame_contour_bbox(analysis)
+        
+        if bbox is not None:
+            # bbox微調整を適用（精度向上）
+            bbox = self._refine_bbox(image, bbox, analysis)
+            
+            confidence = 0.7  # OpenCVは信頼度を返さないので固定値
+        else:
+            bbox = [0, 0, 0, 0]
+            confidence = 0.0
+        
+        inference_time = (time.time() - start_time) * 1000
         
-        # ノイズ除去を強化
-        blurred = cv2.GaussianBlur(gray, (7, 7), 0)
+        return bbox, confidence, inference_time
+    
+    def _contour_edges(self, analysis: FrameAnalysis) -> np.ndarray:
+        """
+        輪郭検出用のエッジ画像を生成
         
-        # Cannyエッジ検出（閾値を調整してエッジ精度向上）
+        Args:
+            analysis: フレーム（またはROI）の解析キャッシュ
+            
+        Returns:
+            edges: クロージング済みのエッジ画像
+        """
+        # グレースケール変換 → ノイズ除去(7x7ぼかし) → Cannyエッジ検出
         # 低閾値30, 高閾値100に変更（より多くのエッジを検出）
-        edges = cv2.Canny(blurred, 30, 100)
+        # → モルフォロジー処理(3x3クロージング)でエッジを連結
+        return analysis.closed_edges(**self.CONTOUR_EDGE_PARAMS)
+    
+    def _frame_contours(self, analysis: FrameAnalysis) -> Sequence[np.ndarray]:
+        """
+        フレームの外側輪郭（_contour_edges のエッジ画像から1回だけ抽出し、解析キャッシュで共有）
+        弁当箱の各検出ステージはこの同じ輪郭から候補を選ぶ
         
-        # モルフォロジー処理でエッジを連結
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
-        edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel)
+        Args:
+            analysis: フレームの解析キャッシュ
+            
+        Returns:
+            contours: 輪郭のリスト
+        """
+        return analysis.edge_contours(**self.CONTOUR_EDGE_PARAMS)
+    
+    def _frame_contour(self, analysis: FrameAnalysis) -> Optional[np.ndarray]:
+        """
+        共有の輪郭から最大面積の輪郭を取得（_largest_contour と同じ結果）
         
-        # 輪郭検出
+        Returns:
+            contour: 輪郭、輪郭がない場合はNone
+        """
+        contours = self._frame_contours(analysis)
+        if not contours:
+            return None
+        
+        return max(contours, key=cv2.contourArea)
+    
+    def _frame_contour_bbox(self, analysis: FrameAnalysis) -> Optional[List[int]]:
+        """
+        共有の輪郭から最大面積の輪郭のbboxを取得
+        
+        Returns:
+            bbox: [x, y, w, h]、輪郭がない場合はNone
+        """
+        max_contour = self._frame_contour(analysis)
+        if max_contour is None:
+            return None
+        
+        x, y, w, h = cv2.boundingRect(max_contour)
+        return [int(x), int(y), int(w), int(h)]
+    
+    def _largest_contour(self, edges: np.ndarray) -> Optional[np.ndarray]:
+        """
+        エッジ画像から最大面積の外側輪郭を取得
+        
+        Args:
+            edges: エッジ画像
+            
+        Returns:
+            contour: 輪郭、輪郭がない場合はNone
+        """
         contours, _ = cv2.findContours(
             edges, 
             cv2.RETR_EXTERNAL, 
             cv2.CHAIN_APPROX_SIMPLE
         )
         
-        # 最大面積の輪郭を検出（シンプル = 強い）
-        if contours:
-            max_contour = max(contours, key=cv2.contourArea)
-            x, y, w, h = cv2.boundingRect(max_contour)
-            bbox = [int(x), int(y), int(w), int(h)]
+        if not contours:
+            return None
+        
+        return max(contours, key=cv2.contourArea)
+    
+    def _largest_contour_bbox(self, edges: np.ndarray) -> Optional[List[int]]:
+        """
+        エッジ画像から最大面積の輪郭のbboxを取得
+        
+        Args:
+            edges: エッジ画像
             
-            # bbox微調整を適用（精度向上）
-            bbox = self._refine_bbox(image, bbox)
+        Returns:
+            bbox: [x, y, w, h]、輪郭がない場合はNone
+        """
+        max_contour = self._largest_contour(edges)
+        if max_contour is None:
+            return None
+        
+        x, y, w, h = cv2.boundingRect(max_contour)
+        return [int(x), int(y), int(w), int(h)]
+    
+    def _opencv_quality(self, edges: np.ndarray, contour: np.ndarray, bbox: List[int]) -> float:
+        """
+        OpenCV検出結果の品質スコア (0〜1)
+        以下の3指標から算出する
+        - 矩形度: 輪郭面積 / 最小外接矩形の面積（弁当箱は矩形なので1に近いほど良い）
+        - 面積比: bboxのフレームに対する面積比（QUALITY_AREA_RANGE 外は減点、全面・極小は0）
+        - エッジ支持率: bboxの4辺に沿ってエッジが存在する割合（辺から帯幅内を探索）
+        
+        Args:
+            edges: 輪郭検出に使ったエッジ画像
+            contour: 最大輪郭
+            bbox: 微調整済みの [x, y, w, h]
             
-            confidence = 0.7  # OpenCVは信頼度を返さないので固定値
+        Returns:
+            score: 面積比係数 × (矩形度 + エッジ支持率) / 2
+        """
+        x, y, w, h = bbox
+        if w <= 0 or h <= 0:
+            return 0.0
+        height, width = edges.shape[:2]
+        
+        # 矩形度
+        (_, (rect_w, rect_h), _) = cv2.minAreaRect(contour)
+        rect_area = rect_w * rect_h
+        rectangularity = min(1.0, cv2.contourArea(contour) / rect_area) if rect_area > 0 else 0.0
+        
+        # 面積比（範囲内は1、範囲外は0/1に向かって線形に減点）
+        area_fraction = (w * h) / float(width * height)
+        low, high = self.QUALITY_AREA_RANGE
+        if area_fraction < low:
+            area_factor = area_fraction / low
+        elif area_fraction > high:
+            area_factor = max(0.0, (1.0 - area_fraction) / (1.0 - high))
         else:
-            bbox = [0, 0, 0, 0]
-            confidence = 0.0
+            area_factor = 1.0
+        
+        # エッジ支持率（各辺の帯内に1画素でもエッジがある位置の割合を4辺で平均）
+        band = max(3, int(min(width, height) * self.QUALITY_EDGE_BAND))
+        x2, y2 = x + w - 1, y + h - 1
+        strips = [
+            (edges[max(0, y - band):y + band + 1, x:x2 + 1], 0),
+            (edges[max(0, y2 - band):y2 + band + 1, x:x2 + 1], 0),
+            (edges[y:y2 + 1, max(0, x - band):x + band + 1], 1),
+            (edges[y:y2 + 1, max(0, x2 - band):x2 + band + 1], 1)
+        ]
+        edge_support = float(np.mean([
+            np.any(strip > 0, axis=axis).mean() if strip.size else 0.0
+            for strip, axis in strips
+        ]))
+        
+        return float(area_factor * (rectangularity + edge_support) / 2)
+    
+    def detect_opencv_tracked(
+        self,
+        image: np.ndarray,
+        prior_bbox: List[int],
+        analysis: Optional[FrameAnalysis] = None,
+        config: Optional[DetectionConfig] = None
+    ) -> Tuple[List[int], float, float, bool]:
+        """
+        前フレームのbbox周辺のみを探索するOpenCV検出（連続するプレビューフレーム用）
+        前フレームのbboxを tracking_margin だけ広げたROI内で輪郭を探し、
+        見失った場合（輪郭なし・ROI境界に接する・面積が大きく変化）はフレーム全体で検出する
+        
+        Args:
+            image: 入力画像
+            prior_bbox: 前フレームの [x, y, w, h]
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            config: 検出設定（省略時は既定の設定）
+            
+        Returns:
+            bbox: [x, y, w, h]
+            confidence: 信頼度 (固定値)
+            inference_time: 推論時間(ms)
+            tracked: ROI内で検出できたか（Falseはフレーム全体で検出）
+        """
+        start_time = time.time()
+        analysis = FrameAnalysis.of(image, analysis)
+        
+        bbox = self._track_in_roi(image, prior_bbox, analysis, self._resolve_config(config))
+        if bbox is None:
+            logger.debug("トラッキング失敗 → フレーム全体で検出")
+            bbox, confidence, _ = self.detect_opencv(image, analysis)
+            return bbox, confidence, (time.time() - start_time) * 1000, False
+        
+        return bbox, 0.7, (time.time() - start_time) * 1000, True
+    
+    def _track_in_roi(
+        self,
+        image: np.ndarray,
+        prior_bbox: List[int],
+        analysis: FrameAnalysis,
+        config: DetectionConfig
+    ) -> Optional[List[int]]:
+        """
+        前フレームのbboxを広げたROI内で検出
+        
+        Returns:
+            bbox: フレーム座標系の [x, y, w, h]、見失った場合はNone
+        """
+        height, width = image.shape[:2]
+        px, py, pw, ph = prior_bbox
+        if pw <= 0 or ph <= 0:
+            return None
+        
+        margin_x = max(self.TRACKING_MIN_MARGIN_PX, int(pw * config.tracking_margin))
+        margin_y = max(self.TRACKING_MIN_MARGIN_PX, int(ph * config.tracking_margin))
+        x1, y1 = max(0, px - margin_x), max(0, py - margin_y)
+        x2, y2 = min(width, px + pw + margin_x), min(height, py + ph + margin_y)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        
+        local = self._largest_contour_bbox(self._contour_edges(analysis.crop(x1, y1, x2, y2)))
+        if local is None:
+            return None
+        lx, ly, lw, lh = local
+        
+        # ROI境界（フレーム端を除く）に接する場合は弁当箱がROI外へはみ出している
+        if (
+            (lx <= 0 < x1) or (ly <= 0 < y1)
+            or (lx + lw >= x2 - x1 and x2 < width)
+            or (ly + lh >= y2 - y1 and y2 < height)
+        ):
+            return None
+        
+        # 面積が大きく変わった場合は別の物体を捉えている
+        area_ratio = (lw * lh) / float(pw * ph)
+        low, high = self.TRACKING_AREA_RANGE
+        if not low <= area_ratio <= high:
+            return None
+        
+        return self._refine_bbox(image, [x1 + lx, y1 + ly, lw, lh], analysis)
+    
+    def detect_opencv_pyramid(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None,
+        config: Optional[DetectionConfig] = None
+    ) -> Tuple[List[int], float, float]:
+        """
+        画像ピラミッドによる粗密探索でのOpenCV検出
+        1. 縮小画像（ピラミッド上位レベル）で輪郭検出・bbox微調整を行い粗い位置を求める
+        2. 原寸画像では粗いbboxの各辺周辺の帯領域(±pyramid_tolerance_px)だけで
+           エッジ検出・二値化を行い境界を精密化
+        縮小できない小さい画像では通常のOpenCV検出と同じ
+        
+        Args:
+            image: 入力画像
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            config: 検出設定（省略時は既定の設定）
+            
+        Returns:
+            bbox: [x, y, w, h]
+            confidence: 信頼度 (固定値)
+            inference_time: 推論時間(ms)
+        """
+        start_time = time.time()
+        analysis = FrameAnalysis.of(image, analysis)
+        config = self._resolve_config(config)
+        
+        level = self._pyramid_level(image.shape[:2], config)
+        if level == 0:
+            bbox, confidence, _ = self.detect_opencv(image, analysis)
+            return bbox, confidence, (time.time() - start_time) * 1000
+        
+        # グレースケールをピラミッドで縮小（カラーではなく1chのみ縮小）
+        gray = analysis.gray
+        small = gray
+        for _ in range(level):
+            small = cv2.pyrDown(small)
+        small_analysis = FrameAnalysis(small, gray=small)
+        
+        # 縮小画像で粗い検出
+        coarse = self._largest_contour_bbox(self._contour_edges(small_analysis))
+        if coarse is None:
+            return [0, 0, 0, 0], 0.0, (time.time() - start_time) * 1000
+        coarse = self._refine_bbox(small, coarse, small_analysis)
+        
+        # 微調整に使う二値化閾値は粗いbbox内のOtsu閾値で代用
+        cx, cy, cw, ch = coarse
+        threshold, _ = cv2.threshold(
+            small[cy:cy+ch, cx:cx+cw], 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+        )
+        
+        # 原寸座標に変換
+        scale_x = gray.shape[1] / small.shape[1]
+        scale_y = gray.shape[0] / small.shape[0]
+        box = [
+            int(round(cx * scale_x)),
+            int(round(cy * scale_y)),
+            int(round((cx + cw) * scale_x)),
+            int(round((cy + ch) * scale_y))
+        ]
+        
+        # 原寸画像で各辺の帯領域のみ精密化
+        x1, y1, x2, y2 = self._refine_edges_in_bands(gray, box, threshold, config.pyramid_tolerance_px)
+        bbox = [int(x1), int(y1), int(x2 - x1), int(y2 - y1)]
         
         inference_time = (time.time() - start_time) * 1000
         
-        return bbox, confidence, inference_time
+        return bbox, 0.7, inference_time
+    
+    def _pyramid_level(self, shape: Tuple[int, int], config: Optional[DetectionConfig] = None) -> int:
+        """
+        ピラミッドの縮小レベルを決定
+        縮小率(2^level)が許容誤差の1/2以下、かつ短辺がpyramid_min_side以上になる最大レベル
+        
+        Args:
+            shape: 画像の (高さ, 幅)
+            config: 検出設定（省略時は既定の設定）
+        """
+        config = self._resolve_config(config)
+        level = 0
+        short_side = min(shape)
+        while (
+            2 ** (level + 1) <= config.pyramid_tolerance_px / 2
+            and short_side / 2 ** (level + 1) >= config.pyramid_min_side
+        ):
+            level += 1
+        return level
     
-    def detect_yolo(self, image: np.ndarray) -> Tuple[List[int], float, float]:
+    def _refine_edges_in_bands(
+        self,
+        gray: np.ndarray,
+        box: List[int],
+        threshold: float,
+        tolerance_px: float
+    ) -> Tuple[int, int, int, int]:
+        """
+        粗いbboxの各辺周辺の帯領域だけで境界を精密化
+        各帯でエッジ（Canny）の最も外側の位置を求め、そこから内側で
+        二値化後の前景が最初に現れる位置を境界とする
+        
+        Args:
+            gray: 原寸グレースケール画像
+            box: 粗いbbox [x1, y1, x2, y2]（原寸座標、x2/y2は終端の次）
+            threshold: 前景判定の二値化閾値
+            tolerance_px: 帯の半幅(px)
+            
+        Returns:
+            (x1, y1, x2, y2): 精密化後の座標
+        """
+        height, width = gray.shape[:2]
+        band = int(np.ceil(tolerance_px))
+        pad = 4  # ぼかし・Cannyの境界処理の影響を避ける余白
+        x1, y1, x2, y2 = box
+        
+        # 帯の幅方向の範囲（隣接する辺の帯と重なるように±band）
+        span_x = (max(0, x1 - band), min(width, x2 + band))
+        span_y = (max(0, y1 - band), min(height, y2 + band))
+        
+        def search(strip: np.ndarray, start: int, stop: int) -> Optional[int]:
+            """外側(行0側)から内側へ境界を探索し、見つかった行番号を返す"""
+            start, stop = max(0, start), min(strip.shape[0], stop)
+            if stop <= start or strip.shape[1] == 0:
+                return None
+            strip = np.ascontiguousarray(strip)
+            edges = self._contour_edges(FrameAnalysis(strip, gray=strip))
+            rows = np.flatnonzero(edges[start:stop].any(axis=1))
+            if rows.size == 0:
+                return None
+            edge_row = start + int(rows[0])
+            foreground = np.flatnonzero((strip[edge_row:stop] > threshold).any(axis=1))
+            return edge_row + int(foreground[0]) if foreground.size > 0 else edge_row
+        
+        # 上端
+        lo, hi = max(0, y1 - band - pad), min(height, y1 + band + pad)
+        found = search(gray[lo:hi, span_x[0]:span_x[1]], y1 - band - lo, y1 + band - lo)
+        new_y1 = lo + found if found is not None else y1
+        
+        # 下端（行を反転して外側から探索）
+        lo, hi = max(0, y2 - band - pad), min(height, y2 + band + pad)
+        found = search(gray[lo:hi, span_x[0]:span_x[1]][::-1], hi - y2 - band, hi - y2 + band)
+        new_y2 = hi - found if found is not None else y2
+        
+        # 左端（転置して行方向の探索に揃える）
+        lo, hi = max(0, x1 - band - pad), min(width, x1 + band + pad)
+        found = search(gray[span_y[0]:span_y[1], lo:hi].T, x1 - band - lo, x1 + band - lo)
+        new_x1 = lo + found if found is not None else x1
+        
+        # 右端（転置 + 反転）
+        lo, hi = max(0, x2 - band - pad), min(width, x2 + band + pad)
+        found = search(gray[span_y[0]:span_y[1], lo:hi].T[::-1], hi - x2 - band, hi - x2 + band)
+        new_x2 = hi - found if found is not None else x2
+        
+        # 帯内で矛盾した結果になった場合は粗い推定を使用
+        if new_x2 <= new_x1 or new_y2 <= new_y1:
+            return x1, y1, x2, y2
+        
+        return new_x1, new_y1, new_x2, new_y2
+    
+    def detect_yolo(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None,
+        yolo_result=None,
+        config: Optional[DetectionConfig] = None
+    ) -> Tuple[List[int], float, float]:
         """
         YOLOv8単体での検出（改良版）
-        - 低い閾値で再試行機能を追加
-        - 最大面積のボックスを優先
+        - 推論は必要になり得る最低閾値で1回だけ実行
+        - 通常閾値を超えるボックスがあれば最高信頼度のボックスを選択
+        - なければ低閾値(FALLBACK_CONFIDENCE)以上で最大面積のボックスを選択
         
         Args:
             image: 入力画像
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            yolo_result: バッチ推論済みの結果（省略時はこの画像単体で推論）
+            config: 検出設定（省略時は既定の設定）
             
         Returns:
             bbox: [x, y, w, h]
@@ -184,64 +722,22 @@ class BentoBoxDetector:
             return [0, 0, 0, 0], 0.0, 0.0
         
         start_time = time.time()
+        analysis = FrameAnalysis.of(image, analysis)
         
         try:
-            # まず通常の閾値で試行
-            results = self.yolo_model(image, conf=self.confidence_threshold, verbose=False)
-            
-            # 結果を取得
-            if len(results) > 0 and len(results[0].boxes) > 0:
-                boxes = results[0].boxes
-                confidences = boxes.conf.cpu().numpy()
-                xyxy = boxes.xyxy.cpu().numpy()
-                
-                # 最高信頼度のボックスを選択
-                max_idx = np.argmax(confidences)
-                confidence = float(confidences[max_idx])
-                
-                # xyxy形式 (x1, y1, x2, y2) から xywh形式に変換
-                x1, y1, x2, y2 = xyxy[max_idx]
-                x = int(x1)
-                y = int(y1)
-                w = int(x2 - x1)
-                h = int(y2 - y1)
-                
-                bbox = [x, y, w, h]
+            # 最低閾値で1回だけ推論（バッチ推論済みの場合は再推論しない）
+            if yolo_result is None:
+                results = self._run_yolo(image, config)
+                yolo_result = results[0] if len(results) > 0 else None
+            
+            selected = self._select_yolo_box(yolo_result, config)
+            if selected is not None:
+                bbox, confidence = selected
                 # bbox微調整を適用（精度向上）
-                bbox = self._refine_bbox(image, bbox)
+                bbox = self._refine_bbox(image, bbox, analysis)
             else:
-                # 検出失敗時: より低い閾値で再試行（0.2まで下げる）
-                logger.info(f"YOLO初回検出失敗 → 低閾値(0.2)で再試行")
-                results = self.yolo_model(image, conf=0.2, verbose=False)
-                
-                if len(results) > 0 and len(results[0].boxes) > 0:
-                    boxes = results[0].boxes
-                    confidences = boxes.conf.cpu().numpy()
-                    xyxy = boxes.xyxy.cpu().numpy()
-                    
-                    # 面積が最大のボックスを選択（弁当箱は通常最大）
-                    areas = []
-                    for box in xyxy:
-                        x1, y1, x2, y2 = box
-                        area = (x2 - x1) * (y2 - y1)
-                        areas.append(area)
-                    
-                    max_area_idx = np.argmax(areas)
-                    confidence = float(confidences[max_area_idx])
-                    
-                    x1, y1, x2, y2 = xyxy[max_area_idx]
-                    x = int(x1)
-                    y = int(y1)
-                    w = int(x2 - x1)
-                    h = int(y2 - y1)
-                    
-                    bbox = [x, y, w, h]
-                    # bbox微調整を適用（精度向上）
-                    bbox = self._refine_bbox(image, bbox)
-                    logger.info(f"低閾値検出成功: confidence={confidence:.3f}, area={areas[max_area_idx]:.0f}")
-                else:
-                    bbox = [0, 0, 0, 0]
-                    confidence = 0.0
+                bbox = [0, 0, 0, 0]
+                confidence = 0.0
                 
         except Exception as e:
             logger.error(f"YOLOv8推論エラー: {e}")
@@ -252,15 +748,99 @@ class BentoBoxDetector:
         
         return bbox, confidence, inference_time
     
-    def detect_hybrid(self, image: np.ndarray) -> Tuple[List[int], float, float]:
+    def _yolo_inference_confidence(self, config: Optional[DetectionConfig] = None) -> float:
+        """YOLO推論時に渡す閾値（通常閾値と低閾値のうち低い方）"""
+        return min(self._resolve_config(config).confidence_threshold, self.FALLBACK_CONFIDENCE)
+    
+    def _run_yolo(self, source, config: Optional[DetectionConfig] = None):
+        """
+        YOLO推論（最低閾値で1回、設定の推論サイズで実行）
+        
+        Args:
+            source: 画像(BGR) または画像のリスト
+            config: 検出設定（yolo_imgsz 省略時はモデルの既定サイズ）
+            
+        Returns:
+            画像ごとの推論結果リスト
+        """
+        kwargs = {"conf": self._yolo_inference_confidence(config), "verbose": False}
+        imgsz = self._resolve_config(config).yolo_imgsz
+        if imgsz:
+            kwargs["imgsz"] = imgsz
+        if self.yolo_backend == "pytorch":
+            # Ultralyticsの推論器はスレッドセーフではないため、複数スレッドからの推論を直列化する
+            # （ONNX Runtimeのセッションは同時実行に対応しているためロック不要）
+            with self._yolo_lock:
+                return self.yolo_model(source, **kwargs)
+        return self.yolo_model(source, **kwargs)
+    
+    def _select_yolo_box(
+        self,
+        yolo_result,
+        config: Optional[DetectionConfig] = None
+    ) -> Optional[Tuple[List[int], float]]:
+        """
+        推論済みのYOLO結果からボックスを選択
+        1. 通常閾値以上のボックスがあれば最高信頼度のものを選択
+        2. なければ低閾値以上のボックスから最大面積のものを選択（弁当箱は通常最大）
+        
+        Args:
+            yolo_result: 最低閾値で推論したUltralyticsの結果（1画像分）
+            config: 検出設定（省略時は既定の設定）
+            
+        Returns:
+            (bbox [x, y, w, h], confidence)、候補がない場合はNone
+        """
+        if yolo_result is None or len(yolo_result.boxes) == 0:
+            return None
+        
+        boxes = yolo_result.boxes
+        confidences = boxes.conf.cpu().numpy()
+        xyxy = boxes.xyxy.cpu().numpy()
+        
+        primary = np.flatnonzero(confidences >= self._resolve_config(config).confidence_threshold)
+        if primary.size > 0:
+            # 最高信頼度のボックスを選択
+            idx = primary[np.argmax(confidences[primary])]
+        else:
+            fallback = np.flatnonzero(confidences >= self.FALLBACK_CONFIDENCE)
+            if fallback.size == 0:
+                return None
+            
+            # 面積が最大のボックスを選択
+            areas = (xyxy[fallback, 2] - xyxy[fallback, 0]) * (xyxy[fallback, 3] - xyxy[fallback, 1])
+            idx = fallback[np.argmax(areas)]
+            logger.info(
+                f"通常閾値で検出なし → 低閾値({self.FALLBACK_CONFIDENCE})で選択: "
+                f"confidence={confidences[idx]:.3f}, area={areas.max():.0f}"
+            )
+        
+        # xyxy形式 (x1, y1, x2, y2) から xywh形式に変換
+        x1, y1, x2, y2 = xyxy[idx]
+        bbox = [int(x1), int(y1), int(x2 - x1), int(y2 - y1)]
+        return bbox, float(confidences[idx])
+    
+    def detect_hybrid(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None,
+        yolo_result=None,
+        stage_timings: Optional[Dict[str, float]] = None,
+        config: Optional[DetectionConfig] = None
+    ) -> Tuple[List[int], float, float]:
         """
         YOLOv8 + OpenCV 併用での検出（改良版）
         1. YOLOv8で大まかな領域を検出
         2. YOLOが成功 → ROI内でOpenCVで精密化
         3. YOLOが失敗 → OpenCV全体検出にフォールバック
+        各ステージの出力はHybridPipelineで1回だけ計算して再利用する
         
         Args:
             image: 入力画像
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            yolo_result: バッチ推論済みのYOLO結果（省略時はこの画像単体で推論）
+            stage_timings: 指定時はステージ別処理時間(ms)を書き込む
+            config: 検出設定（省略時は既定の設定）
             
         Returns:
             bbox: [x, y, w, h]
@@ -269,87 +849,105 @@ class BentoBoxDetector:
         """
         start_time = time.time()
         
-        # まずYOLOv8で検出
-        yolo_bbox, yolo_conf, _ = self.detect_yolo(image)
-        
-        # YOLOが失敗した場合、OpenCV全体検出にフォールバック
-        # 閾値を0.2まで緩和（低信頼度でもまず試す）
-        if yolo_conf < 0.2 or yolo_bbox == [0, 0, 0, 0]:
-            logger.info(f"YOLO検出失敗(conf={yolo_conf:.3f}) → OpenCVフォールバック実行")
-            opencv_bbox, opencv_conf, _ = self.detect_opencv(image)
-            inference_time = (time.time() - start_time) * 1000
-            # OpenCVの信頼度を使用（0.7 or 0.0）
-            return opencv_bbox, opencv_conf, inference_time
-        
-        # YOLOの領域を少し拡大してROIを抽出
-        x, y, w, h = yolo_bbox
-        margin = 30  # マージンを拡大（20→30）
-        x1 = max(0, x - margin)
-        y1 = max(0, y - margin)
-        x2 = min(image.shape[1], x + w + margin)
-        y2 = min(image.shape[0], y + h + margin)
-        
-        roi = image[y1:y2, x1:x2]
-        
-        # ROIが空の場合もOpenCVフォールバック
-        if roi.size == 0:
-            logger.warning("ROIサイズ0 → OpenCVフォールバック実行")
-            opencv_bbox, opencv_conf, _ = self.detect_opencv(image)
-            inference_time = (time.time() - start_time) * 1000
-            return opencv_bbox, opencv_conf, inference_time
-        
-        # ROI内でOpenCV検出して精密化
-        opencv_bbox, _, _ = self.detect_opencv(roi)
-        
-        # OpenCVが失敗した場合は元のYOLO結果を使用
-        if opencv_bbox == [0, 0, 0, 0]:
-            logger.warning("OpenCV精密化失敗 → YOLO結果を使用")
-            inference_time = (time.time() - start_time) * 1000
-            return yolo_bbox, yolo_conf, inference_time
-        
-        # 元画像の座標系に戻す
-        refined_bbox = [
-            x1 + opencv_bbox[0],
-            y1 + opencv_bbox[1],
-            opencv_bbox[2],
-            opencv_bbox[3]
-        ]
+        pipeline = HybridPipeline(self, image, analysis, yolo_result, self._resolve_config(config))
+        bbox, confidence = pipeline.run()
         
         inference_time = (time.time() - start_time) * 1000
         
-        # YOLOとOpenCVの信頼度を統合（改良版）
-        # OpenCVから実際の信頼度を取得（opencv_confを使用）
-        opencv_conf = 0.7  # デフォルト値（後で改善）
+        if stage_timings is not None:
+            stage_timings.update(pipeline.timings)
         
-        # 精密化の品質を評価（バウンディングボックスの重なり度）
-        yolo_area = yolo_bbox[2] * yolo_bbox[3]
-        refined_area = refined_bbox[2] * refined_bbox[3]
+        return bbox, confidence, inference_time
+    
+    def detect_cascade(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None,
+        stage_timings: Optional[Dict[str, float]] = None,
+        config: Optional[DetectionConfig] = None
+    ) -> Tuple[List[int], float, float, bool]:
+        """
+        カスケード検出
+        1. OpenCV（YOLOより1桁程度軽い）で検出し、品質スコアを計算
+        2. スコアが cascade_threshold 以上 → OpenCV結果を採用（信頼度 = 品質スコア）
+        3. 未満 → ハイブリッド（YOLO + OpenCV精密化）へ昇格
+        YOLOモデルがない場合は昇格せずOpenCV結果を返す
         
-        # 面積が大きく変わりすぎた場合は信頼度を下げる
-        if yolo_area > 0:
-            area_ratio = min(refined_area / yolo_area, yolo_area / refined_area)
-            quality_factor = area_ratio if area_ratio > 0.5 else 0.5
-        else:
-            quality_factor = 0.5
+        Args:
+            image: 入力画像
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            stage_timings: 指定時はステージ別処理時間(ms)を書き込む
+            config: 検出設定（省略時は既定の設定）
+            
+        Returns:
+            bbox: [x, y, w, h]
+            confidence: 信頼度
+            inference_time: 推論時間(ms)
+            escalated: ハイブリッドへ昇格したか
+        """
+        start_time = time.time()
+        config = self._resolve_config(config)
+        analysis = FrameAnalysis.of(image, analysis)
+        timings: Dict[str, float] = {}
+        
+        # OpenCV検出（エッジ画像・輪郭はフレーム解析キャッシュに残るため、昇格時も再計算しない）
+        edges = self._contour_edges(analysis)
+        contour = self._frame_contour(analysis)
+        bbox, score = [0, 0, 0, 0], 0.0
+        if contour is not None:
+            x, y, w, h = cv2.boundingRect(contour)
+            bbox = self._refine_bbox(image, [int(x), int(y), int(w), int(h)], analysis)
+        timings["cascade_opencv"] = (time.time() - start_time) * 1000
+        
+        if contour is not None:
+            quality_start = time.time()
+            score = self._opencv_quality(edges, contour, bbox)
+            timings["cascade_quality"] = (time.time() - quality_start) * 1000
+        
+        escalated = score < config.cascade_threshold and self.yolo_model is not None
+        if escalated:
+            logger.info(f"OpenCV品質スコア不足({score:.3f} < {config.cascade_threshold}) → ハイブリッドへ昇格")
+            bbox, score, _ = self.detect_hybrid(image, analysis, stage_timings=timings, config=config)
         
-        # YOLO 50% + OpenCV 50% の加重平均に品質係数を適用
-        combined_confidence = min(1.0, (yolo_conf * 0.5 + opencv_conf * 0.5) * quality_factor)
+        inference_time = (time.time() - start_time) * 1000
         
-        return refined_bbox, combined_confidence, inference_time
+        if stage_timings is not None:
+            stage_timings.update(timings)
+        
+        return bbox, score, inference_time, escalated
+    
+    @staticmethod
+    def decode_image(image_bytes: bytes) -> np.ndarray:
+        """
+        エンコード済み画像バイト列をメモリ上でデコード
+        
+        Args:
+            image_bytes: JPEG/PNG等のエンコード済みバイト列
+            
+        Returns:
+            image: デコード済み画像(BGR)
+        """
+        buffer = np.frombuffer(image_bytes, dtype=np.uint8)
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size > 0 else None
+        if image is None:
+            raise ValueError("画像のデコードに失敗しました")
+        return image
     
     def detect(
         self, 
         image_path: str, 
         mode: DetectionMode = "hybrid",
-        ground_truth: Optional[List[int]] = None
+        ground_truth: Optional[List[int]] = None,
+        config: Optional[DetectionConfig] = None
     ) -> DetectionResult:
         """
         検出実行（メイン関数）
         
         Args:
             image_path: 画像ファイルパス
-            mode: 検出モード ("opencv", "yolo", "hybrid")
+            mode: 検出モード ("opencv", "opencv_pyramid", "yolo", "hybrid", "cascade")
             ground_truth: 正解bbox [x, y, w, h] (誤差計算用)
+            config: 検出設定（省略時は既定の設定）
             
         Returns:
             DetectionResult: 検出結果
@@ -359,42 +957,218 @@ class BentoBoxDetector:
         if image is None:
             raise ValueError(f"画像の読み込みに失敗: {image_path}")
         
+        return self.detect_array(
+            image,
+            mode=mode,
+            ground_truth=ground_truth,
+            filename=Path(image_path).name,
+            config=config
+        )
+    
+    def detect_bytes(
+        self,
+        image_bytes: bytes,
+        mode: DetectionMode = "hybrid",
+        ground_truth: Optional[List[int]] = None,
+        filename: str = "image.jpg",
+        config: Optional[DetectionConfig] = None
+    ) -> DetectionResult:
+        """
+        エンコード済み画像バイト列から検出（ディスクを経由しない）
+        
+        Args:
+            image_bytes: JPEG/PNG等のエンコード済みバイト列
+            mode: 検出モード ("opencv", "opencv_pyramid", "yolo", "hybrid", "cascade")
+            ground_truth: 正解bbox [x, y, w, h] (誤差計算用)
+            filename: 結果・ログに記録するファイル名
+            config: 検出設定（省略時は既定の設定）
+            
+        Returns:
+            DetectionResult: 検出結果
+        """
+        image = self.decode_image(image_bytes)
+        return self.detect_array(
+            image, mode=mode, ground_truth=ground_truth, filename=filename, config=config
+        )
+    
+    def detect_array(
+        self,
+        image: np.ndarray,
+        mode: DetectionMode = "hybrid",
+        ground_truth: Optional[List[int]] = None,
+        filename: str = "image.jpg",
+        config: Optional[DetectionConfig] = None,
+        prior_bbox: Optional[List[int]] = None
+    ) -> DetectionResult:
+        """
+        デコード済み画像から検出
+        
+        Args:
+            image: 入力画像(BGR)
+            mode: 検出モード ("opencv", "opencv_pyramid", "yolo", "hybrid", "cascade")
+            ground_truth: 正解bbox [x, y, w, h] (誤差計算用)
+            filename: 結果・ログに記録するファイル名
+            config: 検出設定（省略時は既定の設定）
+            prior_bbox: 同じカメラの前フレームの [x, y, w, h]（opencvモードではその周辺のみ探索）
+            
+        Returns:
+            DetectionResult: 検出結果
+        """
+        if image is None or image.size == 0:
+            raise ValueError(f"画像が空です: {filename}")
+        
+        return self._detect_frame(image, mode, ground_truth, filename, config=config, prior_bbox=prior_bbox)
+    
+    def detect_batch(
+        self,
+        images: List[np.ndarray],
+        mode: DetectionMode = "hybrid",
+        ground_truths: Optional[List[Optional[Dict[str, float]]]] = None,
+        filenames: Optional[List[str]] = None,
+        config: Optional[DetectionConfig] = None
+    ) -> List[DetectionResult]:
+        """
+        複数画像をまとめて検出
+        YOLOを使うモードではN枚を1回の推論でまとめて処理し、
+        その後の精密化（OpenCV）は画像ごとに実行する
+        
+        Args:
+            images: 入力画像(BGR)のリスト
+            mode: 検出モード ("opencv", "opencv_pyramid", "yolo", "hybrid", "cascade")
+            ground_truths: 画像ごとの正解データ（誤差計算用）
+            filenames: 結果・ログに記録するファイル名のリスト
+            config: 検出設定（省略時は既定の設定）
+            
+        Returns:
+            List[DetectionResult]: 入力順の検出結果
+        """
+        if not images:
+            return []
+        
+        for i, image in enumerate(images):
+            if image is None or image.size == 0:
+                name = filenames[i] if filenames else f"batch_{i}"
+                raise ValueError(f"画像が空です: {name}")
+        
+        if ground_truths is None:
+            ground_truths = [None] * len(images)
+        if filenames is None:
+            filenames = [f"batch_{i}.jpg" for i in range(len(images))]
+        
+        # YOLOのバッチ推論（1回のforwardでN枚）
+        yolo_results = [None] * len(images)
+        yolo_time_ms = 0.0
+        if mode in ("yolo", "hybrid") and self.yolo_model is not None:
+            start_time = time.time()
+            try:
+                yolo_results = list(self._run_yolo(list(images), config))
+            except Exception as e:
+                logger.error(f"YOLOv8バッチ推論エラー（画像ごとの推論に切替）: {e}")
+                yolo_results = [None] * len(images)
+            # バッチ推論時間は各画像に均等配分
+            yolo_time_ms = (time.time() - start_time) * 1000 / len(images)
+        
+        return [
+            self._detect_frame(
+                image, mode, gt, filename,
+                yolo_result=yolo_result,
+                extra_time_ms=yolo_time_ms,
+                config=config
+            )
+            for image, gt, filename, yolo_result
+            in zip(images, ground_truths, filenames, yolo_results)
+        ]
+    
+    def _detect_frame(
+        self,
+        image: np.ndarray,
+        mode: DetectionMode,
+        ground_truth: Optional[Dict[str, float]],
+        filename: str,
+        yolo_result=None,
+        extra_time_ms: float = 0.0,
+        config: Optional[DetectionConfig] = None,
+        save_log: bool = True,
+        prior_bbox: Optional[List[int]] = None
+    ) -> DetectionResult:
+        """
+        1フレーム分の検出処理本体
+        
+        Args:
+            image: 入力画像(BGR)
+            mode: 検出モード
+            ground_truth: 正解データ（誤差計算用）
+            filename: 結果・ログに記録するファイル名
+            yolo_result: バッチ推論済みのYOLO結果
+            extra_time_ms: 推論時間に加算する時間(バッチ推論の配分)
+            config: 検出設定（省略時は既定の設定）
+            save_log: 検出ログを保存するか（ウォームアップ時はFalse）
+            prior_bbox: 前フレームの [x, y, w, h]（opencvモードのトラッキング用）
+            
+        Returns:
+            DetectionResult: 検出結果
+        """
+        config = self._resolve_config(config)
+        
+        # フレーム解析キャッシュ（グレースケール等を全ステージで共有）
+        analysis = FrameAnalysis(image)
+        
         # 自動キャリブレーション（参照カード検出）
+        # 結果はこの呼び出しの設定にのみ反映し、検出器の状態は変更しない
         if self.enable_auto_calibration and self.card_detector:
-            calibrated_ratio = self.card_detector.calculate_px_to_mm_ratio(image)
+            calibrated_ratio = self._calibrated_ratio(image, analysis, config)
             if calibrated_ratio:
-                logger.info(f"自動キャリブレーション成功: {calibrated_ratio:.4f} mm/px (元: {self.px_to_mm_ratio:.4f})")
-                self.px_to_mm_ratio = calibrated_ratio
+                logger.info(f"自動キャリブレーション成功: {calibrated_ratio:.4f} mm/px (元: {config.px_to_mm_ratio:.4f})")
+                config = config.replace(px_to_mm_ratio=calibrated_ratio)
             else:
-                logger.warning(f"自動キャリブレーション失敗、デフォルト値を使用: {self.px_to_mm_ratio:.4f} mm/px")
-        
-        # 画像メタデータ取得
-        brightness = self._calculate_brightness(image)
-        angle = self._estimate_angle(image)
+                logger.warning(f"自動キャリブレーション失敗、デフォルト値を使用: {config.px_to_mm_ratio:.4f} mm/px")
         
         # モード別検出
-        if mode == "opencv":
-            bbox, confidence, inference_time = self.detect_opencv(image)
+        stage_timings: Dict[str, float] = {}
+        escalated = False
+        tracked = False
+        if mode == "opencv" and prior_bbox:
+            bbox, confidence, inference_time, tracked = self.detect_opencv_tracked(
+                image, prior_bbox, analysis, config
+            )
+        elif mode == "opencv":
+            bbox, confidence, inference_time = self.detect_opencv(image, analysis)
+        elif mode == "opencv_pyramid":
+            bbox, confidence, inference_time = self.detect_opencv_pyramid(image, analysis, config)
         elif mode == "yolo":
-            bbox, confidence, inference_time = self.detect_yolo(image)
+            bbox, confidence, inference_time = self.detect_yolo(image, analysis, yolo_result, config)
         elif mode == "hybrid":
-            bbox, confidence, inference_time = self.detect_hybrid(image)
+            bbox, confidence, inference_time = self.detect_hybrid(
+                image, analysis, yolo_result, stage_timings=stage_timings, config=config
+            )
+        elif mode == "cascade":
+            bbox, confidence, inference_time, escalated = self.detect_cascade(
+                image, analysis, stage_timings=stage_timings, config=config
+            )
         else:
             raise ValueError(f"不正なモード: {mode}")
         
+        # バッチ推論時間の配分を加算
+        inference_time += extra_time_ms
+        if stage_timings and extra_time_ms:
+            stage_timings["yolo_inference"] = stage_timings.get("yolo_inference", 0.0) + extra_time_ms
+        
+        # 画像メタデータ取得（検出結果のbboxを角度推定に利用）
+        brightness, angle, tilt_deg = self._image_metadata(image, analysis, bbox, config.metadata_level)
+        
         # 誤差計算
         error_mm = 0.0
         if ground_truth:
-            error_mm = self._calculate_error(bbox, ground_truth)
+            error_mm = self._calculate_error(bbox, ground_truth, config.px_to_mm_ratio)
         
-        success = confidence >= self.confidence_threshold and bbox != [0, 0, 0, 0]
+        success = confidence >= config.confidence_threshold and bbox != [0, 0, 0, 0]
         
         # bboxをdict形式に変換
-        bbox_dict = self._bbox_to_dict(bbox)
+        bbox_dict = self._bbox_to_dict(bbox, config.px_to_mm_ratio)
         
         # 結果作成
         result = DetectionResult(
-            filename=Path(image_path).name,
+            filename=filename,
             timestamp=datetime.now().isoformat(),
             mode=mode,
             brightness=brightness,
@@ -403,43 +1177,235 @@ class BentoBoxDetector:
             error_mm=error_mm,
             confidence=confidence,
             bbox=bbox_dict,
-            success=success
+            success=success,
+            stage_timings_ms=stage_timings,
+            px_to_mm_ratio=config.px_to_mm_ratio,
+            escalated=escalated,
+            tilt_deg=tilt_deg,
+            tracked=tracked
         )
         
         # ログ保存
-        self._save_log(result)
+        if save_log:
+            self._save_log(result)
         
         return result
     
-    def _bbox_to_dict(self, bbox: List[int]) -> Dict[str, float]:
+    def _calibrated_ratio(
+        self,
+        image: np.ndarray,
+        analysis: FrameAnalysis,
+        config: DetectionConfig
+    ) -> Optional[float]:
+        """
+        参照カードから変換係数を計算
+        calibration_session 指定時は同じセッション・画像サイズの結果をキャッシュから再利用する
+        
+        Returns:
+            px_to_mm_ratio: 変換係数、カードが見つからない場合はNone
+        """
+        session = config.calibration_session
+        if session is not None:
+            found, ratio = self.calibration_cache.lookup(session, image.shape[:2])
+            if found:
+                return ratio
+        
+        # カードはOtsu二値化の外側輪郭から探す（弁当箱用のエッジ輪郭は境界が太り、
+        # 弁当箱自体の外形もカードと誤認しうるため共有しない）
+        ratio = self.card_detector.calculate_px_to_mm_ratio(image, analysis)
+        if session is not None:
+            self.calibration_cache.store(session, image.shape[:2], ratio)
+        return ratio
+    
+    def invalidate_calibration(self, session: Optional[str] = None) -> int:
+        """
+        キャッシュ済みのキャリブレーション結果を破棄（カメラ位置・ズームを変えた場合など）
+        
+        Args:
+            session: 対象の撮影セッション（省略時は全セッション）
+            
+        Returns:
+            破棄した件数
+        """
+        return self.calibration_cache.invalidate(session)
+    
+    def available_modes(self) -> List[DetectionMode]:
+        """現在の構成で使用できる検出モード"""
+        modes: List[DetectionMode] = ["opencv", "opencv_pyramid"]
+        if self.yolo_model is not None:
+            modes += ["yolo", "hybrid", "cascade"]
+        return modes
+    
+    def warm_up(
+        self,
+        resolutions: List[Tuple[int, int]],
+        modes: Optional[List[DetectionMode]] = None,
+        runs: int = 3
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        合成フレームで各モードを実行してウォームアップ
+        初回の推論（カーネル初期化・モデルfuse・メモリ確保）の遅延を起動時に済ませ、
+        初回(cold)と2回目以降(warm)の処理時間を記録する
+        
+        Args:
+            resolutions: ウォームアップする解像度 [(幅, 高さ), ...]
+            modes: 対象モード（省略時は使用可能な全モード）
+            runs: 各モード・解像度での実行回数（1回目がcold、残りの中央値がwarm）
+            
+        Returns:
+            {モード: {"幅x高さ": {"cold_ms": float, "warm_ms": float}}}
+        """
+        if modes is None:
+            modes = self.available_modes()
+        
+        report: Dict[str, Dict[str, Dict[str, float]]] = {}
+        for mode in modes:
+            report[mode] = {}
+            for width, height in resolutions:
+                frame = self._synthetic_frame(width, height)
+                elapsed = []
+                for _ in range(max(1, runs)):
+                    start_time = time.time()
+                    self._detect_frame(frame, mode, None, "warmup.jpg", save_log=False)
+                    elapsed.append((time.time() - start_time) * 1000)
+                
+                cold_ms = elapsed[0]
+                warm_ms = float(np.median(elapsed[1:])) if len(elapsed) > 1 else cold_ms
+                report[mode][f"{width}x{height}"] = {"cold_ms": cold_ms, "warm_ms": warm_ms}
+                logger.info(f"ウォームアップ {mode} {width}x{height}: cold={cold_ms:.1f}ms, warm={warm_ms:.1f}ms")
+        
+        return report
+    
+    @staticmethod
+    def _synthetic_frame(width: int, height: int) -> np.ndarray:
+        """ウォームアップ用の合成フレーム（暗い背景上の明るい矩形）"""
+        rng = np.random.default_rng(0)
+        frame = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+        box_w, box_h = int(width * 0.6), int(height * 0.5)
+        x1, y1 = (width - box_w) // 2, (height - box_h) // 2
+        cv2.rectangle(frame, (x1, y1), (x1 + box_w, y1 + box_h), (190, 200, 210), -1)
+        return frame
+    
+    def _bbox_to_dict(self, bbox: List[int], px_to_mm_ratio: Optional[float] = None) -> Dict[str, float]:
         """
         bboxリストをdict形式に変換（mm単位の寸法も追加）
         
         Args:
             bbox: [x, y, w, h]
+            px_to_mm_ratio: 換算係数（省略時は既定の設定）
             
         Returns:
             dict: {"x": int, "y": int, "width": int, "height": int, "width_mm": float, "height_mm": float}
         """
+        if px_to_mm_ratio is None:
+            px_to_mm_ratio = self.px_to_mm_ratio
         x, y, w, h = bbox
         return {
             "x": int(x),
             "y": int(y),
             "width": int(w),
             "height": int(h),
-            "width_mm": float(w * self.px_to_mm_ratio),
-            "height_mm": float(h * self.px_to_mm_ratio)
+            "width_mm": float(w * px_to_mm_ratio),
+            "height_mm": float(h * px_to_mm_ratio)
         }
     
-    def _calculate_brightness(self, image: np.ndarray) -> float:
+    def _image_metadata(
+        self,
+        image: np.ndarray,
+        analysis: FrameAnalysis,
+        bbox: List[int],
+        level: MetadataLevel
+    ) -> Tuple[float, float, Optional[float]]:
+        """
+        画像メタデータ（明るさ・傾き角度）を指定レベルで計算
+        angle は常に従来のHough直線の平均角度（計算しないレベルでは0.0）を表し、
+        fast の最小外接矩形による傾きは意味が異なるため tilt_deg として別に返す
+        
+        Args:
+            image: 入力画像
+            analysis: フレーム解析キャッシュ
+            bbox: 検出結果 [x, y, w, h]
+            level: 計算レベル ("none", "fast", "full")
+            
+        Returns:
+            (brightness, angle, tilt_deg)
+        """
+        if level == "none":
+            return 0.0, 0.0, None
+        if level == "fast":
+            return (
+                self._calculate_brightness_fast(image, analysis),
+                0.0,
+                self._estimate_angle_from_bbox(image, bbox, analysis)
+            )
+        if level == "full":
+            return (
+                self._calculate_brightness(image, analysis),
+                self._estimate_angle(image, analysis),
+                None
+            )
+        raise ValueError(f"不正なメタデータレベル: {level}")
+    
+    def _calculate_brightness_fast(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None,
+        max_side: int = 128
+    ) -> float:
+        """
+        サムネイル（間引き画素）から画像の明るさを推定
+        
+        Args:
+            image: 入力画像
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            max_side: サムネイルの長辺の目安(px)
+        """
+        gray = FrameAnalysis.of(image, analysis).gray
+        step = max(1, int(np.ceil(max(gray.shape[:2]) / max_side)))
+        return float(np.mean(gray[::step, ::step]))
+    
+    def _estimate_angle_from_bbox(
+        self,
+        image: np.ndarray,
+        bbox: List[int],
+        analysis: Optional[FrameAnalysis] = None
+    ) -> float:
+        """
+        検出領域内の最大輪郭の最小外接矩形から傾き角度を推定
+        画像全体のHough変換を行わないため高速
+        
+        Args:
+            image: 入力画像
+            bbox: 検出結果 [x, y, w, h]
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            
+        Returns:
+            水平からの傾き角度(度、-45〜45)。検出失敗時は0.0
+        """
+        height, width = image.shape[:2]
+        x1, y1 = max(0, bbox[0]), max(0, bbox[1])
+        x2, y2 = min(width, bbox[0] + bbox[2]), min(height, bbox[1] + bbox[3])
+        if x2 <= x1 or y2 <= y1:
+            return 0.0
+        
+        binary = FrameAnalysis.of(image, analysis).crop(x1, y1, x2, y2).otsu_binary()
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return 0.0
+        
+        (_, _), (_, _), angle = cv2.minAreaRect(max(contours, key=cv2.contourArea))
+        # OpenCVのバージョンで角度の範囲が異なるため -45〜45度に正規化
+        angle = (angle + 45.0) % 90.0 - 45.0
+        return float(angle)
+    
+    def _calculate_brightness(self, image: np.ndarray, analysis: Optional[FrameAnalysis] = None) -> float:
         """画像の明るさを計算"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = FrameAnalysis.of(image, analysis).gray
         return float(np.mean(gray))
     
-    def _estimate_angle(self, image: np.ndarray) -> float:
-        """画像の傾き角度を推定（簡易版）"""
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
+    def _estimate_angle(self, image: np.ndarray, analysis: Optional[FrameAnalysis] = None) -> float:
+        """画像の傾き角度を推定（画像全体のHough変換）"""
+        edges = FrameAnalysis.of(image, analysis).edges(50, 150)
         lines = cv2.HoughLines(edges, 1, np.pi/180, 100)
         
         if lines is not None and len(lines) > 0:
@@ -447,7 +1413,12 @@ class BentoBoxDetector:
             return float(np.mean(angles))
         return 0.0
     
-    def _refine_bbox(self, image: np.ndarray, bbox: List[int]) -> List[int]:
+    def _refine_bbox(
+        self,
+        image: np.ndarray,
+        bbox: List[int],
+        analysis: Optional[FrameAnalysis] = None
+    ) -> List[int]:
         """
         バウンディングボックスを微調整
         エッジ境界を精密化して誤差を削減
@@ -455,6 +1426,7 @@ class BentoBoxDetector:
         Args:
             image: 元画像
             bbox: [x, y, w, h]
+            analysis: フレーム解析キャッシュ（省略時はROIだけをグレースケール化）
             
         Returns:
             refined_bbox: 調整後の [x, y, w, h]
@@ -475,44 +1447,35 @@ class BentoBoxDetector:
         if roi.size == 0:
             return bbox
         
-        # グレースケール化
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        # グレースケール化（解析キャッシュがあればフレーム全体のグレースケールから切り出し、
+        # なければROIだけを変換してフレーム全体の変換を避ける）
+        if analysis is not None:
+            gray = analysis.gray[y:y+h, x:x+w]
+        else:
+            gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
         
-        # 二値化
+        # 二値化（閾値はROI内で決めるためROI単位で計算）
         _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
-        # 上下左右から非ゼロピクセルを探して境界を調整
-        # 上端調整
-        for i in range(h):
-            if np.any(binary[i, :] > 0):
-                dy = i
-                break
-        else:
-            dy = 0
+        # 行・列方向に1回ずつ射影して非ゼロピクセルを含む範囲を求める
+        rows = np.flatnonzero(binary.any(axis=1))
+        cols = np.flatnonzero(binary.any(axis=0))
         
-        # 下端調整
-        for i in range(h-1, -1, -1):
-            if np.any(binary[i, :] > 0):
-                h_new = i - dy + 1
-                break
+        # 上端・下端調整
+        if rows.size > 0:
+            dy = int(rows[0])
+            h_new = int(rows[-1]) - dy + 1
         else:
-            h_new = h - dy
+            dy = 0
+            h_new = h
         
-        # 左端調整
-        for j in range(w):
-            if np.any(binary[:, j] > 0):
-                dx = j
-                break
+        # 左端・右端調整
+        if cols.size > 0:
+            dx = int(cols[0])
+            w_new = int(cols[-1]) - dx + 1
         else:
             dx = 0
-        
-        # 右端調整
-        for j in range(w-1, -1, -1):
-            if np.any(binary[:, j] > 0):
-                w_new = j - dx + 1
-                break
-        else:
-            w_new = w - dx
+            w_new = w
         
         # 調整後の座標
         x_new = x + dx
@@ -524,13 +1487,19 @@ class BentoBoxDetector:
         
         return [int(x_new), int(y_new), int(w_new), int(h_new)]
     
-    def _calculate_error(self, pred_bbox: List[int], gt_size: Dict[str, float]) -> float:
+    def _calculate_error(
+        self,
+        pred_bbox: List[int],
+        gt_size: Dict[str, float],
+        px_to_mm_ratio: Optional[float] = None
+    ) -> float:
         """
         予測bboxサイズと正解サイズの誤差をmm単位で計算
         
         Args:
             pred_bbox: [x, y, width, height] ピクセル単位
             gt_size: {"width_mm": float, "height_mm": float} mm単位
+            px_to_mm_ratio: 換算係数（省略時は既定の設定）
             
         Returns:
             サイズ誤差（mm）
@@ -538,9 +1507,12 @@ class BentoBoxDetector:
         if pred_bbox == [0, 0, 0, 0] or not gt_size:
             return 999.0  # 検出失敗時の大きなエラー値
             
+        if px_to_mm_ratio is None:
+            px_to_mm_ratio = self.px_to_mm_ratio
+        
         # 予測サイズ（ピクセル→mm変換）
-        pred_width_mm = pred_bbox[2] * self.px_to_mm_ratio
-        pred_height_mm = pred_bbox[3] * self.px_to_mm_ratio
+        pred_width_mm = pred_bbox[2] * px_to_mm_ratio
+        pred_height_mm = pred_bbox[3] * px_to_mm_ratio
         
         # 正解サイズ
         gt_width_mm = gt_size.get("width_mm", 0.0)
@@ -555,13 +1527,9 @@ class BentoBoxDetector:
         return float(total_error)
     
     def _save_log(self, result: DetectionResult) -> None:
-        """検出結果をJSON形式でログ保存"""
-        log_file = self.log_dir / f"{result.filename}_{result.mode}_{int(time.time())}.json"
-        
-        with open(log_file, 'w', encoding='utf-8') as f:
-            json.dump(asdict(result), f, ensure_ascii=False, indent=2)
-        
-        logger.info(f"ログ保存: {log_file}")
+        """検出結果をログシンクへ送る（書き込みはバックグラウンドで実行）"""
+        if not self.log_sink.write(asdict(result)):
+            logger.debug(f"ログ未保存（キュー逼迫またはログ無効）: {result.filename}")
 
 
 if __name__ == "__main__":
@@ -575,7 +1543,7 @@ if __name__ == "__main__":
     test_image = np.zeros((480, 640, 3), dtype=np.uint8)
     cv2.imwrite("test.jpg", test_image)
     
-    for mode in ["opencv", "yolo", "hybrid"]:
+    for mode in ["opencv", "opencv_pyramid", "yolo", "hybrid", "cascade"]:
         try:
             result = detector.detect("test.jpg", mode=mode)
             print(f"\n{mode}モード:")
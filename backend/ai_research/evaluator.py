@@ -1,6 +1,6 @@
 """
 検出モデル評価モジュール
-3モード（OpenCV/YOLO/Hybrid）の精度・速度を比較
+各モード（OpenCV/YOLO/Hybrid/Cascade 等）の精度・速度を比較
 """
 
 import csv
@@ -8,10 +8,11 @@ import json
 from pathlib import Path
 from typing import Dict, List, Optional
 import numpy as np
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 import logging
+import cv2
 
-from detector import BentoBoxDetector, DetectionMode, DetectionResult
+from detector import BentoBoxDetector, DetectionConfig, DetectionMode, DetectionResult
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,6 +31,8 @@ class EvaluationMetrics:
     min_error_mm: float
     max_error_mm: float
     avg_confidence: float
+    avg_stage_timings_ms: Dict[str, float] = field(default_factory=dict)  # ステージ別平均処理時間
+    escalation_rate: float = 0.0  # ハイブリッドへ昇格した割合（カスケードモードのみ）
 
 
 class ModelEvaluator:
@@ -39,7 +42,8 @@ class ModelEvaluator:
         self, 
         detector: BentoBoxDetector,
         output_dir: str = "./outputs",
-        ground_truth_path: str = "./ground_truth.json"
+        ground_truth_path: str = "./ground_truth.json",
+        batch_size: int = 8
     ):
         """
         初期化
@@ -48,8 +52,10 @@ class ModelEvaluator:
             detector: BentoBoxDetectorインスタンス
             output_dir: 出力ディレクトリ
             ground_truth_path: 正解データファイルパス
+            batch_size: 1回の検出でまとめて処理する画像枚数（1で逐次処理）
         """
         self.detector = detector
+        self.batch_size = max(1, batch_size)
         self.output_dir = Path(output_dir)
         self.ground_truth = self._load_ground_truth(ground_truth_path)
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -80,7 +86,8 @@ class ModelEvaluator:
         self,
         image_paths: List[str],
         mode: DetectionMode,
-        ground_truths: Optional[Dict[str, List[int]]] = None
+        ground_truths: Optional[Dict[str, List[int]]] = None,
+        config: Optional[DetectionConfig] = None
     ) -> EvaluationMetrics:
         """
         単一モードでの評価
@@ -89,24 +96,14 @@ class ModelEvaluator:
             image_paths: 評価画像パスのリスト
             mode: 検出モード
             ground_truths: 正解データ {filename: [x, y, w, h]}
+            config: 検出設定（省略時は検出器の既定の設定）
             
         Returns:
             EvaluationMetrics: 評価メトリクス
         """
-        results: List[DetectionResult] = []
+        logger.info(f"{mode}モードで評価開始 ({len(image_paths)}枚, バッチサイズ: {self.batch_size})")
         
-        logger.info(f"{mode}モードで評価開始 ({len(image_paths)}枚)")
-        
-        for img_path in image_paths:
-            try:
-                filename = Path(img_path).name
-                gt = self.ground_truth.get(filename) if self.ground_truth else None
-                
-                result = self.detector.detect(img_path, mode=mode, ground_truth=gt)
-                results.append(result)
-                
-            except Exception as e:
-                logger.error(f"エラー ({img_path}): {e}")
+        results = self._run_mode(image_paths, mode, config)
         
         # メトリクス計算
         metrics = self._calculate_metrics(results, mode)
@@ -118,11 +115,90 @@ class ModelEvaluator:
         
         return metrics
     
+    def _run_mode(
+        self,
+        image_paths: List[str],
+        mode: DetectionMode,
+        config: Optional[DetectionConfig] = None,
+        detector: Optional[BentoBoxDetector] = None
+    ) -> List[DetectionResult]:
+        """
+        全画像をバッチに分けて検出
+        
+        Args:
+            image_paths: 評価画像パスのリスト
+            mode: 検出モード
+            config: 検出設定（省略時は検出器の既定の設定）
+            detector: 使用する検出器（省略時は self.detector）
+        """
+        results: List[DetectionResult] = []
+        for start in range(0, len(image_paths), self.batch_size):
+            batch_paths = image_paths[start:start + self.batch_size]
+            results.extend(self._evaluate_batch(batch_paths, mode, config, detector))
+        return results
+    
+    def _evaluate_batch(
+        self,
+        image_paths: List[str],
+        mode: DetectionMode,
+        config: Optional[DetectionConfig] = None,
+        detector: Optional[BentoBoxDetector] = None
+    ) -> List[DetectionResult]:
+        """
+        画像をまとめて読み込み、detect_batchで一括検出
+        
+        Args:
+            image_paths: バッチ内の画像パスのリスト
+            mode: 検出モード
+            config: 検出設定（省略時は検出器の既定の設定）
+            detector: 使用する検出器（省略時は self.detector）
+            
+        Returns:
+            読み込みに成功した画像の検出結果
+        """
+        detector = detector if detector is not None else self.detector
+        images = []
+        filenames = []
+        gts = []
+        for img_path in image_paths:
+            image = cv2.imread(img_path)
+            if image is None:
+                logger.error(f"エラー ({img_path}): 画像の読み込みに失敗")
+                continue
+            filename = Path(img_path).name
+            images.append(image)
+            filenames.append(filename)
+            gts.append(self.ground_truth.get(filename) if self.ground_truth else None)
+        
+        if not images:
+            return []
+        
+        try:
+            return detector.detect_batch(
+                images, mode=mode, ground_truths=gts, filenames=filenames, config=config
+            )
+        except Exception as e:
+            logger.error(f"バッチ検出エラー（1枚ずつ再実行）: {e}")
+        
+        results: List[DetectionResult] = []
+        for image, filename, gt in zip(images, filenames, gts):
+            try:
+                results.append(
+                    detector.detect_array(
+                        image, mode=mode, ground_truth=gt, filename=filename, config=config
+                    )
+                )
+            except Exception as e:
+                logger.error(f"エラー ({filename}): {e}")
+        return results
+    
     def compare_all_modes(
         self,
         image_paths: List[str],
         ground_truths: Optional[Dict[str, List[int]]] = None,
-        output_csv: str = "metrics.csv"
+        output_csv: str = "metrics.csv",
+        modes: Optional[List[DetectionMode]] = None,
+        config: Optional[DetectionConfig] = None
     ) -> Dict[DetectionMode, EvaluationMetrics]:
         """
         全モードを比較評価
@@ -131,11 +207,14 @@ class ModelEvaluator:
             image_paths: 評価画像パスのリスト
             ground_truths: 正解データ
             output_csv: 出力CSVファイル名
+            modes: 評価するモード（省略時は全モード）
+            config: 検出設定（省略時は検出器の既定の設定）
             
         Returns:
             各モードの評価メトリクス辞書
         """
-        modes: List[DetectionMode] = ["opencv", "yolo", "hybrid"]
+        if modes is None:
+            modes = ["opencv", "opencv_pyramid", "yolo", "hybrid", "cascade"]
         all_metrics: Dict[DetectionMode, EvaluationMetrics] = {}
         
         logger.info("=" * 60)
@@ -143,7 +222,7 @@ class ModelEvaluator:
         logger.info("=" * 60)
         
         for mode in modes:
-            metrics = self.evaluate_single_mode(image_paths, mode, ground_truths)
+            metrics = self.evaluate_single_mode(image_paths, mode, ground_truths, config)
             all_metrics[mode] = metrics
         
         # CSV出力
@@ -154,10 +233,185 @@ class ModelEvaluator:
         
         return all_metrics
     
+    def compare_backends(
+        self,
+        image_paths: List[str],
+        detectors: Dict[str, BentoBoxDetector],
+        modes: Optional[List[DetectionMode]] = None,
+        baseline: str = "pytorch",
+        config: Optional[DetectionConfig] = None
+    ) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """
+        YOLO推論バックエンド（PyTorch / ONNX / ONNX INT8 等）を比較評価
+        各バックエンドの処理時間・誤差と、基準バックエンドとの差・bbox一致度(IoU)を求める
+        
+        Args:
+            image_paths: 評価画像パスのリスト
+            detectors: {バックエンド名: 検出器}
+            modes: 評価するモード（省略時は yolo / hybrid）
+            baseline: 比較の基準とするバックエンド名
+            config: 検出設定（省略時は各検出器の既定の設定）
+            
+        Returns:
+            {バックエンド名: {モード: 指標}}
+        """
+        if modes is None:
+            modes = ["yolo", "hybrid"]
+        
+        summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+        baseline_results: Dict[str, Dict[str, DetectionResult]] = {}
+        
+        # 基準バックエンドを先に評価する
+        order = sorted(detectors, key=lambda name: name != baseline)
+        for name in order:
+            detector = detectors[name]
+            summary[name] = {}
+            for mode in modes:
+                logger.info(f"バックエンド比較: {name} / {mode}")
+                results = self._run_mode(image_paths, mode, config, detector)
+                metrics = self._calculate_metrics(results, mode)
+                by_file = {r.filename: r for r in results}
+                
+                entry = {
+                    "avg_inference_time_ms": metrics.avg_inference_time_ms,
+                    "avg_error_mm": metrics.avg_error_mm,
+                    "success_rate": metrics.success_rate,
+                }
+                if name == baseline:
+                    baseline_results[mode] = by_file
+                elif mode in baseline_results:
+                    base = summary[baseline][mode]
+                    ious = [
+                        self._bbox_iou(r.bbox, baseline_results[mode][f].bbox)
+                        for f, r in by_file.items() if f in baseline_results[mode]
+                    ]
+                    entry["latency_ratio"] = (
+                        metrics.avg_inference_time_ms / base["avg_inference_time_ms"]
+                        if base["avg_inference_time_ms"] > 0 else 0.0
+                    )
+                    entry["error_diff_mm"] = metrics.avg_error_mm - base["avg_error_mm"]
+                    entry["mean_iou_vs_baseline"] = float(np.mean(ious)) if ious else 0.0
+                summary[name][mode] = entry
+        
+        self._print_backend_report(summary, baseline)
+        
+        summary_file = self.output_dir / "backend_comparison.json"
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"バックエンド比較結果保存: {summary_file}")
+        
+        return summary
+    
+    @staticmethod
+    def _bbox_iou(a: Dict[str, float], b: Dict[str, float]) -> float:
+        """dict形式bbox同士のIoU"""
+        x1, y1 = max(a["x"], b["x"]), max(a["y"], b["y"])
+        x2 = min(a["x"] + a["width"], b["x"] + b["width"])
+        y2 = min(a["y"] + a["height"], b["y"] + b["height"])
+        inter = max(0, x2 - x1) * max(0, y2 - y1)
+        union = a["width"] * a["height"] + b["width"] * b["height"] - inter
+        if union <= 0:
+            # 両方とも検出なしなら一致とみなす
+            return 1.0 if a["width"] == b["width"] == 0 else 0.0
+        return inter / union
+    
+    def _print_backend_report(
+        self,
+        summary: Dict[str, Dict[str, Dict[str, float]]],
+        baseline: str
+    ) -> None:
+        """バックエンド比較レポートを表示"""
+        print("\n" + "=" * 86)
+        print(f"【YOLOバックエンド比較レポート】（基準: {baseline}）")
+        print("=" * 86)
+        print(
+            f"{'バックエンド':<12} {'モード':<8} {'平均時間(ms)':>12} {'時間比':>8} "
+            f"{'平均誤差(mm)':>12} {'誤差差(mm)':>10} {'IoU':>6} {'成功率':>8}"
+        )
+        print("-" * 86)
+        for name, modes in summary.items():
+            for mode, entry in modes.items():
+                ratio = f"{entry['latency_ratio']:.2f}x" if "latency_ratio" in entry else "-"
+                diff = f"{entry['error_diff_mm']:+.2f}" if "error_diff_mm" in entry else "-"
+                iou = f"{entry['mean_iou_vs_baseline']:.3f}" if "mean_iou_vs_baseline" in entry else "-"
+                print(
+                    f"{name:<12} {mode:<8} {entry['avg_inference_time_ms']:>12.2f} {ratio:>8} "
+                    f"{entry['avg_error_mm']:>12.2f} {diff:>10} {iou:>6} {entry['success_rate']:>8.1%}"
+                )
+        print("=" * 86 + "\n")
+    
+    def benchmark_yolo_imgsz(
+        self,
+        image_paths: List[str],
+        sizes: List[int],
+        modes: Optional[List[DetectionMode]] = None,
+        config: Optional[DetectionConfig] = None
+    ) -> Dict[int, Dict[str, Dict[str, float]]]:
+        """
+        YOLO推論サイズ(imgsz)ごとの処理時間・誤差を計測
+        プレビュー用・最終撮影用の推論サイズを、速度と精度のトレードオフを見て決めるため
+        
+        Args:
+            image_paths: 評価画像パスのリスト
+            sizes: 計測する推論サイズのリスト（例: [320, 480, 640]）
+            modes: 評価するモード（省略時は yolo / hybrid）
+            config: 検出設定（省略時は検出器の既定の設定、yolo_imgsz のみ上書き）
+            
+        Returns:
+            {imgsz: {モード: 指標}}
+        """
+        if modes is None:
+            modes = ["yolo", "hybrid"]
+        base_config = config if config is not None else self.detector.default_config
+        
+        summary: Dict[int, Dict[str, Dict[str, float]]] = {}
+        for imgsz in sizes:
+            summary[imgsz] = {}
+            for mode in modes:
+                logger.info(f"推論サイズ比較: imgsz={imgsz} / {mode}")
+                results = self._run_mode(image_paths, mode, base_config.replace(yolo_imgsz=imgsz))
+                metrics = self._calculate_metrics(results, mode)
+                summary[imgsz][mode] = {
+                    "avg_inference_time_ms": metrics.avg_inference_time_ms,
+                    "yolo_inference_ms": metrics.avg_stage_timings_ms.get("yolo_inference", 0.0),
+                    "avg_error_mm": metrics.avg_error_mm,
+                    "max_error_mm": metrics.max_error_mm,
+                    "success_rate": metrics.success_rate,
+                }
+        
+        self._print_imgsz_report(summary)
+        
+        summary_file = self.output_dir / "yolo_imgsz_benchmark.json"
+        with open(summary_file, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logger.info(f"推論サイズ比較結果保存: {summary_file}")
+        
+        return summary
+    
+    def _print_imgsz_report(self, summary: Dict[int, Dict[str, Dict[str, float]]]) -> None:
+        """推論サイズ比較レポートを表示"""
+        print("\n" + "=" * 78)
+        print("【YOLO推論サイズ(imgsz)比較レポート】")
+        print("=" * 78)
+        print(
+            f"{'imgsz':>6} {'モード':<8} {'平均時間(ms)':>12} {'YOLO(ms)':>10} "
+            f"{'平均誤差(mm)':>12} {'最大誤差(mm)':>12} {'成功率':>8}"
+        )
+        print("-" * 78)
+        for imgsz, modes in summary.items():
+            for mode, entry in modes.items():
+                yolo_ms = f"{entry['yolo_inference_ms']:.2f}" if entry["yolo_inference_ms"] else "-"
+                print(
+                    f"{imgsz:>6} {mode:<8} {entry['avg_inference_time_ms']:>12.2f} {yolo_ms:>10} "
+                    f"{entry['avg_error_mm']:>12.2f} {entry['max_error_mm']:>12.2f} {entry['success_rate']:>8.1%}"
+                )
+        print("=" * 78 + "\n")
+    
     def evaluate_folder(
         self,
         folder_path: str,
-        ground_truths: Optional[Dict[str, List[int]]] = None
+        ground_truths: Optional[Dict[str, List[int]]] = None,
+        config: Optional[DetectionConfig] = None
     ) -> Dict[str, any]:
         """
         フォルダ内の全画像を評価
@@ -165,6 +419,7 @@ class ModelEvaluator:
         Args:
             folder_path: 画像フォルダパス
             ground_truths: 正解データ
+            config: 検出設定（省略時は検出器の既定の設定）
             
         Returns:
             評価結果サマリー
@@ -185,7 +440,7 @@ class ModelEvaluator:
         logger.info(f"評価画像数: {len(image_paths)}枚")
         
         # 全モード比較
-        all_metrics = self.compare_all_modes(image_paths, ground_truths)
+        all_metrics = self.compare_all_modes(image_paths, ground_truths, config=config)
         
         # サマリー作成
         summary = {
@@ -232,6 +487,15 @@ class ModelEvaluator:
         errors = [r.error_mm for r in results if r.error_mm > 0]
         confidences = [r.confidence for r in results]
         
+        # ステージ別処理時間（実行されたステージのみ、全画像数で平均）
+        stage_totals: Dict[str, float] = {}
+        for r in results:
+            for stage, elapsed in r.stage_timings_ms.items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + elapsed
+        avg_stage_timings = {
+            stage: total / len(results) for stage, total in stage_totals.items()
+        }
+        
         return EvaluationMetrics(
             mode=mode,
             total_images=len(results),
@@ -242,7 +506,9 @@ class ModelEvaluator:
             std_error_mm=float(np.std(errors)) if errors else 0.0,
             min_error_mm=float(np.min(errors)) if errors else 0.0,
             max_error_mm=float(np.max(errors)) if errors else 0.0,
-            avg_confidence=float(np.mean(confidences))
+            avg_confidence=float(np.mean(confidences)),
+            avg_stage_timings_ms=avg_stage_timings,
+            escalation_rate=sum(r.escalated for r in results) / len(results)
         )
     
     def _save_metrics_csv(
@@ -257,9 +523,9 @@ class ModelEvaluator:
             fieldnames = [
                 'mode', 'total_images', 'success_count', 'success_rate',
                 'avg_inference_time_ms', 'avg_error_mm', 'std_error_mm',
-                'min_error_mm', 'max_error_mm', 'avg_confidence'
+                'min_error_mm', 'max_error_mm', 'avg_confidence', 'escalation_rate'
             ]
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
             
             writer.writeheader()
             for metrics in all_metrics.values():
@@ -277,13 +543,13 @@ class ModelEvaluator:
         print("=" * 70)
         
         # ヘッダー
-        print(f"{'モード':<12} {'成功率':<10} {'平均誤差(mm)':<15} {'平均時間(ms)':<15} {'信頼度':<10}")
+        print(f"{'モード':<16} {'成功率':<10} {'平均誤差(mm)':<15} {'平均時間(ms)':<15} {'信頼度':<10}")
         print("-" * 70)
         
         # 各モードの結果
         for mode, metrics in all_metrics.items():
             print(
-                f"{mode:<12} "
+                f"{mode:<16} "
                 f"{metrics.success_rate:>8.1%}  "
                 f"{metrics.avg_error_mm:>12.2f}  "
                 f"{metrics.avg_inference_time_ms:>12.2f}  "
@@ -292,6 +558,41 @@ class ModelEvaluator:
         
         print("=" * 70)
         
+        # ステージ別処理時間（ハイブリッド等、内訳があるモードのみ）
+        for mode, metrics in all_metrics.items():
+            if not metrics.avg_stage_timings_ms:
+                continue
+            print(f"\n【{mode} ステージ別平均処理時間】")
+            for stage, elapsed in sorted(
+                metrics.avg_stage_timings_ms.items(), key=lambda x: x[1], reverse=True
+            ):
+                print(f"  {stage:<18} {elapsed:>10.2f} ms")
+        
+        # ピラミッド版と原寸版OpenCVの比較
+        if "opencv" in all_metrics and "opencv_pyramid" in all_metrics:
+            full = all_metrics["opencv"]
+            pyramid = all_metrics["opencv_pyramid"]
+            speedup = (
+                full.avg_inference_time_ms / pyramid.avg_inference_time_ms
+                if pyramid.avg_inference_time_ms > 0 else 0.0
+            )
+            print("\n【opencv_pyramid vs opencv（原寸）】")
+            print(f"  平均誤差: {pyramid.avg_error_mm:.2f}mm / {full.avg_error_mm:.2f}mm "
+                  f"(差 {pyramid.avg_error_mm - full.avg_error_mm:+.2f}mm)")
+            print(f"  平均時間: {pyramid.avg_inference_time_ms:.2f}ms / {full.avg_inference_time_ms:.2f}ms "
+                  f"({speedup:.1f}x)")
+        
+        # カスケードとハイブリッドの比較（昇格率と、OpenCVで済ませたことによる時間・誤差の差）
+        if "cascade" in all_metrics and "hybrid" in all_metrics:
+            cascade = all_metrics["cascade"]
+            hybrid = all_metrics["hybrid"]
+            print("\n【cascade vs hybrid】")
+            print(f"  昇格率: {cascade.escalation_rate:.1%}")
+            print(f"  平均時間: {cascade.avg_inference_time_ms:.2f}ms / {hybrid.avg_inference_time_ms:.2f}ms "
+                  f"(削減 {hybrid.avg_inference_time_ms - cascade.avg_inference_time_ms:+.2f}ms)")
+            print(f"  平均誤差: {cascade.avg_error_mm:.2f}mm / {hybrid.avg_error_mm:.2f}mm "
+                  f"(差 {cascade.avg_error_mm - hybrid.avg_error_mm:+.2f}mm)")
+        
         # ベストモード判定
         best_accuracy = min(all_metrics.items(), key=lambda x: x[1].avg_error_mm)
         best_speed = min(all_metrics.items(), key=lambda x: x[1].avg_inference_time_ms)
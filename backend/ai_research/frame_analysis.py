@@ -0,0 +1,162 @@
+"""
+フレーム解析キャッシュモジュール
+1フレーム分の派生画像（グレースケール・ぼかし・エッジ・二値化）を
+必要になった時点で一度だけ計算し、検出の各ステージで共有する
+"""
+
+import cv2
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+
+class FrameAnalysis:
+    """1フレーム分の派生画像を遅延計算・共有するクラス"""
+
+    def __init__(self, image: np.ndarray, gray: Optional[np.ndarray] = None):
+        """
+        初期化
+
+        Args:
+            image: 入力画像(BGR)
+            gray: 計算済みのグレースケール画像（ROI切り出し時に親から引き継ぐ）
+        """
+        self.image = image
+        self._gray = gray
+        self._blurred: Dict[int, np.ndarray] = {}
+        self._edges: Dict[Tuple[int, int, int], np.ndarray] = {}
+        self._otsu: Dict[int, np.ndarray] = {}
+        self._closed_edges: Dict[Tuple[int, int, int, int], np.ndarray] = {}
+        self._contours: Dict[Tuple[int, int, int, int], Sequence[np.ndarray]] = {}
+        self._otsu_contours: Dict[int, Sequence[np.ndarray]] = {}
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """入力画像のshape"""
+        return self.image.shape
+
+    @property
+    def gray(self) -> np.ndarray:
+        """グレースケール画像"""
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def blurred(self, ksize: int) -> np.ndarray:
+        """
+        ガウシアンぼかし済みグレースケール画像
+
+        Args:
+            ksize: カーネルサイズ（0の場合はぼかしなし）
+        """
+        if ksize <= 0:
+            return self.gray
+        if ksize not in self._blurred:
+            self._blurred[ksize] = cv2.GaussianBlur(self.gray, (ksize, ksize), 0)
+        return self._blurred[ksize]
+
+    def edges(self, low: int, high: int, blur_ksize: int = 0) -> np.ndarray:
+        """
+        Cannyエッジ画像
+
+        Args:
+            low: Canny低閾値
+            high: Canny高閾値
+            blur_ksize: 前段のガウシアンぼかしのカーネルサイズ（0の場合はぼかしなし）
+        """
+        key = (low, high, blur_ksize)
+        if key not in self._edges:
+            self._edges[key] = cv2.Canny(self.blurred(blur_ksize), low, high)
+        return self._edges[key]
+
+    def closed_edges(self, low: int, high: int, blur_ksize: int = 0, close_ksize: int = 3) -> np.ndarray:
+        """
+        モルフォロジーのクロージングで途切れを連結したCannyエッジ画像
+
+        Args:
+            low: Canny低閾値
+            high: Canny高閾値
+            blur_ksize: 前段のガウシアンぼかしのカーネルサイズ（0の場合はぼかしなし）
+            close_ksize: クロージングの矩形カーネルサイズ
+        """
+        key = (low, high, blur_ksize, close_ksize)
+        if key not in self._closed_edges:
+            kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (close_ksize, close_ksize))
+            self._closed_edges[key] = cv2.morphologyEx(
+                self.edges(low, high, blur_ksize), cv2.MORPH_CLOSE, kernel
+            )
+        return self._closed_edges[key]
+
+    def edge_contours(
+        self,
+        low: int,
+        high: int,
+        blur_ksize: int = 0,
+        close_ksize: int = 3
+    ) -> Sequence[np.ndarray]:
+        """
+        クロージング済みエッジ画像の外側輪郭（RETR_EXTERNAL）
+        同じフレームで弁当箱の検出ステージが複数回走る場合（cascadeの昇格など）に輪郭抽出を共有する
+
+        Args:
+            low, high, blur_ksize, close_ksize: closed_edges と同じ
+        """
+        key = (low, high, blur_ksize, close_ksize)
+        if key not in self._contours:
+            contours, _ = cv2.findContours(
+                self.closed_edges(low, high, blur_ksize, close_ksize),
+                cv2.RETR_EXTERNAL,
+                cv2.CHAIN_APPROX_SIMPLE
+            )
+            self._contours[key] = contours
+        return self._contours[key]
+
+    def otsu_binary(self, blur_ksize: int = 0) -> np.ndarray:
+        """
+        Otsuの自動閾値による二値画像
+
+        Args:
+            blur_ksize: 前段のガウシアンぼかしのカーネルサイズ（0の場合はぼかしなし）
+        """
+        if blur_ksize not in self._otsu:
+            _, binary = cv2.threshold(
+                self.blurred(blur_ksize), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+            )
+            self._otsu[blur_ksize] = binary
+        return self._otsu[blur_ksize]
+
+    def otsu_contours(self, blur_ksize: int = 0) -> Sequence[np.ndarray]:
+        """
+        Otsu二値画像の外側輪郭（RETR_EXTERNAL）
+        参照カードの探索など二値化ベースの検出で同じ輪郭抽出結果を共有する
+
+        Args:
+            blur_ksize: otsu_binary と同じ
+        """
+        if blur_ksize not in self._otsu_contours:
+            contours, _ = cv2.findContours(
+                self.otsu_binary(blur_ksize), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+            self._otsu_contours[blur_ksize] = contours
+        return self._otsu_contours[blur_ksize]
+
+    def crop(self, x1: int, y1: int, x2: int, y2: int) -> "FrameAnalysis":
+        """
+        ROIの解析オブジェクトを生成
+        グレースケールは親フレームの切り出しを再利用する
+        （ぼかし・エッジ等は境界処理が変わるためROI上で計算し直す）
+
+        Args:
+            x1, y1, x2, y2: ROI座標
+        """
+        return FrameAnalysis(self.image[y1:y2, x1:x2], gray=self.gray[y1:y2, x1:x2])
+
+    @classmethod
+    def of(cls, image: np.ndarray, analysis: Optional["FrameAnalysis"] = None) -> "FrameAnalysis":
+        """
+        既存の解析オブジェクトがあればそれを、なければ新規に生成して返す
+
+        Args:
+            image: 入力画像(BGR)
+            analysis: 呼び出し元から渡された解析オブジェクト
+        """
+        return analysis if analysis is not None else cls(image)
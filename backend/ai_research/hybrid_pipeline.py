@@ -0,0 +1,229 @@
+"""
+ハイブリッド検出パイプライン
+YOLOv8 + OpenCV 併用モードをステージの依存グラフとして実行する
+
+    yolo_inference → yolo_select → yolo_refine ─┬→ roi_edges → roi_contour → roi_refine → combine
+                                                 └→ (YOLO失敗時) opencv_fallback
+
+各ステージの出力は1フレームにつき1回だけ計算してキャッシュし、
+後続ステージ・フォールバック経路から再利用する。
+ステージごとの処理時間も記録する。
+"""
+
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from frame_analysis import FrameAnalysis
+
+logger = logging.getLogger(__name__)
+
+EMPTY_BBOX = [0, 0, 0, 0]
+
+
+class HybridPipeline:
+    """1フレーム分のハイブリッド検出ステージを管理するクラス"""
+
+    # YOLO領域からROIを切り出す際のマージン(px)
+    ROI_MARGIN = 30
+
+    # OpenCV精密化に付与する信頼度（OpenCVは信頼度を返さないため固定値）
+    OPENCV_CONFIDENCE = 0.7
+
+    def __init__(
+        self,
+        detector,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None,
+        yolo_result=None,
+        config=None
+    ):
+        """
+        初期化
+
+        Args:
+            detector: BentoBoxDetectorインスタンス
+            image: 入力画像(BGR)
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
+            yolo_result: バッチ推論済みのYOLO結果（省略時はこの画像単体で推論）
+            config: 検出設定 DetectionConfig（省略時は検出器の既定の設定）
+        """
+        self.detector = detector
+        self.config = config if config is not None else detector.default_config
+        self.image = image
+        self.analysis = FrameAnalysis.of(image, analysis)
+        self._yolo_result = yolo_result
+        self._outputs: Dict[str, Any] = {}
+        self._refined: Dict[Tuple[int, int, int, int], List[int]] = {}
+        self.timings: Dict[str, float] = {}
+        self._nested_ms = 0.0
+
+    def _stage(self, name: str, func: Callable[[], Any]) -> Any:
+        """
+        ステージを1回だけ実行し、結果と処理時間(ms)を記録
+        処理時間は依存ステージの時間を除いた、そのステージ自身の時間
+        """
+        if name not in self._outputs:
+            outer_nested = self._nested_ms
+            self._nested_ms = 0.0
+            start_time = time.time()
+            try:
+                self._outputs[name] = func()
+            finally:
+                elapsed = (time.time() - start_time) * 1000
+                self.timings[name] = self.timings.get(name, 0.0) + elapsed - self._nested_ms
+                self._nested_ms = outer_nested + elapsed
+        return self._outputs[name]
+
+    def refine(self, bbox: List[int]) -> List[int]:
+        """
+        フレーム座標系でのbbox微調整（同じ領域は再計算しない）
+
+        Args:
+            bbox: フレーム座標系の [x, y, w, h]
+        """
+        key = tuple(bbox)
+        if key not in self._refined:
+            self._refined[key] = self.detector._refine_bbox(self.image, list(bbox), self.analysis)
+        return self._refined[key]
+
+    # ------------------------------------------------------------
+    # YOLOステージ
+    # ------------------------------------------------------------
+    def yolo_inference(self):
+        """YOLO推論（最低閾値で1回のみ・バッチ推論済みなら再利用）"""
+        def run():
+            if self._yolo_result is not None:
+                return self._yolo_result
+            if self.detector.yolo_model is None:
+                logger.error("YOLOv8モデルが読み込まれていません")
+                return None
+            results = self.detector._run_yolo(self.image, self.config)
+            return results[0] if len(results) > 0 else None
+        return self._stage("yolo_inference", run)
+
+    def yolo_box(self) -> Optional[Tuple[List[int], float]]:
+        """推論結果から選択したYOLOの生ボックス (bbox, confidence)"""
+        return self._stage("yolo_select", lambda: self.detector._select_yolo_box(self.yolo_inference(), self.config))
+
+    def yolo_refined(self) -> Tuple[List[int], float]:
+        """微調整済みのYOLOボックス (bbox, confidence)。失敗時は ([0,0,0,0], 0.0)"""
+        def run():
+            selected = self.yolo_box()
+            if selected is None:
+                return EMPTY_BBOX, 0.0
+            bbox, confidence = selected
+            return self.refine(bbox), confidence
+        return self._stage("yolo_refine", run)
+
+    # ------------------------------------------------------------
+    # ROI（OpenCV精密化）ステージ
+    # ------------------------------------------------------------
+    def roi(self) -> Tuple[int, int, int, int]:
+        """YOLO領域をマージン付きで拡大したROI座標 (x1, y1, x2, y2)"""
+        def run():
+            x, y, w, h = self.yolo_refined()[0]
+            margin = self.ROI_MARGIN
+            height, width = self.image.shape[:2]
+            return (
+                max(0, x - margin),
+                max(0, y - margin),
+                min(width, x + w + margin),
+                min(height, y + h + margin)
+            )
+        return self._stage("roi", run)
+
+    def roi_edges(self) -> np.ndarray:
+        """ROI内のエッジ画像（Canny + クロージング）"""
+        def run():
+            x1, y1, x2, y2 = self.roi()
+            return self.detector._contour_edges(self.analysis.crop(x1, y1, x2, y2))
+        return self._stage("roi_edges", run)
+
+    def roi_contour(self) -> Optional[List[int]]:
+        """ROI内の最大輪郭のbbox（フレーム座標系）"""
+        def run():
+            bbox = self.detector._largest_contour_bbox(self.roi_edges())
+            if bbox is None:
+                return None
+            x1, y1 = self.roi()[:2]
+            return [x1 + bbox[0], y1 + bbox[1], bbox[2], bbox[3]]
+        return self._stage("roi_contour", run)
+
+    def roi_refined(self) -> Optional[List[int]]:
+        """ROI内輪郭の微調整済みbbox（フレーム座標系）"""
+        def run():
+            bbox = self.roi_contour()
+            return self.refine(bbox) if bbox is not None else None
+        return self._stage("roi_refine", run)
+
+    # ------------------------------------------------------------
+    # フォールバック
+    # ------------------------------------------------------------
+    def opencv_fallback(self) -> Tuple[List[int], float]:
+        """フレーム全体でのOpenCV検出 (bbox, confidence)"""
+        def run():
+            bbox = self.detector._frame_contour_bbox(self.analysis)
+            if bbox is None:
+                return EMPTY_BBOX, 0.0
+            return self.refine(bbox), self.OPENCV_CONFIDENCE
+        return self._stage("opencv_fallback", run)
+
+    # ------------------------------------------------------------
+    # 実行
+    # ------------------------------------------------------------
+    def run(self) -> Tuple[List[int], float]:
+        """
+        ハイブリッド検出を実行
+        1. YOLOv8で大まかな領域を検出
+        2. YOLOが成功 → ROI内でOpenCVで精密化
+        3. YOLOが失敗 → OpenCV全体検出にフォールバック
+
+        Returns:
+            bbox: [x, y, w, h]
+            confidence: 信頼度
+        """
+        try:
+            yolo_bbox, yolo_conf = self.yolo_refined()
+        except Exception as e:
+            logger.error(f"YOLOv8推論エラー: {e}")
+            yolo_bbox, yolo_conf = EMPTY_BBOX, 0.0
+
+        # YOLOが失敗した場合、OpenCV全体検出にフォールバック
+        if yolo_conf < self.detector.FALLBACK_CONFIDENCE or yolo_bbox == EMPTY_BBOX:
+            logger.info(f"YOLO検出失敗(conf={yolo_conf:.3f}) → OpenCVフォールバック実行")
+            return self.opencv_fallback()
+
+        # ROIが空の場合もOpenCVフォールバック
+        x1, y1, x2, y2 = self.roi()
+        if x2 <= x1 or y2 <= y1:
+            logger.warning("ROIサイズ0 → OpenCVフォールバック実行")
+            return self.opencv_fallback()
+
+        # ROI内でOpenCV検出して精密化
+        refined_bbox = self.roi_refined()
+
+        # OpenCVが失敗した場合は元のYOLO結果を使用
+        if refined_bbox is None:
+            logger.warning("OpenCV精密化失敗 → YOLO結果を使用")
+            return yolo_bbox, yolo_conf
+
+        return refined_bbox, self._stage("combine", lambda: self._combine(yolo_bbox, yolo_conf, refined_bbox))
+
+    def _combine(self, yolo_bbox: List[int], yolo_conf: float, refined_bbox: List[int]) -> float:
+        """YOLOとOpenCVの信頼度を統合"""
+        # 精密化の品質を評価（バウンディングボックスの重なり度）
+        yolo_area = yolo_bbox[2] * yolo_bbox[3]
+        refined_area = refined_bbox[2] * refined_bbox[3]
+
+        # 面積が大きく変わりすぎた場合は信頼度を下げる
+        if yolo_area > 0:
+            area_ratio = min(refined_area / yolo_area, yolo_area / refined_area)
+            quality_factor = area_ratio if area_ratio > 0.5 else 0.5
+        else:
+            quality_factor = 0.5
+
+        # YOLO 50% + OpenCV 50% の加重平均に品質係数を適用
+        return min(1.0, (yolo_conf * 0.5 + self.OPENCV_CONFIDENCE * 0.5) * quality_factor)
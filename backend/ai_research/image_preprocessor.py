@@ -248,16 +248,44 @@ class ImagePreprocessor:
             detect_bento: お弁当箱検出を行うか
             enhance: 画質向上処理を行うか
         
+        Returns:
+            処理結果の辞書
+        """
+        # 画像読み込み
+        image = cv2.imread(str(input_path))
+        
+        if image is None:
+            logger.error(f"❌ 画像処理エラー: 画像の読み込みに失敗: {input_path}")
+            return {
+                'status': 'error',
+                'input_path': str(input_path),
+                'error': f"画像の読み込みに失敗: {input_path}"
+            }
+        
+        return self.process_image(image, output_path, detect_bento, enhance, input_path=input_path)
+    
+    def process_image(
+        self,
+        image: np.ndarray,
+        output_path: Path,
+        detect_bento: bool = True,
+        enhance: bool = True,
+        input_path: Optional[Path] = None
+    ) -> Dict[str, Any]:
+        """
+        デコード済みの画像を前処理して保存（ファイルから読み直さない）
+        
+        Args:
+            image: 入力画像(BGR)
+            output_path: 出力画像パス
+            detect_bento: お弁当箱検出を行うか
+            enhance: 画質向上処理を行うか
+            input_path: 元画像のパス（結果の記録用、省略可）
+        
         Returns:
             処理結果の辞書
         """
         try:
-            # 画像読み込み
-            image = cv2.imread(str(input_path))
-            
-            if image is None:
-                raise ValueError(f"画像の読み込みに失敗: {input_path}")
-            
             # 切り取り
             cropped, crop_info = self.auto_crop_bento(image, detect_bento=detect_bento)
             
@@ -271,12 +299,12 @@ class ImagePreprocessor:
             
             result = {
                 'status': 'success',
-                'input_path': str(input_path),
+                'input_path': str(input_path) if input_path else None,
                 'output_path': str(output_path),
                 'crop_info': crop_info
             }
             
-            logger.info(f"✅ 画像処理完了: {input_path.name} → {output_path.name}")
+            logger.info(f"✅ 画像処理完了: {input_path.name if input_path else '(メモリ上の画像)'} → {output_path.name}")
             
             return result
             
@@ -284,7 +312,7 @@ class ImagePreprocessor:
             logger.error(f"❌ 画像処理エラー: {e}")
             return {
                 'status': 'error',
-                'input_path': str(input_path),
+                'input_path': str(input_path) if input_path else None,
                 'error': str(e)
             }
     
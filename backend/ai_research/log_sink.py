@@ -0,0 +1,391 @@
+"""
+検出ログ出力モジュール
+検出結果ログを追記専用ファイル（JSONL / SQLite）へバックグラウンドスレッドで書き込む
+
+- リクエスト処理スレッドはキューへ積むだけ（ファイルI/Oを行わない）
+- 書き込みスレッドがまとめて（バッチで）追記する
+- ファイルサイズが上限を超えたらローテーション
+- キューが詰まった場合は drop / sample / block のポリシーで処理
+"""
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
+
+logger = logging.getLogger(__name__)
+
+LogSinkType = Literal["jsonl", "sqlite", "none"]
+OverflowPolicy = Literal["drop", "sample", "block"]
+
+
+class LogWriter(ABC):
+    """ログの書き込み先（write_batch はバックグラウンドスレッドから、read_recent はリクエスト処理スレッドから呼ばれる）"""
+
+    @abstractmethod
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        """レコードをまとめて追記"""
+
+    @abstractmethod
+    def read_recent(self, limit: int) -> List[Dict[str, Any]]:
+        """新しい順にレコードを取得"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """全レコードを削除"""
+
+    def close(self) -> None:
+        """書き込み先を閉じる"""
+
+
+class RotatingFileMixin:
+    """サイズベースのローテーション（base → base.1 → base.2 ...）"""
+
+    def _init_rotation(self, path: Path, max_bytes: int, backup_count: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _backup_path(self, index: int) -> Path:
+        return self.path.with_name(f"{self.path.stem}.{index}{self.path.suffix}")
+
+    def _all_paths(self) -> List[Path]:
+        """現在のファイル + バックアップ（新しい順）"""
+        return [self.path] + [self._backup_path(i) for i in range(1, self.backup_count + 1)]
+
+    def _should_rotate(self) -> bool:
+        return self.max_bytes > 0 and self.path.exists() and self.path.stat().st_size >= self.max_bytes
+
+    def _rotate_files(self) -> None:
+        """バックアップをずらし、最も古いものは削除"""
+        oldest = self._backup_path(self.backup_count)
+        if oldest.exists():
+            oldest.unlink()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self._backup_path(i)
+            if src.exists():
+                src.rename(self._backup_path(i + 1))
+        if self.path.exists():
+            if self.backup_count > 0:
+                self.path.rename(self._backup_path(1))
+            else:
+                self.path.unlink()
+        logger.info(f"ログファイルをローテーション: {self.path}")
+
+
+class JsonlLogWriter(LogWriter, RotatingFileMixin):
+    """1行1レコードのJSONLファイルへ追記"""
+
+    def __init__(self, path: Path, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        """
+        初期化
+
+        Args:
+            path: JSONLファイルパス
+            max_bytes: ローテーションするファイルサイズ(byte、0で無効)
+            backup_count: 保持するバックアップファイル数
+        """
+        self._init_rotation(Path(path), max_bytes, backup_count)
+        self._file = None
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        if self._should_rotate():
+            self.close()
+            self._rotate_files()
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in records))
+        self._file.flush()
+
+    def read_recent(self, limit: int) -> List[Dict[str, Any]]:
+        records: List[Dict[str, Any]] = []
+        for path in self._all_paths():
+            if len(records) >= limit or not path.exists():
+                break
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                # 確認後に削除・ローテーションされた場合
+                break
+            for line in reversed(lines):
+                if len(records) >= limit:
+                    break
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # 書き込み途中の行は読み飛ばす
+                    continue
+        return records
+
+    def clear(self) -> None:
+        self.close()
+        for path in self._all_paths():
+            if path.exists():
+                path.unlink()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SqliteLogWriter(LogWriter, RotatingFileMixin):
+    """SQLiteデータベースへ追記（1バッチ = 1トランザクション）"""
+
+    def __init__(self, path: Path, max_bytes: int = 50 * 1024 * 1024, backup_count: int = 3):
+        """
+        初期化
+
+        Args:
+            path: SQLiteファイルパス
+            max_bytes: ローテーションするファイルサイズ(byte、0で無効)
+            backup_count: 保持するバックアップファイル数
+        """
+        self._init_rotation(Path(path), max_bytes, backup_count)
+        self._conn: Optional[sqlite3.Connection] = None
+        # 接続は書き込みスレッドとリクエスト処理スレッド（読み出し・削除）で共有するため、使用中は常にロックを取る
+        self._conn_lock = threading.RLock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """接続を取得（_conn_lock を取った状態で呼ぶ）"""
+        if self._conn is None:
+            # 書き込みスレッドと /logs の読み出しで共有するためスレッドチェックを外す（排他は _conn_lock で行う）
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS detection_logs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "timestamp TEXT, filename TEXT, mode TEXT, record TEXT)"
+            )
+        return self._conn
+
+    def write_batch(self, records: List[Dict[str, Any]]) -> None:
+        rows = [
+            (r.get("timestamp"), r.get("filename"), r.get("mode"), json.dumps(r, ensure_ascii=False))
+            for r in records
+        ]
+        with self._conn_lock:
+            if self._should_rotate():
+                self.close()
+                self._rotate_files()
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO detection_logs (timestamp, filename, mode, record) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+
+    def read_recent(self, limit: int) -> List[Dict[str, Any]]:
+        with self._conn_lock:
+            if not self.path.exists():
+                return []
+            rows = self._connect().execute(
+                "SELECT record FROM detection_logs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def clear(self) -> None:
+        with self._conn_lock:
+            self.close()
+            for path in self._all_paths():
+                for suffix in ("", "-wal", "-shm"):
+                    target = path.with_name(path.name + suffix)
+                    if target.exists():
+                        target.unlink()
+
+    def close(self) -> None:
+        with self._conn_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class BufferedLogSink:
+    """キュー + バックグラウンドスレッドでログを非同期に書き込むシンク"""
+
+    def __init__(
+        self,
+        writer: LogWriter,
+        queue_size: int = 1000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        overflow_policy: OverflowPolicy = "drop",
+        sample_rate: float = 0.1
+    ):
+        """
+        初期化
+
+        Args:
+            writer: 書き込み先
+            queue_size: キューの最大件数
+            batch_size: 1回に書き込む最大件数
+            flush_interval: バッチが揃わなくても書き込む間隔(秒)
+            overflow_policy: キュー逼迫時の動作
+                - "drop": 満杯時に新しいレコードを破棄
+                - "sample": 半分を超えたら sample_rate の割合だけ受け付け、満杯時は破棄
+                - "block": 空くまで待つ（最大 flush_interval 秒、超えたら破棄）
+            sample_rate: "sample" ポリシーで受け付ける割合 (0〜1)
+        """
+        self.writer = writer
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.sample_rate = sample_rate
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self._clear_lock = threading.Lock()
+        self._closed = False
+        self.stats = {"written": 0, "dropped": 0, "sampled_out": 0, "errors": 0}
+
+        self._thread = threading.Thread(target=self._run, name="detection-log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """
+        レコードをキューに追加（リクエスト処理スレッドから呼ぶ）
+
+        Returns:
+            キューに追加できたかどうか
+        """
+        if self._closed:
+            return False
+
+        if self.overflow_policy == "sample" and self._queue.qsize() >= self._queue.maxsize // 2:
+            if random.random() >= self.sample_rate:
+                self._count("sampled_out")
+                return False
+
+        try:
+            if self.overflow_policy == "block":
+                self._queue.put(record, timeout=self.flush_interval)
+            else:
+                self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[key] += n
+
+    def _run(self) -> None:
+        """書き込みスレッド本体"""
+        while True:
+            batch: List[Dict[str, Any]] = []
+            stop = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is None:
+                    stop = True
+                    break
+                batch.append(record)
+
+            if batch:
+                try:
+                    self.writer.write_batch(batch)
+                    self._count("written", len(batch))
+                except Exception as e:
+                    self._count("errors", len(batch))
+                    logger.error(f"ログ書き込みエラー: {e}")
+
+            if stop:
+                break
+
+    def read_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """新しい順にレコードを取得（未書き込み分は含まない）"""
+        return self.writer.read_recent(limit)
+
+    def clear(self) -> None:
+        """全レコードを削除（書き込み中のバッチとの競合を避けるため書き込みスレッドを再起動）"""
+        with self._clear_lock:
+            self.close()
+            # close() の待ち時間上限を超えて書き込み中の場合も、終わるまで待ってから削除・再起動する
+            self._thread.join()
+            self.writer.clear()
+            self._closed = False
+            self._thread = threading.Thread(target=self._run, name="detection-log-writer", daemon=True)
+            self._thread.start()
+
+    def close(self) -> None:
+        """キューに残ったレコードを書き切って停止"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout=10)
+        self.writer.close()
+
+
+class NullLogSink:
+    """ログを保存しないシンク"""
+
+    stats: Dict[str, int] = {}
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        return False
+
+    def read_recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return []
+
+    def clear(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def create_log_sink(
+    sink_type: LogSinkType,
+    log_dir: Path,
+    max_bytes: Optional[int] = None,
+    backup_count: Optional[int] = None,
+    **buffer_options
+):
+    """
+    ログシンクを生成
+
+    Args:
+        sink_type: "jsonl" / "sqlite" / "none"
+        log_dir: ログディレクトリ
+        max_bytes: ローテーションするファイルサイズ(byte、省略時は書き込み先の既定値)
+        backup_count: 保持するバックアップファイル数（省略時は書き込み先の既定値）
+        **buffer_options: BufferedLogSink に渡すオプション
+
+    Returns:
+        ログシンク
+    """
+    log_dir = Path(log_dir)
+    rotation = {}
+    if max_bytes is not None:
+        rotation["max_bytes"] = max_bytes
+    if backup_count is not None:
+        rotation["backup_count"] = backup_count
+
+    if sink_type == "none":
+        return NullLogSink()
+    if sink_type == "jsonl":
+        writer = JsonlLogWriter(log_dir / "detections.jsonl", **rotation)
+    elif sink_type == "sqlite":
+        writer = SqliteLogWriter(log_dir / "detections.sqlite3", **rotation)
+    else:
+        raise ValueError(f"不正なログシンク: {sink_type}")
+
+    return BufferedLogSink(writer, **buffer_options)
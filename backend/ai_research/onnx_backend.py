@@ -0,0 +1,411 @@
+"""
+YOLOv8 ONNX Runtime バックエンド
+Ultralyticsの.ptモデルをONNXへ1回だけエクスポートし、CPU上のONNX Runtimeで推論する
+
+- 必要に応じて静的INT8量子化（test_images_croppedの画像でキャリブレーション）
+- 推論結果はUltralyticsの結果と同じ形（results[i].boxes.conf / .xyxy）で返すため、
+  BentoBoxDetector のボックス選択処理をそのまま使える
+"""
+
+import logging
+from pathlib import Path
+from typing import Iterator, List, Literal, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+
+# ONNX Runtime
+try:
+    import onnxruntime as ort
+    ORT_AVAILABLE = True
+except ImportError:
+    ORT_AVAILABLE = False
+
+# ONNX Runtime 静的量子化
+try:
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static
+    )
+    QUANTIZATION_AVAILABLE = True
+except ImportError:
+    CalibrationDataReader = object
+    QUANTIZATION_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+YoloBackend = Literal["pytorch", "onnx", "onnx_int8"]
+
+# Ultralyticsのレターボックスと同じパディング色
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def letterbox(image: np.ndarray, imgsz: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    アスペクト比を保って imgsz×imgsz に縮小し、余白をパディング（Ultralytics互換）
+
+    Args:
+        image: 入力画像(BGR)
+        imgsz: 推論サイズ
+
+    Returns:
+        padded: パディング済み画像
+        gain: 縮小率
+        pad: (左パディング, 上パディング)
+    """
+    height, width = image.shape[:2]
+    gain = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * gain)), int(round(height * gain))
+    pad_w, pad_h = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    top, bottom = int(round(pad_h - 0.1)), int(round(pad_h + 0.1))
+    left, right = int(round(pad_w - 0.1)), int(round(pad_w + 0.1))
+    padded = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return padded, gain, (left, top)
+
+
+def preprocess(image: np.ndarray, imgsz: int) -> Tuple[np.ndarray, float, Tuple[float, float]]:
+    """
+    ONNXモデル入力形式 (1, 3, imgsz, imgsz) float32 RGB 0〜1 に変換
+
+    Returns:
+        tensor: 入力テンソル
+        gain: 縮小率
+        pad: (左パディング, 上パディング)
+    """
+    padded, gain, pad = letterbox(image, imgsz)
+    tensor = cv2.dnn.blobFromImage(padded, scalefactor=1 / 255.0, swapRB=True)
+    return tensor, gain, pad
+
+
+class _Array:
+    """torch.Tensor の .cpu().numpy() 呼び出しに合わせたラッパー"""
+
+    def __init__(self, array: np.ndarray):
+        self._array = array
+
+    def cpu(self) -> "_Array":
+        return self
+
+    def numpy(self) -> np.ndarray:
+        return self._array
+
+
+class OnnxBoxes:
+    """Ultralyticsの Boxes 互換（conf / xyxy / cls のみ）"""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = _Array(xyxy)
+        self.conf = _Array(conf)
+        self.cls = _Array(cls)
+
+    def __len__(self) -> int:
+        return len(self.conf.numpy())
+
+
+class OnnxResult:
+    """Ultralyticsの Results 互換（boxes のみ）"""
+
+    def __init__(self, boxes: OnnxBoxes):
+        self.boxes = boxes
+
+
+class OnnxYOLO:
+    """ONNX Runtime で YOLOv8 を推論するクラス（Ultralytics YOLO と同じ呼び出し方）"""
+
+    # Ultralyticsの既定値に合わせる
+    IOU_THRESHOLD = 0.7
+    MAX_DETECTIONS = 300
+    MAX_WH = 7680  # クラス別NMS用のオフセット
+    STRIDE = 32  # 推論サイズはこの倍数
+
+    def __init__(self, onnx_path: Union[str, Path], export_imgsz: int = 640, num_threads: int = 0):
+        """
+        初期化
+
+        Args:
+            onnx_path: ONNXモデルパス
+            export_imgsz: エクスポート時の入力サイズ（呼び出しで imgsz を省略した場合の推論サイズ）
+            num_threads: ONNX Runtimeのスレッド数（0で自動）
+        """
+        if not ORT_AVAILABLE:
+            raise RuntimeError("onnxruntime がインストールされていません")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+
+        self.onnx_path = Path(onnx_path)
+        self.session = ort.InferenceSession(
+            str(self.onnx_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+        # 固定サイズでエクスポートされていればそのサイズを優先
+        # （動的サイズのモデルのみ、呼び出しごとの imgsz 指定に対応）
+        input_shape = self.session.get_inputs()[0].shape
+        self.dynamic = not isinstance(input_shape[2], int)
+        # バッチ次元が動的なモデルは複数画像を1回のRun()で推論する
+        self.dynamic_batch = not isinstance(input_shape[0], int)
+        self.export_imgsz = export_imgsz if self.dynamic else input_shape[2]
+        self._warned_sizes = set()
+
+    def __call__(
+        self,
+        source: Union[np.ndarray, List[np.ndarray]],
+        conf: float = 0.25,
+        iou: Optional[float] = None,
+        imgsz: Optional[int] = None,
+        verbose: bool = False,
+        **kwargs
+    ) -> List[OnnxResult]:
+        """
+        推論実行
+
+        Args:
+            source: 画像(BGR) または画像のリスト
+            conf: 信頼度閾値
+            iou: NMSのIoU閾値（省略時はUltralyticsの既定値）
+            imgsz: 推論サイズ（動的サイズのモデルのみ有効、32の倍数に切り上げ）
+            verbose: 互換性のため受け取るが使用しない
+
+        Returns:
+            画像ごとの結果リスト
+        """
+        images = source if isinstance(source, (list, tuple)) else [source]
+        iou = self.IOU_THRESHOLD if iou is None else iou
+        size = self._input_size(imgsz)
+
+        inputs = [preprocess(image, size) for image in images]
+        if self.dynamic_batch and len(images) > 1:
+            # レターボックス後は全画像が同じ size×size になるため連結して1回で推論
+            batch = np.concatenate([tensor for tensor, _, _ in inputs], axis=0)
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = [self.session.run(None, {self.input_name: tensor})[0][0] for tensor, _, _ in inputs]
+
+        return [
+            self._postprocess(output, image.shape[:2], gain, pad, conf, iou)
+            for output, image, (_, gain, pad) in zip(outputs, images, inputs)
+        ]
+
+    def _input_size(self, imgsz: Optional[int]) -> int:
+        """呼び出しごとの推論サイズ（固定サイズのモデルではエクスポート時のサイズ）"""
+        if not imgsz or imgsz == self.export_imgsz:
+            return self.export_imgsz
+        if self.dynamic:
+            return int(-(-imgsz // self.STRIDE) * self.STRIDE)
+        if imgsz not in self._warned_sizes:
+            self._warned_sizes.add(imgsz)
+            logger.warning(
+                f"固定サイズのONNXモデルのため imgsz={imgsz} は無視します（{self.export_imgsz}で推論）。"
+                f"サイズを切り替える場合は動的サイズでエクスポートした.onnxを指定してください"
+            )
+        return self.export_imgsz
+
+    def _postprocess(
+        self,
+        output: np.ndarray,
+        shape: Tuple[int, int],
+        gain: float,
+        pad: Tuple[float, float],
+        conf: float,
+        iou: float
+    ) -> OnnxResult:
+        """
+        YOLOv8の出力 (4 + クラス数, 候補数) をNMSして元画像座標に戻す
+
+        Args:
+            output: 1画像分のモデル出力
+            shape: 元画像の (高さ, 幅)
+            gain: レターボックスの縮小率
+            pad: レターボックスのパディング
+            conf: 信頼度閾値
+            iou: NMSのIoU閾値
+        """
+        predictions = output.T  # (候補数, 4 + クラス数)
+        scores = predictions[:, 4:]
+        class_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), class_ids]
+
+        keep = confidences > conf
+        boxes_cxcywh = predictions[keep, :4]
+        confidences = confidences[keep]
+        class_ids = class_ids[keep]
+
+        if len(confidences) == 0:
+            empty = np.zeros((0, 4), dtype=np.float32)
+            return OnnxResult(OnnxBoxes(empty, np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)))
+
+        # cx, cy, w, h → x1, y1, x2, y2
+        xyxy = np.empty_like(boxes_cxcywh)
+        xyxy[:, 0] = boxes_cxcywh[:, 0] - boxes_cxcywh[:, 2] / 2
+        xyxy[:, 1] = boxes_cxcywh[:, 1] - boxes_cxcywh[:, 3] / 2
+        xyxy[:, 2] = boxes_cxcywh[:, 0] + boxes_cxcywh[:, 2] / 2
+        xyxy[:, 3] = boxes_cxcywh[:, 1] + boxes_cxcywh[:, 3] / 2
+
+        # クラス別NMS（クラスごとに座標をずらして一括処理）
+        offset = class_ids[:, None].astype(np.float32) * self.MAX_WH
+        shifted = xyxy + offset
+        nms_boxes = np.column_stack([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]])
+        indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidences.tolist(), conf, iou)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:self.MAX_DETECTIONS]
+
+        xyxy = xyxy[indices]
+        confidences = confidences[indices]
+        class_ids = class_ids[indices]
+
+        # レターボックス座標 → 元画像座標
+        xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad[0]) / gain
+        xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad[1]) / gain
+        height, width = shape
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, width)
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, height)
+
+        return OnnxResult(OnnxBoxes(
+            xyxy.astype(np.float32),
+            confidences.astype(np.float32),
+            class_ids.astype(np.float32)
+        ))
+
+
+class ImageFolderCalibrationReader(CalibrationDataReader):
+    """フォルダ内の画像をキャリブレーションデータとして供給する"""
+
+    def __init__(self, input_name: str, image_paths: Sequence[Path], export_imgsz: int):
+        self.input_name = input_name
+        self.image_paths = list(image_paths)
+        self.export_imgsz = export_imgsz
+        self._iterator: Optional[Iterator[dict]] = None
+
+    def _inputs(self) -> Iterator[dict]:
+        for path in self.image_paths:
+            image = cv2.imread(str(path))
+            if image is None:
+                logger.warning(f"キャリブレーション画像の読み込みに失敗: {path}")
+                continue
+            tensor, _, _ = preprocess(image, self.export_imgsz)
+            yield {self.input_name: tensor}
+
+    def get_next(self) -> Optional[dict]:
+        if self._iterator is None:
+            self._iterator = self._inputs()
+        return next(self._iterator, None)
+
+    def rewind(self) -> None:
+        self._iterator = None
+
+
+def export_onnx(weights_path: Union[str, Path], export_imgsz: int = 640) -> Path:
+    """
+    .ptモデルをONNXにエクスポート（エクスポート済みで.ptより新しければ再利用）
+
+    Args:
+        weights_path: YOLOv8の.ptファイルパス
+        export_imgsz: エクスポートする入力サイズ
+
+    Returns:
+        ONNXファイルパス
+    """
+    weights_path = Path(weights_path)
+    onnx_path = weights_path.with_name(f"{weights_path.stem}_{export_imgsz}.onnx")
+
+    if onnx_path.exists() and (
+        not weights_path.exists() or onnx_path.stat().st_mtime >= weights_path.stat().st_mtime
+    ):
+        logger.info(f"エクスポート済みのONNXモデルを使用: {onnx_path}")
+        return onnx_path
+
+    from ultralytics import YOLO
+
+    logger.info(f"ONNXへエクスポート中: {weights_path} (imgsz={export_imgsz})")
+    exported = Path(YOLO(str(weights_path)).export(format="onnx", imgsz=export_imgsz, dynamic=False))
+    if exported != onnx_path:
+        exported.replace(onnx_path)
+    logger.info(f"ONNXエクスポート完了: {onnx_path}")
+    return onnx_path
+
+
+def quantize_int8(
+    onnx_path: Union[str, Path],
+    calibration_dir: Union[str, Path],
+    export_imgsz: int = 640,
+    max_images: int = 100
+) -> Path:
+    """
+    静的INT8量子化（量子化済みで元モデルより新しければ再利用）
+
+    Args:
+        onnx_path: FP32のONNXモデルパス
+        calibration_dir: キャリブレーション画像フォルダ（test_images_cropped を想定）
+        export_imgsz: エクスポート時の入力サイズ（キャリブレーション画像をこのサイズに変換）
+        max_images: キャリブレーションに使う最大画像数
+
+    Returns:
+        INT8 ONNXファイルパス
+    """
+    if not QUANTIZATION_AVAILABLE:
+        raise RuntimeError("onnxruntime.quantization が利用できません")
+
+    onnx_path = Path(onnx_path)
+    int8_path = onnx_path.with_name(f"{onnx_path.stem}_int8.onnx")
+    if int8_path.exists() and int8_path.stat().st_mtime >= onnx_path.stat().st_mtime:
+        logger.info(f"量子化済みのONNXモデルを使用: {int8_path}")
+        return int8_path
+
+    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp'}
+    image_paths = sorted(
+        p for p in Path(calibration_dir).iterdir() if p.suffix.lower() in image_extensions
+    )[:max_images] if Path(calibration_dir).exists() else []
+    if not image_paths:
+        raise RuntimeError(f"キャリブレーション画像が見つかりません: {calibration_dir}")
+
+    input_name = ort.InferenceSession(
+        str(onnx_path), providers=["CPUExecutionProvider"]
+    ).get_inputs()[0].name
+
+    logger.info(f"INT8静的量子化中: {onnx_path}（キャリブレーション画像 {len(image_paths)}枚）")
+    quantize_static(
+        str(onnx_path),
+        str(int8_path),
+        ImageFolderCalibrationReader(input_name, image_paths, export_imgsz),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+    logger.info(f"INT8量子化完了: {int8_path}")
+    return int8_path
+
+
+def load_onnx_yolo(
+    weights_path: Union[str, Path],
+    int8: bool = False,
+    calibration_dir: Union[str, Path] = "./test_images_cropped",
+    export_imgsz: int = 640,
+    num_threads: int = 0
+) -> OnnxYOLO:
+    """
+    ONNX Runtime版YOLOモデルを準備して読み込む
+
+    Args:
+        weights_path: .ptファイル（エクスポートする）または.onnxファイル（そのまま使う）
+        int8: 静的INT8量子化を行うか
+        calibration_dir: INT8キャリブレーション画像フォルダ
+        export_imgsz: .ptからエクスポートする入力サイズ（.onnx指定時は動的サイズのモデルの既定の推論サイズ）
+        num_threads: ONNX Runtimeのスレッド数（0で自動）
+
+    Returns:
+        OnnxYOLO
+    """
+    weights_path = Path(weights_path)
+    onnx_path = weights_path if weights_path.suffix == ".onnx" else export_onnx(weights_path, export_imgsz)
+    if int8:
+        onnx_path = quantize_int8(onnx_path, calibration_dir, export_imgsz)
+    return OnnxYOLO(onnx_path, export_imgsz=export_imgsz, num_threads=num_threads)
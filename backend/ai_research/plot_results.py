@@ -57,6 +57,8 @@ class ResultVisualizer:
         # カラーパレット
         self.colors = {
             'opencv': '#FF7A6E',  # コーラル
+            'opencv_pyramid': '#FFB86B',  # アプリコット
+            'cascade': '#B39DDB',  # ラベンダー
             'yolo': '#44D1C9',    # ティール
             'hybrid': '#B89CFF'   # グレープ
         }
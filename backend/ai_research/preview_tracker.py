@@ -0,0 +1,102 @@
+"""
+プレビューフレームのトラッキング状態管理
+同じクライアント（セッション）から連続して送られるプレビューフレームについて、
+直前に検出したbboxを保持し、次のフレームでその周辺だけを探索できるようにする
+
+- 一定時間フレームが来なかったセッションの状態は破棄（カメラが動いている可能性が高い）
+- セッション数の上限を超えたら最も古く更新されたものから破棄
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class PreviewTrack:
+    """1セッション分のトラッキング状態"""
+    bbox: Tuple[int, int, int, int]  # 直前フレームの (x, y, w, h)
+    image_size: Tuple[int, int]  # 直前フレームの (高さ, 幅)
+    updated_at: float
+
+    def prior_bbox(self, image_size: Tuple[int, int]) -> Optional[List[int]]:
+        """同じ解像度のフレームであれば前フレームのbboxを返す"""
+        return list(self.bbox) if tuple(image_size) == self.image_size else None
+
+
+class PreviewTracker:
+    """セッションごとの直前bboxを保持するクラス（スレッドセーフ）"""
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 2.0):
+        """
+        初期化
+
+        Args:
+            max_sessions: 保持する最大セッション数
+            ttl_seconds: この時間フレームが来なければトラッキング状態を破棄(秒)
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.ttl_seconds = ttl_seconds
+        self._tracks: "OrderedDict[str, PreviewTrack]" = OrderedDict()
+        self._lock = threading.Lock()
+        # frames: 記録したフレーム数、tracked/lost: 前フレームがあった場合にROI内で検出できた/見失った数
+        self._counters = {"frames": 0, "tracked": 0, "lost": 0}
+
+    def get(self, session_id: str) -> Optional[PreviewTrack]:
+        """セッションのトラッキング状態を取得（期限切れ・未登録は None）"""
+        with self._lock:
+            track = self._tracks.get(session_id)
+            if track is None:
+                return None
+            if time.monotonic() - track.updated_at > self.ttl_seconds:
+                del self._tracks[session_id]
+                return None
+            return track
+
+    def record(
+        self,
+        session_id: str,
+        result,
+        image_size: Tuple[int, int],
+        had_prior: bool
+    ) -> None:
+        """
+        フレームの検出結果を記録
+
+        Args:
+            session_id: セッションID
+            result: 検出結果 DetectionResult（失敗時はトラッキング状態を破棄）
+            image_size: フレームの (高さ, 幅)
+            had_prior: 前フレームのbboxを渡して検出したか
+        """
+        with self._lock:
+            self._counters["frames"] += 1
+            if had_prior:
+                self._counters["tracked" if result.tracked else "lost"] += 1
+
+            if not result.success or not result.bbox:
+                self._tracks.pop(session_id, None)
+                return
+
+            bbox = result.bbox
+            self._tracks[session_id] = PreviewTrack(
+                bbox=(int(bbox["x"]), int(bbox["y"]), int(bbox["width"]), int(bbox["height"])),
+                image_size=(int(image_size[0]), int(image_size[1])),
+                updated_at=time.monotonic()
+            )
+            self._tracks.move_to_end(session_id)
+            while len(self._tracks) > self.max_sessions:
+                self._tracks.popitem(last=False)
+
+    def reset(self, session_id: str) -> None:
+        """セッションのトラッキング状態を破棄"""
+        with self._lock:
+            self._tracks.pop(session_id, None)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """トラッキング統計"""
+        with self._lock:
+            return {**self._counters, "sessions": len(self._tracks)}
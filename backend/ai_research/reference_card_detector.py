@@ -6,9 +6,11 @@
 
 import cv2
 import numpy as np
-from typing import Optional, Tuple, List
+from typing import Optional, Sequence, Tuple, List
 import logging
 
+from frame_analysis import FrameAnalysis
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -23,12 +25,18 @@ class ReferenceCardDetector:
         'custom_card': {'width': 85.6, 'height': 54.0, 'aspect_ratio': 1.585},  # MOVE21カードなど
     }
     
-    def __init__(self, card_type: str = 'credit_card'):
+    # カードとして扱う面積の範囲（画像面積に対する割合）
+    CARD_AREA_RANGE = (0.05, 0.5)
+    # アスペクト比の許容誤差(±15%)
+    ASPECT_TOLERANCE = 0.15
+    
+    def __init__(self, card_type: str = 'credit_card', search_min_side: int = 480):
         """
         初期化
         
         Args:
             card_type: カードタイプ ('credit_card', 'business_card', 'custom_card')
+            search_min_side: 縮小画像で探索する際に短辺がこれを下回らないようにする(px、0以下で縮小しない)
         """
         if card_type not in self.STANDARD_CARD_SIZES:
             logger.warning(f"未知のカードタイプ: {card_type}、credit_cardを使用します")
@@ -36,86 +44,228 @@ class ReferenceCardDetector:
             
         self.card_type = card_type
         self.card_info = self.STANDARD_CARD_SIZES[card_type]
+        self.search_min_side = search_min_side
         logger.info(f"参照カード: {card_type} ({self.card_info['width']}mm × {self.card_info['height']}mm)")
     
-    def detect_card(self, image: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    def detect_card(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None
+    ) -> Optional[Tuple[int, int, int, int]]:
         """
         画像から参照カードを検出
+        1. ピラミッドで縮小した画像でカード候補を探索
+           （カード大の四角形はあるが候補がない場合のみ、中間レベルを飛ばして原寸で1回だけ再探索）
+        2. 縮小画像で見つけた場合は、原寸画像のカード周辺だけで輪郭を取り直して角を精密化
+        
+        原寸の輪郭は解析キャッシュのOtsu二値化・外側輪郭を使うため、同じフレームで
+        2回目以降の探索（可視化と変換係数計算など）は輪郭抽出を省略できる
         
         Args:
             image: 入力画像(BGR)
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
             
         Returns:
             (x, y, width, height) カードのバウンディングボックス、見つからない場合はNone
         """
-        # グレースケール変換
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        analysis = FrameAnalysis.of(image, analysis)
         
-        # ガウシアンブラーで滑らかに
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        coarse_level = self._search_level(image.shape[:2])
+        for level in ([coarse_level, 0] if coarse_level > 0 else [0]):
+            if level == 0:
+                # 原寸: グレースケール変換 → ガウシアンブラー(5x5) → 二値化(Otsuの自動閾値) → 外側輪郭
+                level_gray = analysis.gray
+                level_contours = analysis.otsu_contours(blur_ksize=5)
+            else:
+                level_gray = analysis.gray
+                for _ in range(level):
+                    level_gray = cv2.pyrDown(level_gray)
+                binary = FrameAnalysis(level_gray, gray=level_gray).otsu_binary(blur_ksize=5)
+                level_contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            
+            quads = self._card_sized_quads(level_contours, level_gray.shape[:2])
+            best_candidate = self._find_card_candidate(quads)
+            if best_candidate is None:
+                # カードが写っていないフレームが多いため、縮小画像にカード大の四角形が1つもなければ
+                # 原寸での再探索を行わない（四角形はあるが縦横比が外れた場合のみ原寸で探し直す）
+                if not quads:
+                    break
+                continue
+            
+            x, y, w, h = best_candidate['bbox']
+            if level > 0:
+                x, y, w, h = self._refine_card_bbox(analysis, (x, y, w, h), level_gray.shape[:2])
+            
+            logger.info(
+                f"参照カード検出: ({x}, {y}, {w}, {h}), アスペクト比: {best_candidate['aspect_ratio']:.3f}"
+                f"（探索レベル: {level}）"
+            )
+            return (x, y, w, h)
         
-        # 二値化(Otsuの自動閾値)
-        _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        logger.warning("参照カードが検出できませんでした")
+        return None
+    
+    def _search_level(self, shape: Tuple[int, int]) -> int:
+        """
+        探索を開始するピラミッドの縮小レベル
+        縮小後の短辺がsearch_min_side以上になる最大レベル
         
-        # 輪郭検出
-        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        Args:
+            shape: 画像の (高さ, 幅)
+        """
+        if self.search_min_side <= 0:
+            return 0
+        level = 0
+        short_side = min(shape)
+        while short_side / 2 ** (level + 1) >= self.search_min_side:
+            level += 1
+        return level
+    
+    def _card_sized_quads(
+        self,
+        contours: Sequence[np.ndarray],
+        shape: Tuple[int, int]
+    ) -> List[Tuple[int, int, int, int]]:
+        """
+        輪郭からカード大の四角形（縦横比は問わない）を抽出
         
-        # カード候補を探す
-        card_candidates = []
+        Args:
+            contours: 輪郭のリスト
+            shape: 輪郭を抽出した画像の (高さ, 幅)
+            
+        Returns:
+            四角形のバウンディングボックス (x, y, w, h) のリスト
+        """
+        image_area = shape[0] * shape[1]
+        min_area = image_area * self.CARD_AREA_RANGE[0]
+        max_area = image_area * self.CARD_AREA_RANGE[1]
         
+        quads = []
         for contour in contours:
+            # 近似多角形の頂点は輪郭上の点なので、そのbboxは輪郭のbbox以下になる
+            # 輪郭のbboxの時点で小さすぎるもの（ノイズ）は近似を行わずに除外
+            _, _, cw, ch = cv2.boundingRect(contour)
+            if cw * ch < min_area:
+                continue
+            
             # 輪郭を四角形で近似
             epsilon = 0.02 * cv2.arcLength(contour, True)
             approx = cv2.approxPolyDP(contour, epsilon, True)
             
             # 四角形であることを確認
-            if len(approx) == 4:
-                x, y, w, h = cv2.boundingRect(approx)
-                
-                # サイズフィルタリング(小さすぎる・大きすぎるものを除外)
-                image_area = image.shape[0] * image.shape[1]
-                contour_area = w * h
-                
-                if contour_area < image_area * 0.05 or contour_area > image_area * 0.5:
-                    continue
-                
-                # アスペクト比チェック
-                aspect_ratio = w / h if w > h else h / w
-                expected_ratio = self.card_info['aspect_ratio']
-                
-                # 許容誤差 ±15%
-                if abs(aspect_ratio - expected_ratio) / expected_ratio < 0.15:
-                    # 候補として追加(面積も記録)
-                    card_candidates.append({
-                        'bbox': (x, y, w, h),
-                        'area': contour_area,
-                        'aspect_ratio': aspect_ratio,
-                        'score': abs(aspect_ratio - expected_ratio)  # 理想値との差
-                    })
+            if len(approx) != 4:
+                continue
+            
+            x, y, w, h = cv2.boundingRect(approx)
+            
+            # サイズフィルタリング(小さすぎる・大きすぎるものを除外)
+            if min_area <= w * h <= max_area:
+                quads.append((x, y, w, h))
+        return quads
+    
+    def _find_card_candidate(self, quads: Sequence[Tuple[int, int, int, int]]) -> Optional[dict]:
+        """
+        カード大の四角形からアスペクト比がカードに合う候補を探す
+        
+        Args:
+            quads: _card_sized_quads の結果
+            
+        Returns:
+            最もアスペクト比が理想値に近い候補（bbox, area, aspect_ratio, score）、なければNone
+        """
+        expected_ratio = self.card_info['aspect_ratio']
+        
+        # カード候補を探す
+        card_candidates = []
+        
+        for x, y, w, h in quads:
+            # アスペクト比チェック
+            aspect_ratio = w / h if w > h else h / w
+            if abs(aspect_ratio - expected_ratio) / expected_ratio < self.ASPECT_TOLERANCE:
+                # 候補として追加(面積も記録)
+                card_candidates.append({
+                    'bbox': (x, y, w, h),
+                    'area': w * h,
+                    'aspect_ratio': aspect_ratio,
+                    'score': abs(aspect_ratio - expected_ratio)  # 理想値との差
+                })
         
         if not card_candidates:
-            logger.warning("参照カードが検出できませんでした")
             return None
         
         # 最もスコアの良い候補を選択
-        best_candidate = min(card_candidates, key=lambda c: c['score'])
-        x, y, w, h = best_candidate['bbox']
+        return min(card_candidates, key=lambda c: c['score'])
+    
+    def _refine_card_bbox(
+        self,
+        analysis: FrameAnalysis,
+        coarse_bbox: Tuple[int, int, int, int],
+        coarse_shape: Tuple[int, int]
+    ) -> Tuple[int, int, int, int]:
+        """
+        縮小画像で見つけたカードの角を原寸画像で精密化
+        カード周辺（縮小率に応じた余白付き）だけを二値化して四角形を近似し直す
+        
+        Args:
+            analysis: 原寸画像のフレーム解析キャッシュ
+            coarse_bbox: 縮小画像上の (x, y, w, h)
+            coarse_shape: 縮小画像の (高さ, 幅)
+            
+        Returns:
+            原寸画像上の (x, y, w, h)（精密化できない場合は縮小bboxを拡大したもの）
+        """
+        gray = analysis.gray
+        scale_x = gray.shape[1] / coarse_shape[1]
+        scale_y = gray.shape[0] / coarse_shape[0]
+        
+        cx, cy, cw, ch = coarse_bbox
+        x1, y1 = int(round(cx * scale_x)), int(round(cy * scale_y))
+        x2, y2 = int(round((cx + cw) * scale_x)), int(round((cy + ch) * scale_y))
+        scaled = (x1, y1, x2 - x1, y2 - y1)
+        
+        # 縮小画像での1〜2px分の誤差 + ブラーの広がりを許容する余白
+        margin = int(np.ceil(2 * max(scale_x, scale_y))) + 4
+        rx1, ry1 = max(0, x1 - margin), max(0, y1 - margin)
+        rx2, ry2 = min(gray.shape[1], x2 + margin), min(gray.shape[0], y2 + margin)
+        
+        roi = cv2.GaussianBlur(gray[ry1:ry2, rx1:rx2], (5, 5), 0)
+        _, binary = cv2.threshold(roi, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return scaled
+        
+        contour = max(contours, key=cv2.contourArea)
+        epsilon = 0.02 * cv2.arcLength(contour, True)
+        approx = cv2.approxPolyDP(contour, epsilon, True)
+        if len(approx) != 4:
+            return scaled
         
-        logger.info(f"参照カード検出: ({x}, {y}, {w}, {h}), アスペクト比: {best_candidate['aspect_ratio']:.3f}")
+        x, y, w, h = cv2.boundingRect(approx)
+        refined = (x + rx1, y + ry1, w, h)
         
-        return (x, y, w, h)
+        # 周辺の別の物体と繋がった場合などは縮小bboxを使う
+        if any(abs(a - b) > margin for a, b in zip(
+            (refined[0], refined[1], refined[0] + w, refined[1] + h), (x1, y1, x2, y2)
+        )):
+            return scaled
+        return refined
     
-    def calculate_px_to_mm_ratio(self, image: np.ndarray) -> Optional[float]:
+    def calculate_px_to_mm_ratio(
+        self,
+        image: np.ndarray,
+        analysis: Optional[FrameAnalysis] = None
+    ) -> Optional[float]:
         """
         参照カードを使ってpx_to_mm_ratioを計算
         
         Args:
             image: 入力画像(BGR)
+            analysis: フレーム解析キャッシュ（省略時は新規生成）
             
         Returns:
             px_to_mm_ratio: 計算された変換係数、失敗時はNone
         """
-        card_bbox = self.detect_card(image)
+        card_bbox = self.detect_card(image, analysis)
         
         if card_bbox is None:
             return None
@@ -153,7 +303,8 @@ class ReferenceCardDetector:
         Returns:
             成功したかどうか
         """
-        card_bbox = self.detect_card(image)
+        analysis = FrameAnalysis(image)
+        card_bbox = self.detect_card(image, analysis)
         
         if card_bbox is None:
             return False
@@ -167,7 +318,7 @@ class ReferenceCardDetector:
                    (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
         # 変換係数を計算して表示
-        px_to_mm_ratio = self.calculate_px_to_mm_ratio(image)
+        px_to_mm_ratio = self.calculate_px_to_mm_ratio(image, analysis)
         if px_to_mm_ratio:
             cv2.putText(result_image, f"Ratio: {px_to_mm_ratio:.4f} mm/px", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
@@ -11,6 +11,7 @@ import logging
 import json
 import re
 from datetime import datetime
+from typing import List, Optional
 
 from detector import BentoBoxDetector
 from evaluator import ModelEvaluator
@@ -238,7 +239,10 @@ def run_comparison_experiment(
     confidence_threshold: float = 0.5,
     generate_graphs: bool = True,
     experiment_name: str = "Comparison Experiment",
-    px_to_mm_ratio: float = 0.1862
+    px_to_mm_ratio: float = 0.1862,
+    batch_size: int = 8,
+    compare_backends: Optional[List[str]] = None,
+    imgsz_sweep: Optional[List[int]] = None
 ):
     """
     3モード比較実験を実行
@@ -251,6 +255,9 @@ def run_comparison_experiment(
         generate_graphs: グラフ生成フラグ
         experiment_name: 実験名
         px_to_mm_ratio: ピクセル→mm変換係数
+        batch_size: 評価時のバッチサイズ
+        compare_backends: PyTorchと比較するYOLOバックエンド（例: ["onnx", "onnx_int8"]）
+        imgsz_sweep: 比較するYOLO推論サイズ（例: [320, 480, 640]）
     """
     print_banner()
     
@@ -294,7 +301,7 @@ def run_comparison_experiment(
     # 3. 評価実行
     print("🔍 STEP 3: 3モード比較評価開始...")
     print("-" * 70)
-    evaluator = ModelEvaluator(detector, output_dir=numbered_output_dir)
+    evaluator = ModelEvaluator(detector, output_dir=numbered_output_dir, batch_size=batch_size)
     
     try:
         summary = evaluator.evaluate_folder(folder_path)
@@ -320,6 +327,43 @@ def run_comparison_experiment(
     
     print("\n" + "=" * 70)
     
+    folder = Path(folder_path)
+    image_paths = sorted(
+        str(p) for p in folder.iterdir()
+        if p.suffix.lower() in {'.jpg', '.jpeg', '.png', '.bmp'}
+    )
+    
+    # 4.5 YOLOバックエンド比較（PyTorch vs ONNX / ONNX INT8）
+    if compare_backends:
+        print("\n⚡ YOLOバックエンド比較（PyTorch基準）...")
+        detectors = {"pytorch": detector}
+        for backend in compare_backends:
+            backend_detector = BentoBoxDetector(
+                yolo_weights_path=yolo_weights,
+                confidence_threshold=confidence_threshold,
+                output_dir=numbered_output_dir,
+                px_to_mm_ratio=px_to_mm_ratio,
+                enable_auto_calibration=True,
+                card_type='custom_card',
+                log_sink=detector.log_sink,
+                yolo_backend=backend
+            )
+            if backend_detector.yolo_backend != backend:
+                print(f"⚠️ {backend} バックエンドを準備できなかったためスキップします")
+                continue
+            detectors[backend] = backend_detector
+        
+        if len(detectors) > 1:
+            evaluator.compare_backends(image_paths, detectors)
+    
+    # 4.6 YOLO推論サイズ比較（プレビュー/最終撮影の imgsz 決定用）
+    if imgsz_sweep:
+        if detector.yolo_model is None:
+            print("⚠️ YOLOモデルが読み込まれていないため推論サイズ比較をスキップします")
+        else:
+            print("\n📐 YOLO推論サイズ(imgsz)比較...")
+            evaluator.benchmark_yolo_imgsz(image_paths, imgsz_sweep)
+    
     # 5. グラフ生成
     if generate_graphs:
         print("\n📈 STEP 5: グラフ生成...")
@@ -442,6 +486,27 @@ def main():
         help='弁当箱の奥行き（mm）（デフォルト: 110.0）'
     )
     
+    parser.add_argument(
+        '--compare-backends',
+        type=str,
+        default=None,
+        help='PyTorchと比較するYOLOバックエンド（カンマ区切り、例: onnx,onnx_int8）'
+    )
+    
+    parser.add_argument(
+        '--imgsz-sweep',
+        type=str,
+        default=None,
+        help='処理時間・誤差を比較するYOLO推論サイズ（カンマ区切り、例: 320,480,640）'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=8,
+        help='評価時にYOLOへまとめて渡す画像枚数（デフォルト: 8、1で逐次処理）'
+    )
+    
     args = parser.parse_args()
     
     # フォルダ存在確認
@@ -482,7 +547,10 @@ def main():
         confidence_threshold=args.confidence,
         generate_graphs=not args.no_graphs,
         experiment_name=args.experiment_name,
-        px_to_mm_ratio=px_to_mm_ratio
+        px_to_mm_ratio=px_to_mm_ratio,
+        batch_size=args.batch_size,
+        compare_backends=args.compare_backends.split(',') if args.compare_backends else None,
+        imgsz_sweep=[int(size) for size in args.imgsz_sweep.split(',')] if args.imgsz_sweep else None
     )
 
 
@@ -0,0 +1,95 @@
+"""
+検出結果キャッシュ
+同じ画像バイト列・同じ検出設定のリクエスト（クライアントの再送・同一撮影の再送信）で
+YOLO/OpenCVを再実行しないよう、画像内容のハッシュをキーに検出結果を保持する
+
+- 件数上限を超えたら最も長く使われていないものから破棄（LRU）
+- TTLを過ぎたエントリは参照時に破棄
+- ヒット/ミス/破棄の件数を記録
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+CacheKey = Tuple[str, Hashable]
+
+
+class DetectionResultCache:
+    """画像内容 + 検出設定をキーにしたLRU/TTLキャッシュ（スレッドセーフ）"""
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 600.0):
+        """
+        初期化
+
+        Args:
+            max_entries: 保持する最大件数（検出結果は数KBのため件数でメモリを制限する）
+            ttl_seconds: エントリの有効期間(秒、0以下で無期限)
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def make_key(image_bytes: bytes, *params: Hashable) -> CacheKey:
+        """
+        キャッシュキーを作成
+
+        Args:
+            image_bytes: エンコード済み画像バイト列
+            *params: 結果に影響する検出設定（モード・閾値・弁当サイズ・キャリブレーション等）
+
+        Returns:
+            (画像ハッシュ, 設定) のタプル
+        """
+        digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+        return digest, params
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """キャッシュ済みの値を取得（なければ None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+
+            stored_at, value = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return value
+
+    def put(self, key: CacheKey, value: Any) -> None:
+        """値を保存（上限を超えたら最も古く使われたものを破棄）"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """全エントリを削除（カウンタは保持）"""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """ヒット/ミス等の統計"""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,56 @@
+"""
+アドミッション制御のテスト
+受付上限・プレビューの間引き・縮退モードの切り替えを確認する
+"""
+
+from admission import AdmissionController
+
+
+def test_rejects_over_limit_until_released():
+    controller = AdmissionController({"detect": 2})
+
+    assert controller.try_admit("detect") is None
+    assert controller.try_admit("detect") is None
+    rejection = controller.try_admit("detect")
+    controller.release("detect", 2500.0)
+
+    assert rejection is not None and rejection.status_code == 503
+    assert controller.try_admit("detect") is None
+    assert controller.stats["endpoints"]["detect"]["rejected"] == 1
+
+
+def test_retry_after_follows_recent_latency():
+    controller = AdmissionController({"detect": 1}, smoothing=1.0)
+    controller.try_admit("detect")
+    controller.release("detect", 2500.0)
+    controller.try_admit("detect")
+
+    assert controller.try_admit("detect").retry_after == 3
+
+
+def test_previews_are_shed_before_final_shots():
+    controller = AdmissionController({"detect": 4}, preview_shed_ratio=0.5)
+    controller.try_admit("detect")
+    controller.try_admit("detect")
+
+    rejection = controller.try_admit("detect", is_preview=True)
+
+    assert rejection is not None and rejection.status_code == 429
+    assert controller.try_admit("detect") is None
+
+
+def test_degrade_mode_has_hysteresis():
+    controller = AdmissionController(
+        {"detect": 4}, degrade_queue_wait_ms=500.0, recover_queue_wait_ms=100.0, smoothing=1.0
+    )
+
+    controller.record_queue_wait("detect", 600.0)
+    assert controller.degrade_mode("hybrid") == "opencv"
+    assert controller.degrade_mode("yolo") == "yolo"
+
+    # 戻る閾値を下回るまでは縮退を続ける
+    controller.record_queue_wait("detect", 300.0)
+    assert controller.degraded
+    controller.record_queue_wait("detect", 50.0)
+    assert controller.degrade_mode("cascade") == "cascade"
+    assert controller.stats["degrade_events"] == 1 and controller.stats["recover_events"] == 1
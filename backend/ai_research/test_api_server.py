@@ -0,0 +1,289 @@
+"""
+APIサーバーのテスト
+起動設定をテスト用に差し替えて TestClient で各エンドポイントを呼び出す（YOLOなし・ウォームアップなし）
+"""
+
+import asyncio
+import base64
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import pytest
+from fastapi.testclient import TestClient
+
+import api_server
+from test_detector_parity import StubYOLO
+from test_reference_card_detector import create_card_and_bento_image
+
+
+SAMPLE_IMAGE = Path(__file__).parent / "test_bento.jpg"
+
+
+@pytest.fixture
+def configure(tmp_path, monkeypatch):
+    """起動前に設定（モジュール定数）を差し替える"""
+    monkeypatch.setattr(api_server, "OUTPUT_DIR", tmp_path / "outputs")
+    monkeypatch.setattr(api_server, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(api_server, "MODELS_DIR", tmp_path / "models")
+    monkeypatch.setattr(api_server, "TEST_IMAGES_DIR", tmp_path / "test_images")
+    monkeypatch.setattr(api_server, "TEST_IMAGES_CROPPED_DIR", tmp_path / "test_images_cropped")
+    monkeypatch.setattr(api_server, "YOLO_WEIGHTS_PATH", None)
+    monkeypatch.setattr(api_server, "LOG_SINK", "none")
+    monkeypatch.setattr(api_server, "WARMUP_ENABLED", False)
+    monkeypatch.setattr(api_server, "DETECTOR_WORKERS", 0)
+    monkeypatch.chdir(tmp_path)  # 研究用データの保存先（./test_images）
+
+    def apply(**settings):
+        for name, value in settings.items():
+            monkeypatch.setattr(api_server, name, value)
+
+    return apply
+
+
+@pytest.fixture
+def client(configure):
+    with TestClient(api_server.app) as client:
+        yield client
+
+
+def encode(image) -> bytes:
+    ok, buffer = cv2.imencode(".jpg", image)
+    assert ok
+    return buffer.tobytes()
+
+
+def upload(image_data: bytes, **params) -> dict:
+    """detect_upload をイベントループ外から1回呼ぶ"""
+    return asyncio.run(api_server.detect_upload(
+        image_data, params.pop("mode", "opencv"), params.pop("filename", "image.jpg"), 0.5,
+        None, None, None, **params
+    ))
+
+
+def test_result_cache_hit_returns_independent_copy(client):
+    image_data = SAMPLE_IMAGE.read_bytes()
+
+    first, _, _ = upload(image_data, filename="first.jpg")
+    first.bbox["x"] = -1
+    first.stage_timings_ms["mutated"] = 1.0
+    second, _, decoded = upload(image_data, filename="second.jpg")
+    second.bbox["y"] = -1
+    third, _, _ = upload(image_data, filename="third.jpg")
+
+    assert api_server.result_cache.stats["hits"] == 2
+    assert decoded is None
+    assert third.filename == "third.jpg"
+    assert third.bbox["x"] != -1 and third.bbox["y"] != -1
+    assert "mutated" not in third.stage_timings_ms
+
+
+def test_result_cache_does_not_outlive_calibration(configure):
+    configure(ENABLE_AUTO_CALIBRATION=True, CARD_CALIBRATION_TTL=300.0)
+    image_data = encode(create_card_and_bento_image())
+
+    with TestClient(api_server.app):
+        calibration = api_server.detector.calibration_cache
+        upload(image_data, session_id="camera-1")
+        upload(image_data, session_id="camera-1")
+        assert api_server.result_cache.stats["hits"] == 1
+
+        # キャリブレーション結果の有効期限切れ後は、キャッシュ済みの検出結果を返さずカードを検出し直す
+        for entry in calibration._entries.values():
+            entry.stored_at -= 301.0
+        result, _, _ = upload(image_data, session_id="camera-1")
+
+        assert api_server.result_cache.stats["hits"] == 1
+        assert calibration.stats["stale"] == 1
+        assert result.px_to_mm_ratio != 1.0
+
+
+def occupy(kind: str, count: int) -> None:
+    """受付枠を count 件分使用中にする"""
+    for _ in range(count):
+        assert api_server.admission.try_admit(kind) is None
+
+
+def test_detect_over_limit_is_rejected_before_body_parsing(configure):
+    configure(DETECT_MAX_IN_FLIGHT=1)
+
+    with TestClient(api_server.app) as client:
+        occupy("detect", 1)
+        # 解析できないマルチパート本文でも、本文を読む前に 503 で断る
+        response = client.post(
+            "/detect", content=b"not multipart",
+            headers={"Content-Type": "multipart/form-data; boundary=x"}
+        )
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert api_server.admission.stats["endpoints"]["detect"]["rejected"] == 1
+
+
+def test_preview_is_shed_with_429_before_final_shots(configure):
+    configure(DETECT_MAX_IN_FLIGHT=2, PREVIEW_SHED_RATIO=0.5)
+    image_data = SAMPLE_IMAGE.read_bytes()
+
+    with TestClient(api_server.app) as client:
+        occupy("detect", 1)
+        preview = client.post("/detect/raw?mode=opencv&is_preview=true", content=image_data)
+        final = client.post("/detect/raw?mode=opencv", content=image_data)
+        stats = api_server.admission.stats["endpoints"]["detect"]
+
+    assert preview.status_code == 429
+    assert int(preview.headers["Retry-After"]) >= 1
+    assert final.status_code == 200
+    assert stats["shed_previews"] == 1
+    assert stats["in_flight"] == 1  # 受け付けた最終撮影は応答後に解放される
+
+
+def test_oversized_body_is_rejected_by_content_length(configure):
+    configure(MAX_UPLOAD_MB=0.001)
+
+    with TestClient(api_server.app) as client:
+        response = client.post("/detect/raw?mode=opencv", content=SAMPLE_IMAGE.read_bytes())
+
+    assert response.status_code == 413
+    assert api_server.admission.stats["endpoints"]["detect"]["admitted"] == 0
+
+
+def test_saturated_preprocess_executor_does_not_delay_detect(configure):
+    configure(PREPROCESS_EXECUTOR_THREADS=1)
+    image_data = SAMPLE_IMAGE.read_bytes()
+
+    with TestClient(api_server.app) as client:
+        # 前処理の唯一のスレッドを塞ぎ、もう1件を順番待ちにする
+        release = threading.Event()
+        blocker = api_server.executors["preprocess"].submit(release.wait)
+        threading.Timer(5.0, release.set).start()  # 検出が前処理を待ってしまう場合もテストを止めない
+        queued = threading.Thread(target=asyncio.run, args=(api_server.run_blocking("preprocess", time.sleep, 0),))
+        queued.start()
+        try:
+            response = client.post("/detect/raw?mode=opencv", content=image_data)
+            preprocess_blocked = not blocker.done()
+            time.sleep(0.2)
+        finally:
+            release.set()
+            queued.join(10.0)
+        endpoints = api_server.admission.stats["endpoints"]
+
+    assert response.status_code == 200
+    assert preprocess_blocked
+    # 順番待ち時間は種別ごとに記録される（前処理の待ちは検出に影響しない）
+    assert endpoints["preprocess"]["queue_wait_ms"] > 10.0
+    assert endpoints["detect"]["queue_wait_ms"] < endpoints["preprocess"]["queue_wait_ms"]
+
+
+def test_ready_returns_503_until_warmup_finishes(configure, monkeypatch):
+    configure(WARMUP_ENABLED=True, WARMUP_RESOLUTIONS=[(320, 240)], WARMUP_RUNS=2)
+    release = threading.Event()
+    original_warm_up = api_server.BentoBoxDetector.warm_up
+
+    def blocking_warm_up(self, *args, **kwargs):
+        release.wait(10.0)
+        return original_warm_up(self, *args, **kwargs)
+
+    monkeypatch.setattr(api_server.BentoBoxDetector, "warm_up", blocking_warm_up)
+
+    with TestClient(api_server.app) as client:
+        before = client.get("/ready")
+        release.set()
+        deadline = time.time() + 30.0
+        while api_server.warmup_state["status"] != "ready" and time.time() < deadline:
+            time.sleep(0.05)
+        after = client.get("/ready")
+
+    assert before.status_code == 503
+    assert after.status_code == 200
+    report = after.json()["warmup"]["report"]
+    assert set(report) == {"opencv", "opencv_pyramid"}
+    assert set(report["opencv"]["320x240"]) == {"cold_ms", "warm_ms"}
+
+
+def test_yolo_input_size_follows_request_class(configure):
+    configure(PREVIEW_MODE="yolo", YOLO_IMGSZ_PREVIEW=320, YOLO_IMGSZ_FINAL=None, RESULT_CACHE_SIZE=0)
+    image_data = SAMPLE_IMAGE.read_bytes()
+
+    with TestClient(api_server.app) as client:
+        stub = api_server.detector.yolo_model = StubYOLO("confident")
+        for query in ("mode=yolo&is_preview=true", "mode=yolo", "mode=yolo&yolo_imgsz=480"):
+            assert client.post(f"/detect/raw?{query}", content=image_data).status_code == 200
+
+    # プレビューは YOLO_IMGSZ_PREVIEW、最終撮影はモデルの既定サイズ、リクエストの指定が優先
+    assert [call.get("imgsz") for call in stub.calls] == [320, None, 480]
+
+
+def test_raw_upload_matches_base64_and_multipart(client):
+    image_data = SAMPLE_IMAGE.read_bytes()
+    keys = ("bbox", "confidence", "success")
+
+    raw = client.post("/detect/raw?mode=opencv&filename=a.jpg", content=image_data).json()
+    encoded = client.post("/detect/base64", json={
+        "image_base64": base64.b64encode(image_data).decode(), "mode": "opencv", "filename": "b.jpg"
+    }).json()
+    multipart = client.post("/detect?mode=opencv", files={"file": ("c.jpg", image_data, "image/jpeg")}).json()
+
+    assert {k: raw[k] for k in keys} == {k: encoded[k] for k in keys} == {k: multipart[k] for k in keys}
+    assert client.post("/detect/raw", content=b"").status_code == 400
+
+
+def test_frame_is_decoded_once_and_reused_for_research_capture(configure, monkeypatch, tmp_path):
+    configure(RESULT_CACHE_SIZE=0)
+    decoded = []
+    original_decode = api_server.BentoBoxDetector.decode_image
+
+    def counting_decode(image_bytes):
+        decoded.append(len(image_bytes))
+        return original_decode(image_bytes)
+
+    monkeypatch.setattr(api_server.BentoBoxDetector, "decode_image", staticmethod(counting_decode))
+
+    with TestClient(api_server.app) as client:
+        response = client.post("/detect/raw?mode=opencv&filename=capture.jpg", content=SAMPLE_IMAGE.read_bytes())
+        deadline = time.time() + 10.0
+        while api_server.background_jobs and time.time() < deadline:
+            time.sleep(0.05)
+
+    assert response.json()["success"]
+    assert len(decoded) == 1
+    assert (tmp_path / "test_images" / "capture.jpg").read_bytes() == SAMPLE_IMAGE.read_bytes()
+
+
+class FakeWorkerPool:
+    """プロセスを起動しない DetectorWorkerPool の代わり（YOLOを読み込んだワーカーとして振る舞う）"""
+
+    def __init__(self, num_workers, detector_kwargs, **kwargs):
+        self.num_workers = num_workers
+        self.idle_workers = num_workers
+        self.stats = {}
+        self.detector_info = {"available_modes": ["opencv", "yolo"], "yolo_backend": "pytorch"}
+
+    def wait_ready(self, timeout=None):
+        return True
+
+    def close(self):
+        pass
+
+
+def test_worker_pool_parent_skips_yolo_and_warmup(configure, monkeypatch):
+    configure(DETECTOR_WORKERS=2, YOLO_WEIGHTS_PATH="model.pt", WARMUP_ENABLED=True, WARMUP_RESOLUTIONS=[(320, 240)])
+    calls = []
+    monkeypatch.setattr(api_server, "worker_pool", None)  # テスト後に起動で作られたプールを戻す
+    monkeypatch.setattr(api_server, "DetectorWorkerPool", FakeWorkerPool)
+    monkeypatch.setattr(api_server.BentoBoxDetector, "load_yolo_model", lambda self: calls.append("load") or False)
+    monkeypatch.setattr(api_server.BentoBoxDetector, "warm_up", lambda self, *a, **k: calls.append("warm_up") or {})
+
+    with TestClient(api_server.app) as client:
+        deadline = time.time() + 10.0
+        while api_server.warmup_state["status"] != "ready" and time.time() < deadline:
+            time.sleep(0.05)
+        ready = client.get("/ready")
+        health = client.get("/health").json()
+
+    # 検出はワーカーが行うため、APIプロセスではモデルの読み込みもウォームアップもしない
+    assert calls == []
+    assert api_server.detector.yolo_model is None
+    assert ready.status_code == 200
+    assert health["yolo_loaded"] is True
+    assert "hybrid" in health["modes_available"]
@@ -0,0 +1,128 @@
+"""
+YOLOマイクロバッチ・スケジューラのテスト
+スタブの検出器で、待ち時間の上限・推論設定ごとのまとめ方・失敗時の結果の返し方を確認する
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from batch_scheduler import YoloBatchScheduler
+from detector import DetectionConfig
+
+
+class StubDetector:
+    """バッチ推論の呼び出しを記録し、画像の画素値を推論結果として返す検出器"""
+
+    def __init__(self, error: Exception = None):
+        self.calls = []
+        self.error = error
+
+    def _resolve_config(self, config):
+        return config if config is not None else DetectionConfig()
+
+    def _yolo_inference_confidence(self, config):
+        return min(config.confidence_threshold, 0.25)
+
+    def _run_yolo(self, source, config=None):
+        self.calls.append((len(source), config.yolo_imgsz))
+        if self.error is not None:
+            raise self.error
+        return [int(image[0, 0, 0]) for image in source]
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((8, 8, 3), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(detector, **kwargs):
+        scheduler = YoloBatchScheduler(detector, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def infer_concurrently(scheduler, requests):
+    """(画像, 設定) を同時に登録し、登録順に結果を返す"""
+    with ThreadPoolExecutor(len(requests)) as pool:
+        futures = [pool.submit(scheduler.infer, image, config) for image, config in requests]
+        return [future.result(timeout=10) for future in futures]
+
+
+def test_single_request_waits_until_deadline(make_scheduler):
+    detector = StubDetector()
+    scheduler = make_scheduler(detector, max_batch_size=8, max_wait_ms=100.0)
+
+    started_at = time.perf_counter()
+    result, _ = scheduler.infer(frame(7))
+    elapsed = time.perf_counter() - started_at
+
+    assert result == 7
+    assert 0.09 <= elapsed < 2.0
+    assert detector.calls == [(1, None)]
+
+
+def test_full_batch_runs_without_waiting_for_deadline(make_scheduler):
+    detector = StubDetector()
+    scheduler = make_scheduler(detector, max_batch_size=2, max_wait_ms=10_000.0)
+
+    started_at = time.perf_counter()
+    results = infer_concurrently(scheduler, [(frame(1), None), (frame(2), None)])
+
+    assert time.perf_counter() - started_at < 5.0
+    assert [result for result, _ in results] == [1, 2]
+    assert detector.calls == [(2, None)]
+    assert scheduler.stats["batch_size"]["buckets"]["le_2"] == 1
+
+
+def test_requests_are_grouped_by_inference_settings(make_scheduler):
+    detector = StubDetector()
+    scheduler = make_scheduler(detector, max_batch_size=8, max_wait_ms=300.0)
+    small, large = DetectionConfig(yolo_imgsz=320), DetectionConfig(yolo_imgsz=640)
+
+    results = infer_concurrently(
+        scheduler, [(frame(1), small), (frame(2), large), (frame(3), small), (frame(4), large)]
+    )
+
+    # 各リクエストには自分の画像の結果が返り、推論サイズが同じものだけが同じバッチになる
+    assert [result for result, _ in results] == [1, 2, 3, 4]
+    assert sorted(detector.calls) == [(2, 320), (2, 640)]
+    assert scheduler.stats["batches"] == 2
+
+
+def test_inference_error_falls_back_to_single_inference(make_scheduler):
+    scheduler = make_scheduler(StubDetector(error=RuntimeError("boom")), max_wait_ms=1.0)
+
+    assert scheduler.infer(frame(1)) == (None, 0.0)
+    assert scheduler.stats["errors"] == 1
+
+
+def test_batch_failure_is_raised_to_waiting_requests(make_scheduler, monkeypatch):
+    scheduler = make_scheduler(StubDetector(), max_wait_ms=1.0)
+
+    def fail(value):
+        raise RuntimeError("histogram failure")
+
+    monkeypatch.setattr(scheduler.batch_size_histogram, "observe", fail)
+
+    with pytest.raises(RuntimeError, match="histogram failure"):
+        scheduler.infer(frame(1))
+    # 失敗後もスケジューラのスレッドは動き続ける
+    monkeypatch.undo()
+    assert scheduler.infer(frame(5))[0] == 5
+
+
+def test_pending_requests_fall_back_after_close(make_scheduler):
+    scheduler = make_scheduler(StubDetector(), max_wait_ms=1.0)
+    scheduler.close()
+
+    assert scheduler.infer(frame(1)) == (None, 0.0)
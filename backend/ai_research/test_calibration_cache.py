@@ -0,0 +1,71 @@
+"""
+キャリブレーションキャッシュのテスト
+変換係数の再利用・有効期限・再利用回数の上限・無効化を確認する
+"""
+
+import pytest
+
+import calibration_cache
+from calibration_cache import CalibrationCache
+
+
+@pytest.fixture
+def now(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(calibration_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ratio_is_reused_per_session_and_image_size():
+    cache = CalibrationCache()
+    cache.store("camera-1", (480, 640), 0.25)
+
+    assert cache.lookup("camera-1", (480, 640)) == (True, 0.25)
+    assert cache.lookup("camera-1", (720, 1280)) == (False, None)
+    assert cache.lookup("camera-2", (480, 640)) == (False, None)
+
+
+def test_ratio_expires_after_ttl(now):
+    cache = CalibrationCache(ttl_seconds=300.0)
+    cache.store("camera-1", (480, 640), 0.25)
+
+    now[0] += 301.0
+
+    assert cache.lookup("camera-1", (480, 640)) == (False, None)
+    assert cache.stats["stale"] == 1
+
+
+def test_missing_card_is_cached_only_briefly(now):
+    cache = CalibrationCache(ttl_seconds=300.0, negative_ttl_seconds=10.0)
+    cache.store("camera-1", (480, 640), None)
+
+    assert cache.lookup("camera-1", (480, 640)) == (True, None)
+    now[0] += 11.0
+    assert cache.lookup("camera-1", (480, 640)) == (False, None)
+
+
+def test_ratio_is_redetected_after_max_uses():
+    cache = CalibrationCache(max_uses=2)
+    cache.store("camera-1", (480, 640), 0.25)
+
+    assert cache.lookup("camera-1", (480, 640))[0]
+    assert cache.lookup("camera-1", (480, 640))[0]
+    assert not cache.lookup("camera-1", (480, 640))[0]
+
+
+def test_session_state_changes_on_restore_and_invalidation(now):
+    cache = CalibrationCache(ttl_seconds=300.0)
+    cache.store("camera-1", (480, 640), 0.25)
+    cache.store("camera-2", (480, 640), 0.30)
+    state = cache.session_state("camera-1")
+
+    # 参照しても再利用回数を消費せず、値も変わらない
+    assert cache.session_state("camera-1") == state
+    cache.store("camera-1", (480, 640), 0.25)
+    assert cache.session_state("camera-1") != state
+
+    assert cache.invalidate("camera-1") == 1
+    assert cache.session_state("camera-1") == ()
+    assert cache.lookup("camera-2", (480, 640)) == (True, 0.30)
+    now[0] += 301.0
+    assert cache.session_state("camera-2") == ()
@@ -0,0 +1,215 @@
+"""
+BentoBoxDetector のテスト
+検出結果のメタデータ（明るさ・角度）が従来の意味を保つことを確認する
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmark_refine_bbox import legacy_refine_bbox
+from detector import BentoBoxDetector, DetectionConfig
+from log_sink import NullLogSink
+from test_detector_parity import StubYOLO, sample_path
+
+
+SAMPLE_IMAGE = Path(__file__).parent / "test_bento.jpg"
+
+
+def legacy_angle(image: np.ndarray) -> float:
+    """旧実装の角度推定（画像全体のCannyエッジのHough直線の平均角度）"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    lines = cv2.HoughLines(cv2.Canny(gray, 50, 150), 1, np.pi / 180, 100)
+    if lines is None or len(lines) == 0:
+        return 0.0
+    return float(np.mean([line[0][1] * 180 / np.pi for line in lines]))
+
+
+@pytest.fixture
+def detector(tmp_path):
+    return BentoBoxDetector(output_dir=str(tmp_path), log_sink=NullLogSink())
+
+
+@pytest.fixture
+def sample_image():
+    image = cv2.imread(str(SAMPLE_IMAGE))
+    assert image is not None
+    return image
+
+
+def test_default_metadata_keeps_hough_angle(detector, sample_image):
+    """既定の検出では angle が従来どおりHough直線の平均角度になる"""
+    assert DetectionConfig().metadata_level == "full"
+
+    result = detector.detect_array(sample_image, mode="opencv")
+
+    assert result.angle == pytest.approx(legacy_angle(sample_image))
+    assert result.brightness == pytest.approx(float(np.mean(cv2.cvtColor(sample_image, cv2.COLOR_BGR2GRAY))))
+    assert result.tilt_deg is None
+
+
+def test_fast_metadata_reports_tilt_separately(detector, sample_image):
+    """fast では傾きを tilt_deg に返し、angle に別の意味の値を入れない"""
+    config = detector.default_config.replace(metadata_level="fast")
+
+    result = detector.detect_array(sample_image, mode="opencv", config=config)
+
+    assert result.angle == 0.0
+    assert result.tilt_deg is not None
+    assert -45.0 <= result.tilt_deg < 45.0
+
+
+def test_metadata_none_skips_both(detector, sample_image):
+    config = detector.default_config.replace(metadata_level="none")
+
+    result = detector.detect_array(sample_image, mode="opencv", config=config)
+
+    assert (result.brightness, result.angle, result.tilt_deg) == (0.0, 0.0, None)
+
+
+def test_static_batch_onnx_model_does_not_support_batching(detector):
+    class StaticOnnxModel:
+        dynamic_batch = False
+
+    assert not detector.supports_batch_inference
+    detector.yolo_model, detector.yolo_backend = StaticOnnxModel(), "onnx"
+    assert not detector.supports_batch_inference
+    detector.yolo_model.dynamic_batch = True
+    assert detector.supports_batch_inference
+
+
+def test_in_memory_entry_points_match_file_detection(detector, sample_image):
+    from_file = detector.detect(str(SAMPLE_IMAGE), mode="opencv")
+    from_bytes = detector.detect_bytes(SAMPLE_IMAGE.read_bytes(), mode="opencv", filename="test_bento.jpg")
+    from_array = detector.detect_array(sample_image, mode="opencv", filename="test_bento.jpg")
+
+    assert from_file.bbox == from_bytes.bbox == from_array.bbox
+    assert from_file.confidence == from_bytes.confidence == from_array.confidence
+    assert from_file.filename == from_bytes.filename == "test_bento.jpg"
+
+
+def test_undecodable_bytes_raise_value_error(detector):
+    with pytest.raises(ValueError):
+        detector.detect_bytes(b"not an image")
+    with pytest.raises(ValueError):
+        detector.decode_image(b"")
+
+
+def test_refine_bbox_matches_legacy_scan(detector, sample_image):
+    height, width = sample_image.shape[:2]
+    rng = np.random.default_rng(0)
+    bboxes = [[0, 0, 0, 0], [0, 0, width, height], [width - 5, height - 5, 50, 50], [-10, -10, 100, 80]]
+    for _ in range(200):
+        x, y = int(rng.integers(0, width - 2)), int(rng.integers(0, height - 2))
+        bboxes.append([x, y, int(rng.integers(1, width - x + 30)), int(rng.integers(1, height - y + 30))])
+
+    for bbox in bboxes:
+        assert detector._refine_bbox(sample_image, list(bbox)) == legacy_refine_bbox(sample_image, list(bbox)), bbox
+
+
+def test_refine_bbox_on_flat_region_keeps_bbox(detector):
+    image = np.full((100, 100, 3), 128, dtype=np.uint8)
+
+    assert detector._refine_bbox(image, [10, 10, 50, 50]) == legacy_refine_bbox(image, [10, 10, 50, 50])
+
+
+@pytest.mark.parametrize("mode", ["opencv", "yolo", "hybrid"])
+def test_batch_matches_single_detection_with_one_forward_pass(detector, mode):
+    names = ["test_bento.jpg", "cropped_bento_1765199316371.jpg", "cropped_bento_1769443924611.jpg"]
+    images = [cv2.imread(str(sample_path(name))) for name in names]
+    detector.yolo_model = StubYOLO("unsure")
+    expected = [detector.detect_array(image, mode=mode) for image in images]
+    detector.yolo_model = StubYOLO("unsure")
+
+    results = detector.detect_batch(images, mode=mode, filenames=names)
+
+    assert [r.bbox for r in results] == [r.bbox for r in expected]
+    assert [r.confidence for r in results] == [r.confidence for r in expected]
+    assert [r.filename for r in results] == names
+    assert len(detector.yolo_model.calls) == (0 if mode == "opencv" else 1)
+
+
+def test_pyramid_matches_full_resolution_within_tolerance(detector, sample_image):
+    large = cv2.resize(sample_image, None, fx=4, fy=4, interpolation=cv2.INTER_LINEAR)
+    tolerance = detector.default_config.pyramid_tolerance_px
+    keys = ("x", "y", "width", "height")
+
+    full = detector.detect_array(large, mode="opencv")
+    pyramid = detector.detect_array(large, mode="opencv_pyramid")
+
+    assert pyramid.success
+    assert all(abs(pyramid.bbox[key] - full.bbox[key]) <= tolerance for key in keys)
+
+
+def test_pyramid_on_small_frame_equals_opencv(detector, sample_image):
+    """短辺が pyramid_min_side 以下の画像は縮小せず opencv と同じ結果になる"""
+    assert min(sample_image.shape[:2]) <= detector.default_config.pyramid_min_side
+
+    full = detector.detect_array(sample_image, mode="opencv")
+    pyramid = detector.detect_array(sample_image, mode="opencv_pyramid")
+
+    assert (pyramid.bbox, pyramid.confidence) == (full.bbox, full.confidence)
+
+
+def test_per_call_config_does_not_change_detector_defaults(detector, sample_image):
+    defaults = detector.default_config
+    strict = defaults.replace(confidence_threshold=0.9, px_to_mm_ratio=0.5)
+
+    strict_result = detector.detect_array(sample_image, mode="opencv", config=strict)
+    default_result = detector.detect_array(sample_image, mode="opencv")
+
+    assert detector.default_config is defaults
+    assert not strict_result.success and default_result.success
+    assert strict_result.bbox["width_mm"] == pytest.approx(strict_result.bbox["width"] * 0.5)
+    assert default_result.bbox["width_mm"] == pytest.approx(default_result.bbox["width"] * 1.0)
+
+
+def test_concurrent_calls_keep_their_own_config(detector, sample_image):
+    ratios = [0.25, 0.5, 1.0, 2.0] * 4
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(
+            lambda ratio: detector.detect_array(
+                sample_image, mode="opencv", config=DetectionConfig(px_to_mm_ratio=ratio)
+            ),
+            ratios
+        ))
+
+    assert [result.px_to_mm_ratio for result in results] == ratios
+
+
+def test_cascade_keeps_confident_opencv_result_without_yolo(detector, sample_image):
+    detector.yolo_model = StubYOLO("confident")
+    opencv = detector.detect_array(sample_image, mode="opencv")
+
+    result = detector.detect_array(sample_image, mode="cascade")
+
+    assert not result.escalated
+    assert result.bbox == opencv.bbox
+    assert result.confidence >= detector.default_config.cascade_threshold
+    assert detector.yolo_model.calls == []
+
+
+def test_cascade_escalates_to_hybrid_below_threshold(detector, sample_image):
+    detector.yolo_model = StubYOLO("confident")
+    config = detector.default_config.replace(cascade_threshold=1.01)
+    hybrid = detector.detect_array(sample_image, mode="hybrid")
+    detector.yolo_model = StubYOLO("confident")
+
+    result = detector.detect_array(sample_image, mode="cascade", config=config)
+
+    assert result.escalated
+    assert (result.bbox, result.confidence) == (hybrid.bbox, hybrid.confidence)
+    assert len(detector.yolo_model.calls) == 1
+    assert "cascade_quality" in result.stage_timings_ms
+
+
+def test_cascade_without_yolo_model_does_not_escalate(detector, sample_image):
+    config = detector.default_config.replace(cascade_threshold=1.01)
+
+    result = detector.detect_array(sample_image, mode="cascade", config=config)
+
+    assert not result.escalated
+    assert result.bbox == detector.detect_array(sample_image, mode="opencv").bbox
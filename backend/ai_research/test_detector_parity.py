@@ -0,0 +1,149 @@
+"""
+検出結果の互換性テスト
+スタブのYOLOを使い、opencv / yolo / hybrid のbbox・信頼度が改修前の実装と一致することを確認する
+（期待値は改修前の BentoBoxDetector.detect に同じスタブを渡して記録したもの）
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+import pytest
+
+from detector import BentoBoxDetector
+from log_sink import NullLogSink
+from onnx_backend import OnnxBoxes, OnnxResult
+
+
+DATA_DIR = Path(__file__).parent
+
+# 画像サイズに対する相対座標 (x1, y1, x2, y2) と信頼度
+YOLO_PROFILES: Dict[str, List[Tuple[Tuple[float, float, float, float], float]]] = {
+    # 通常の閾値で検出できる（最高信頼度のボックスを選ぶ）
+    "confident": [((0.1, 0.1, 0.9, 0.9), 0.9), ((0.3, 0.3, 0.6, 0.6), 0.6)],
+    # 低閾値でのみ検出できる（面積が最大のボックスを選ぶ）
+    "unsure": [((0.3, 0.3, 0.6, 0.6), 0.35), ((0.15, 0.15, 0.85, 0.85), 0.3)],
+    # 検出なし（hybrid は OpenCV にフォールバック）
+    "empty": [],
+}
+
+
+class StubYOLO:
+    """画像サイズに合わせた固定のボックスを返すUltralytics互換のスタブ（閾値以下のボックスは返さない）"""
+
+    def __init__(self, profile: str):
+        self.boxes = YOLO_PROFILES[profile]
+        self.calls = []
+
+    def __call__(self, source, conf: float = 0.25, verbose: bool = False, **kwargs):
+        self.calls.append({"conf": conf, **kwargs})
+        images = source if isinstance(source, (list, tuple)) else [source]
+        return [self._predict(image, conf) for image in images]
+
+    def _predict(self, image: np.ndarray, conf: float) -> OnnxResult:
+        height, width = image.shape[:2]
+        kept = [(box, score) for box, score in self.boxes if score > conf]
+        xyxy = np.array(
+            [[x1 * width, y1 * height, x2 * width, y2 * height] for (x1, y1, x2, y2), _ in kept],
+            dtype=np.float32
+        ).reshape(-1, 4)
+        scores = np.array([score for _, score in kept], dtype=np.float32)
+        return OnnxResult(OnnxBoxes(xyxy, scores, np.zeros(len(kept), dtype=np.float32)))
+
+
+def sample_path(name: str) -> Path:
+    return DATA_DIR / name if name == "test_bento.jpg" else DATA_DIR / "test_images_cropped" / name
+
+
+EXPECTED = {
+    ("test_bento.jpg", "opencv", "confident"): ([217, 162, 206, 157], 0.7),
+    ("test_bento.jpg", "yolo", "confident"): ([64, 48, 512, 384], 0.9),
+    ("test_bento.jpg", "hybrid", "confident"): ([217, 162, 206, 157], 0.4),
+    ("test_bento.jpg", "yolo", "unsure"): ([96, 72, 448, 336], 0.3),
+    ("test_bento.jpg", "hybrid", "unsure"): ([217, 162, 206, 157], 0.25),
+    ("test_bento.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("test_bento.jpg", "hybrid", "empty"): ([217, 162, 206, 157], 0.7),
+    ("cropped_bento_1765199316371.jpg", "opencv", "confident"): ([56, 67, 384, 229], 0.7),
+    ("cropped_bento_1765199316371.jpg", "yolo", "confident"): ([75, 68, 606, 452], 0.9),
+    ("cropped_bento_1765199316371.jpg", "hybrid", "confident"): ([56, 67, 384, 229], 0.4),
+    ("cropped_bento_1765199316371.jpg", "yolo", "unsure"): ([113, 87, 531, 406], 0.3),
+    ("cropped_bento_1765199316371.jpg", "hybrid", "unsure"): ([463, 172, 208, 120], 0.25),
+    ("cropped_bento_1765199316371.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1765199316371.jpg", "hybrid", "empty"): ([56, 67, 384, 229], 0.7),
+    ("cropped_bento_1765200513305.jpg", "opencv", "confident"): ([106, 162, 423, 259], 0.7),
+    ("cropped_bento_1765200513305.jpg", "yolo", "confident"): ([136, 59, 546, 355], 0.9),
+    ("cropped_bento_1765200513305.jpg", "hybrid", "confident"): ([119, 169, 395, 241], 0.4),
+    ("cropped_bento_1765200513305.jpg", "yolo", "unsure"): ([136, 93, 508, 321], 0.3),
+    ("cropped_bento_1765200513305.jpg", "hybrid", "unsure"): ([119, 169, 395, 241], 0.291887),
+    ("cropped_bento_1765200513305.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1765200513305.jpg", "hybrid", "empty"): ([106, 162, 423, 259], 0.7),
+    ("cropped_bento_1765200552444.jpg", "opencv", "confident"): ([44, 105, 402, 252], 0.7),
+    ("cropped_bento_1765200552444.jpg", "yolo", "confident"): ([75, 58, 607, 465], 0.9),
+    ("cropped_bento_1765200552444.jpg", "hybrid", "confident"): ([57, 117, 374, 229], 0.4),
+    ("cropped_bento_1765200552444.jpg", "yolo", "unsure"): ([113, 87, 531, 407], 0.3),
+    ("cropped_bento_1765200552444.jpg", "hybrid", "unsure"): ([506, 277, 144, 42], 0.25),
+    ("cropped_bento_1765200552444.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1765200552444.jpg", "hybrid", "empty"): ([44, 105, 402, 252], 0.7),
+    ("cropped_bento_1765200594739.jpg", "opencv", "confident"): ([47, 132, 379, 236], 0.7),
+    ("cropped_bento_1765200594739.jpg", "yolo", "confident"): ([79, 79, 578, 271], 0.9),
+    ("cropped_bento_1765200594739.jpg", "hybrid", "confident"): ([450, 225, 207, 122], 0.4),
+    ("cropped_bento_1765200594739.jpg", "yolo", "unsure"): ([113, 87, 531, 263], 0.3),
+    ("cropped_bento_1765200594739.jpg", "hybrid", "unsure"): ([450, 225, 207, 122], 0.25),
+    ("cropped_bento_1765200594739.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1765200594739.jpg", "hybrid", "empty"): ([47, 132, 379, 236], 0.7),
+    ("cropped_bento_1765200610259.jpg", "opencv", "confident"): ([86, 171, 392, 239], 0.7),
+    ("cropped_bento_1765200610259.jpg", "yolo", "confident"): ([120, 70, 562, 329], 0.9),
+    ("cropped_bento_1765200610259.jpg", "hybrid", "confident"): ([501, 278, 207, 120], 0.4),
+    ("cropped_bento_1765200610259.jpg", "yolo", "unsure"): ([120, 109, 524, 290], 0.3),
+    ("cropped_bento_1765200610259.jpg", "hybrid", "unsure"): ([532, 346, 142, 42], 0.25),
+    ("cropped_bento_1765200610259.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1765200610259.jpg", "hybrid", "empty"): ([86, 171, 392, 239], 0.7),
+    ("cropped_bento_1765200621578.jpg", "opencv", "confident"): ([53, 82, 395, 245], 0.7),
+    ("cropped_bento_1765200621578.jpg", "yolo", "confident"): ([86, 108, 596, 399], 0.9),
+    ("cropped_bento_1765200621578.jpg", "hybrid", "confident"): ([471, 185, 213, 123], 0.4),
+    ("cropped_bento_1765200621578.jpg", "yolo", "unsure"): ([113, 87, 531, 407], 0.3),
+    ("cropped_bento_1765200621578.jpg", "hybrid", "unsure"): ([504, 257, 161, 40], 0.25),
+    ("cropped_bento_1765200621578.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1765200621578.jpg", "hybrid", "empty"): ([53, 82, 395, 245], 0.7),
+    ("cropped_bento_1769443924611.jpg", "opencv", "confident"): ([90, 155, 451, 273], 0.7),
+    ("cropped_bento_1769443924611.jpg", "yolo", "confident"): ([75, 58, 607, 463], 0.9),
+    ("cropped_bento_1769443924611.jpg", "hybrid", "confident"): ([90, 155, 451, 273], 0.4),
+    ("cropped_bento_1769443924611.jpg", "yolo", "unsure"): ([113, 87, 531, 406], 0.3),
+    ("cropped_bento_1769443924611.jpg", "hybrid", "unsure"): ([90, 155, 451, 273], 0.285554),
+    ("cropped_bento_1769443924611.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1769443924611.jpg", "hybrid", "empty"): ([90, 155, 451, 273], 0.7),
+    ("cropped_bento_1769443985397.jpg", "opencv", "confident"): ([32, 0, 696, 262], 0.7),
+    ("cropped_bento_1769443985397.jpg", "yolo", "confident"): ([75, 58, 607, 465], 0.9),
+    ("cropped_bento_1769443985397.jpg", "hybrid", "confident"): ([45, 28, 426, 207], 0.4),
+    ("cropped_bento_1769443985397.jpg", "yolo", "unsure"): ([113, 87, 531, 407], 0.3),
+    ("cropped_bento_1769443985397.jpg", "hybrid", "unsure"): ([83, 76, 388, 159], 0.25),
+    ("cropped_bento_1769443985397.jpg", "yolo", "empty"): ([0, 0, 0, 0], 0.0),
+    ("cropped_bento_1769443985397.jpg", "hybrid", "empty"): ([32, 0, 696, 262], 0.7),
+}
+
+
+@pytest.fixture(scope="module")
+def detector(tmp_path_factory):
+    return BentoBoxDetector(output_dir=str(tmp_path_factory.mktemp("outputs")), log_sink=NullLogSink())
+
+
+@pytest.mark.parametrize("name, mode, profile", sorted(EXPECTED))
+def test_bbox_and_confidence_match_previous_implementation(detector, name, mode, profile):
+    detector.yolo_model = StubYOLO(profile)
+
+    result = detector.detect_array(cv2.imread(str(sample_path(name))), mode=mode)
+
+    bbox, confidence = EXPECTED[name, mode, profile]
+    assert [result.bbox[key] for key in ("x", "y", "width", "height")] == bbox
+    assert result.confidence == pytest.approx(confidence, abs=1e-6)
+
+
+@pytest.mark.parametrize("mode", ["yolo", "hybrid"])
+def test_yolo_runs_once_even_when_falling_back_to_low_threshold(detector, mode):
+    detector.yolo_model = StubYOLO("unsure")
+
+    detector.detect_array(cv2.imread(str(sample_path("test_bento.jpg"))), mode=mode)
+
+    assert len(detector.yolo_model.calls) == 1
+    assert detector.yolo_model.calls[0]["conf"] == pytest.approx(BentoBoxDetector.FALLBACK_CONFIDENCE)
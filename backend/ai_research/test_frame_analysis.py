@@ -0,0 +1,68 @@
+"""
+フレーム解析キャッシュのテスト
+派生画像が直接計算した結果と一致し、1フレームにつき1回だけ計算されることを確認する
+"""
+
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from frame_analysis import FrameAnalysis
+
+
+SAMPLE_IMAGE = Path(__file__).parent / "test_bento.jpg"
+
+
+@pytest.fixture
+def image():
+    image = cv2.imread(str(SAMPLE_IMAGE))
+    assert image is not None
+    return image
+
+
+def test_planes_match_direct_computation(image):
+    analysis = FrameAnalysis(image)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, otsu = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+
+    assert np.array_equal(analysis.gray, gray)
+    assert np.array_equal(analysis.blurred(0), gray)
+    assert np.array_equal(analysis.blurred(5), blurred)
+    assert np.array_equal(analysis.edges(50, 150, 5), cv2.Canny(blurred, 50, 150))
+    assert np.array_equal(analysis.otsu_binary(5), otsu)
+    assert len(analysis.otsu_contours(5)) == len(
+        cv2.findContours(otsu, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+    )
+
+
+def test_planes_are_computed_once_per_parameters(image):
+    analysis = FrameAnalysis(image)
+
+    assert analysis.blurred(5) is analysis.blurred(5)
+    assert analysis.edges(50, 150) is analysis.edges(50, 150)
+    assert analysis.edges(50, 150) is not analysis.edges(30, 100)
+    assert analysis.edge_contours(50, 150) is analysis.edge_contours(50, 150)
+    assert analysis.otsu_contours(5) is analysis.otsu_contours(5)
+
+
+def test_edge_contours_are_external_contours(image):
+    analysis = FrameAnalysis(image)
+
+    contours = analysis.edge_contours(50, 150, 5)
+
+    assert len(contours) == len(
+        cv2.findContours(analysis.closed_edges(50, 150, 5), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0]
+    )
+
+
+def test_crop_reuses_parent_gray(image):
+    analysis = FrameAnalysis(image)
+
+    roi = analysis.crop(10, 20, 110, 220)
+
+    assert roi.shape[:2] == (200, 100)
+    assert np.shares_memory(roi.gray, analysis.gray)
+    assert FrameAnalysis.of(image, analysis) is analysis
@@ -0,0 +1,93 @@
+"""
+ハイブリッド検出パイプラインのテスト
+ステージが1フレームにつき1回だけ実行され、経路ごとのステージ時間が記録されることを確認する
+"""
+
+from pathlib import Path
+
+import cv2
+import pytest
+
+from detector import BentoBoxDetector
+from hybrid_pipeline import HybridPipeline
+from log_sink import NullLogSink
+from test_detector_parity import StubYOLO
+
+
+SAMPLE_IMAGE = Path(__file__).parent / "test_bento.jpg"
+ROI_STAGES = {"roi", "roi_edges", "roi_contour", "roi_refine", "combine"}
+
+
+@pytest.fixture
+def detector(tmp_path):
+    return BentoBoxDetector(output_dir=str(tmp_path), log_sink=NullLogSink())
+
+
+@pytest.fixture
+def image():
+    image = cv2.imread(str(SAMPLE_IMAGE))
+    assert image is not None
+    return image
+
+
+def test_roi_path_records_stage_timings(detector, image):
+    detector.yolo_model = StubYOLO("confident")
+
+    result = detector.detect_array(image, mode="hybrid")
+
+    stages = set(result.stage_timings_ms)
+    assert {"yolo_inference", "yolo_select", "yolo_refine"} | ROI_STAGES <= stages
+    assert "opencv_fallback" not in stages
+    assert all(ms >= 0.0 for ms in result.stage_timings_ms.values())
+
+
+def test_fallback_path_skips_roi_stages(detector, image):
+    detector.yolo_model = StubYOLO("empty")
+
+    result = detector.detect_array(image, mode="hybrid")
+
+    assert "opencv_fallback" in result.stage_timings_ms
+    assert not ROI_STAGES & set(result.stage_timings_ms)
+
+
+def test_stages_run_once_per_frame(detector, image, monkeypatch):
+    detector.yolo_model = StubYOLO("confident")
+    refined = []
+    original_refine = detector._refine_bbox
+
+    def counting_refine(image, bbox, analysis=None):
+        refined.append(tuple(bbox))
+        return original_refine(image, bbox, analysis)
+
+    monkeypatch.setattr(detector, "_refine_bbox", counting_refine)
+    pipeline = HybridPipeline(detector, image)
+
+    first = pipeline.run()
+    second = pipeline.run()
+
+    assert first == second
+    assert len(detector.yolo_model.calls) == 1
+    assert len(refined) == len(set(refined))
+
+
+def test_batched_yolo_result_is_reused(detector, image):
+    detector.yolo_model = StubYOLO("confident")
+    yolo_result = detector._run_yolo(image)[0]
+
+    bbox, confidence = HybridPipeline(detector, image, yolo_result=yolo_result).run()
+
+    assert len(detector.yolo_model.calls) == 1
+    assert confidence > 0 and bbox != [0, 0, 0, 0]
+
+
+def test_yolo_error_falls_back_to_opencv(detector, image):
+    def failing_yolo(*args, **kwargs):
+        raise RuntimeError("inference failed")
+
+    detector.yolo_model = failing_yolo
+    expected = detector.detect_array(image, mode="opencv")
+
+    bbox, confidence = HybridPipeline(detector, image).run()
+
+    assert bbox == [expected.bbox[key] for key in ("x", "y", "width", "height")]
+    assert confidence == expected.confidence
@@ -0,0 +1,72 @@
+"""
+検出ログ出力のテスト
+書き込み → 読み出しの往復、書き込み中の削除、書き込み先インターフェースの検査を確認する
+"""
+
+import threading
+
+import pytest
+
+from log_sink import BufferedLogSink, LogWriter, create_log_sink
+
+
+def make_record(i: int) -> dict:
+    return {"timestamp": f"2026-01-01T00:00:{i:02d}", "filename": f"image_{i}.jpg", "mode": "opencv", "index": i}
+
+
+@pytest.mark.parametrize("sink_type", ["jsonl", "sqlite"])
+def test_records_round_trip_newest_first(tmp_path, sink_type):
+    sink = create_log_sink(sink_type, tmp_path, flush_interval=0.05)
+    for i in range(5):
+        assert sink.write(make_record(i))
+    sink.close()
+
+    records = sink.read_recent(3)
+
+    assert [r["index"] for r in records] == [4, 3, 2]
+    assert sink.stats["written"] == 5
+
+
+@pytest.mark.parametrize("sink_type", ["jsonl", "sqlite"])
+def test_clear_while_writing_and_reading(tmp_path, sink_type):
+    """書き込みスレッド・読み出し・削除が同時に走っても書き込みエラーにならない"""
+    sink = create_log_sink(sink_type, tmp_path, flush_interval=0.01, batch_size=5)
+    stop = threading.Event()
+
+    def produce():
+        i = 0
+        while not stop.is_set():
+            sink.write(make_record(i % 60))
+            i += 1
+
+    def read():
+        while not stop.is_set():
+            sink.read_recent(10)
+
+    threads = [threading.Thread(target=produce), threading.Thread(target=read)]
+    for thread in threads:
+        thread.start()
+    previous_threads = []
+    try:
+        for _ in range(10):
+            previous_threads.append(sink._thread)
+            sink.clear()
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    # 削除のたびに古い書き込みスレッドは終了済み（書き込みスレッドが2つ並走しない）
+    assert not any(thread.is_alive() for thread in previous_threads)
+    sink.close()
+
+    assert sink.stats["errors"] == 0
+
+
+def test_incomplete_writer_fails_at_construction():
+    class PartialWriter(LogWriter):
+        def write_batch(self, records):
+            pass
+
+    with pytest.raises(TypeError):
+        BufferedLogSink(PartialWriter())
@@ -0,0 +1,81 @@
+"""
+ONNX Runtime バックエンドのテスト
+onnxruntime なしで動く前処理（レターボックス）と後処理（NMS・元画像座標への変換）を確認する
+"""
+
+import numpy as np
+import pytest
+
+from onnx_backend import LETTERBOX_COLOR, OnnxYOLO, letterbox, preprocess
+
+
+def make_yolo(export_imgsz: int = 640, dynamic: bool = False) -> OnnxYOLO:
+    """セッションを作らずに後処理・推論サイズ解決だけを使う OnnxYOLO"""
+    yolo = OnnxYOLO.__new__(OnnxYOLO)
+    yolo.export_imgsz = export_imgsz
+    yolo.dynamic = dynamic
+    yolo.dynamic_batch = False
+    yolo._warned_sizes = set()
+    return yolo
+
+
+def test_letterbox_keeps_aspect_and_centers():
+    image = np.zeros((200, 400, 3), dtype=np.uint8)
+
+    padded, gain, pad = letterbox(image, 640)
+
+    assert padded.shape == (640, 640, 3)
+    assert gain == pytest.approx(1.6)
+    assert pad == pytest.approx((0.0, 160.0))
+    assert tuple(padded[0, 0]) == LETTERBOX_COLOR
+    assert tuple(padded[320, 320]) == (0, 0, 0)
+
+
+def test_preprocess_returns_rgb_nchw_float():
+    image = np.zeros((100, 100, 3), dtype=np.uint8)
+    image[:, :] = (255, 0, 0)  # BGRの青
+
+    tensor, _, _ = preprocess(image, 64)
+
+    assert tensor.shape == (1, 3, 64, 64)
+    assert tensor.dtype == np.float32
+    assert tensor[0, 2, 32, 32] == pytest.approx(1.0)
+    assert tensor[0, 0, 32, 32] == pytest.approx(0.0)
+
+
+def test_postprocess_maps_back_to_original_coordinates():
+    yolo = make_yolo()
+    image_shape = (200, 400)
+    _, gain, pad = letterbox(np.zeros((*image_shape, 3), dtype=np.uint8), 640)
+    # 元画像 (100, 50)-(300, 150) の箱をレターボックス座標の cx, cy, w, h に変換し、重複候補と低信頼度候補を加える
+    cx, cy = 200 * gain + pad[0], 100 * gain + pad[1]
+    w, h = 200 * gain, 100 * gain
+    output = np.array([
+        [cx, cx + 2, cx],
+        [cy, cy, cy],
+        [w, w, w],
+        [h, h, h],
+        [0.9, 0.8, 0.1]
+    ], dtype=np.float32)
+
+    result = yolo._postprocess(output, image_shape, gain, pad, conf=0.25, iou=0.7)
+
+    assert len(result.boxes) == 1
+    assert result.boxes.conf.cpu().numpy()[0] == pytest.approx(0.9)
+    assert result.boxes.xyxy.cpu().numpy()[0] == pytest.approx([100, 50, 300, 150], abs=1e-3)
+
+
+def test_postprocess_without_candidates_returns_empty_boxes():
+    yolo = make_yolo()
+    output = np.zeros((5, 10), dtype=np.float32)
+
+    result = yolo._postprocess(output, (100, 100), 1.0, (0.0, 0.0), conf=0.25, iou=0.7)
+
+    assert len(result.boxes) == 0
+    assert result.boxes.xyxy.cpu().numpy().shape == (0, 4)
+
+
+def test_static_model_ignores_requested_imgsz():
+    assert make_yolo(640, dynamic=False)._input_size(320) == 640
+    assert make_yolo(640, dynamic=True)._input_size(300) == 320
+    assert make_yolo(640, dynamic=True)._input_size(None) == 640
@@ -0,0 +1,78 @@
+"""
+プレビューフレームのトラッキングのテスト
+セッションごとの前フレームbboxの保持・破棄と、前フレーム周辺のみの探索結果を確認する
+"""
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+import pytest
+
+import preview_tracker
+from detector import BentoBoxDetector
+from log_sink import NullLogSink
+from preview_tracker import PreviewTracker
+
+
+SAMPLE_IMAGE = Path(__file__).parent / "test_bento.jpg"
+
+
+def make_result(success: bool = True, tracked: bool = False):
+    bbox = {"x": 10, "y": 20, "width": 30, "height": 40} if success else None
+    return SimpleNamespace(success=success, bbox=bbox, tracked=tracked)
+
+
+def test_prior_bbox_is_kept_per_session_and_resolution():
+    tracker = PreviewTracker()
+    tracker.record("camera-1", make_result(), (480, 640), had_prior=False)
+
+    track = tracker.get("camera-1")
+
+    assert track.prior_bbox((480, 640)) == [10, 20, 30, 40]
+    assert track.prior_bbox((720, 1280)) is None
+    assert tracker.get("camera-2") is None
+
+
+def test_failed_frame_and_timeout_drop_the_track(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(preview_tracker.time, "monotonic", lambda: now[0])
+    tracker = PreviewTracker(ttl_seconds=2.0)
+
+    tracker.record("camera-1", make_result(), (480, 640), had_prior=False)
+    tracker.record("camera-1", make_result(success=False), (480, 640), had_prior=True)
+    assert tracker.get("camera-1") is None
+
+    tracker.record("camera-1", make_result(tracked=True), (480, 640), had_prior=True)
+    now[0] += 2.5
+    assert tracker.get("camera-1") is None
+
+    stats = tracker.stats
+    assert (stats["frames"], stats["tracked"], stats["lost"]) == (3, 1, 1)
+
+
+def test_oldest_session_is_evicted_over_limit():
+    tracker = PreviewTracker(max_sessions=2)
+    for session in ("a", "b", "c"):
+        tracker.record(session, make_result(), (480, 640), had_prior=False)
+
+    assert tracker.get("a") is None
+    assert tracker.stats["sessions"] == 2
+
+
+@pytest.fixture
+def detector(tmp_path):
+    return BentoBoxDetector(output_dir=str(tmp_path), log_sink=NullLogSink())
+
+
+def test_tracked_detection_matches_full_frame(detector):
+    image = cv2.imread(str(SAMPLE_IMAGE))
+    full = detector.detect_array(image, mode="opencv")
+    prior = [full.bbox[key] for key in ("x", "y", "width", "height")]
+
+    tracked = detector.detect_array(image, mode="opencv", prior_bbox=prior)
+    lost = detector.detect_array(image, mode="opencv", prior_bbox=[0, 0, 20, 20])
+
+    assert tracked.tracked and tracked.bbox == full.bbox
+    # 前フレーム周辺で見つからなければフレーム全体で検出し直す
+    assert not lost.tracked and lost.bbox == full.bbox
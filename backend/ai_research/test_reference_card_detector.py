@@ -0,0 +1,72 @@
+"""
+参照カード検出のテスト
+参照カードと弁当箱が同じフレームに写った合成画像で、
+変換係数が旧実装（原寸のOtsu二値化 + 外側輪郭）と一致することを確認する
+"""
+
+import cv2
+import numpy as np
+
+from benchmark_card_detection import bbox_to_ratio, legacy_detect_card
+from detector import BentoBoxDetector
+from frame_analysis import FrameAnalysis
+from log_sink import NullLogSink
+from reference_card_detector import ReferenceCardDetector
+
+
+def create_card_and_bento_image(scale: float = 1.0) -> np.ndarray:
+    """
+    暗い背景に参照カードと弁当箱を描画
+    カードは斜めから撮影した場合のように縦横比が理想値からずれ(180x120px)、
+    弁当箱の縦横比(370x230px)の方が理想値に近いが、Otsu二値化では背景側になる明るさにする
+
+    Args:
+        scale: 画像全体の拡大率
+    """
+    image = np.full((480, 640, 3), 40, dtype=np.uint8)
+    cv2.rectangle(image, (40, 60), (410, 290), (90, 90, 90), -1)
+    cv2.rectangle(image, (430, 320), (610, 440), (235, 235, 235), -1)
+    if scale != 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    return image
+
+
+def test_card_ratio_matches_legacy():
+    """カード検出器単体の変換係数が旧実装と一致する"""
+    detector = ReferenceCardDetector(card_type='credit_card')
+    for scale in (1.0, 4.0):
+        image = create_card_and_bento_image(scale)
+        expected = bbox_to_ratio(detector, legacy_detect_card(detector, image))
+        assert expected is not None
+        ratio = detector.calculate_px_to_mm_ratio(image, FrameAnalysis(image))
+        assert ratio is not None
+        assert abs(ratio - expected) / expected <= 0.01
+
+
+def test_auto_calibration_does_not_pick_bento(tmp_path):
+    """弁当箱の輪郭を共有しても、弁当箱をカードとして採用しない"""
+    image = create_card_and_bento_image()
+    detector = BentoBoxDetector(
+        output_dir=str(tmp_path),
+        enable_auto_calibration=True,
+        card_type='credit_card',
+        log_sink=NullLogSink()
+    )
+    expected = bbox_to_ratio(detector.card_detector, legacy_detect_card(detector.card_detector, image))
+
+    result = detector.detect_array(image, mode="opencv")
+
+    assert result.px_to_mm_ratio == expected
+
+
+def test_no_card_skips_full_resolution_search():
+    """縮小画像にカード大の四角形がなければ、原寸の二値化・輪郭抽出を行わずにNoneを返す"""
+    detector = ReferenceCardDetector(card_type='credit_card')
+    # 弁当箱に寄って撮影したフレーム（弁当箱はカードの面積範囲より大きい）
+    image = np.full((1920, 2560, 3), 40, dtype=np.uint8)
+    cv2.rectangle(image, (80, 80), (2480, 1840), (200, 200, 200), -1)
+    analysis = FrameAnalysis(image)
+
+    assert legacy_detect_card(detector, image) is None
+    assert detector.detect_card(image, analysis) is None
+    assert not analysis._otsu
@@ -0,0 +1,59 @@
+"""
+検出結果キャッシュのテスト
+キーの作り方・LRUでの破棄・TTLでの失効を確認する
+"""
+
+import pytest
+
+import result_cache
+from result_cache import DetectionResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_key_depends_on_image_content_and_params():
+    key = DetectionResultCache.make_key(b"image", "hybrid", 0.5)
+
+    assert key == DetectionResultCache.make_key(b"image", "hybrid", 0.5)
+    assert key != DetectionResultCache.make_key(b"image2", "hybrid", 0.5)
+    assert key != DetectionResultCache.make_key(b"image", "opencv", 0.5)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DetectionResultCache(max_entries=2, ttl_seconds=0)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # b が最も古く使われたものになる
+
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats["evictions"] == 1
+
+
+def test_expired_entry_is_dropped_on_lookup(clock):
+    cache = DetectionResultCache(max_entries=4, ttl_seconds=10.0)
+    cache.put("a", 1)
+
+    clock.now += 5.0
+    assert cache.get("a") == 1
+    clock.now += 6.0
+    assert cache.get("a") is None
+
+    stats = cache.stats
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+    assert stats["hit_rate"] == 0.5
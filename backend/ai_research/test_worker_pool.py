@@ -0,0 +1,116 @@
+"""
+検出ワーカープールのテスト
+結果がAPIプロセス内の検出と一致すること、ワーカーの例外・異常終了・ハングから復帰することを確認する
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from detector import BentoBoxDetector
+from log_sink import NullLogSink
+from worker_pool import DetectorWorkerPool
+
+
+SAMPLE_IMAGE = Path(__file__).parent / "test_bento.jpg"
+
+
+def slow_frame() -> np.ndarray:
+    """検出（Hough変換による角度推定）に数秒かかるノイズ画像"""
+    return np.random.default_rng(0).integers(0, 256, (3000, 4000, 3), dtype=np.uint8)
+
+
+def wait_until(predicate, timeout: float = 60.0) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = DetectorWorkerPool(1, {"output_dir": str(tmp_path)}, request_timeout=30.0)
+    assert pool.wait_ready(120.0)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def sample_image():
+    image = cv2.imread(str(SAMPLE_IMAGE))
+    assert image is not None
+    return image
+
+
+def test_result_matches_in_process_detection(pool, sample_image, tmp_path):
+    local = BentoBoxDetector(output_dir=str(tmp_path), log_sink=NullLogSink())
+    expected = local.detect_array(sample_image, mode="opencv")
+
+    result = pool.detect(sample_image, mode="opencv")
+
+    assert result.bbox == expected.bbox
+    assert result.confidence == expected.confidence
+
+
+def test_worker_exception_is_raised_without_restart(pool, sample_image):
+    with pytest.raises(RuntimeError, match="ValueError"):
+        pool.detect(sample_image, mode="unknown")
+
+    assert pool.stats["errors"] == 1
+    assert pool.stats["restarts"] == 0
+    assert pool.detect(sample_image, mode="opencv").success is not None
+
+
+def test_worker_killed_mid_request_is_restarted(pool, sample_image):
+    worker = pool._workers[0]
+    errors = []
+
+    def run():
+        try:
+            pool.detect(slow_frame(), mode="opencv")
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert wait_until(lambda: pool.idle_workers == 0)
+    time.sleep(0.5)
+    worker.process.kill()
+    thread.join(30.0)
+
+    assert len(errors) == 1
+    assert wait_until(lambda: pool.idle_workers == 1, timeout=120.0)
+    assert pool.stats["restarts"] == 1
+    assert pool.detect(sample_image, mode="opencv").bbox is not None
+
+
+def test_hung_worker_times_out_and_is_restarted(tmp_path, sample_image):
+    pool = DetectorWorkerPool(1, {"output_dir": str(tmp_path)}, request_timeout=0.5)
+    try:
+        assert pool.wait_ready(120.0)
+        old_process = pool._workers[0].process
+
+        with pytest.raises(TimeoutError):
+            pool.detect(slow_frame(), mode="opencv")
+
+        assert pool.stats["timeouts"] == 1
+        assert wait_until(lambda: pool.idle_workers == 1, timeout=120.0)
+        assert not old_process.is_alive()
+        assert pool.stats["restarts"] == 1
+    finally:
+        pool.close()
+
+
+def test_no_idle_worker_times_out(pool, sample_image):
+    pool._idle.get()  # 唯一のワーカーを使用中にする
+    try:
+        with pytest.raises(TimeoutError):
+            pool.detect(sample_image, mode="opencv", timeout=0.1)
+    finally:
+        pool._idle.put(0)
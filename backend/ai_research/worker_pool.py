@@ -0,0 +1,320 @@
+"""
+検出ワーカープール
+複数の検出プロセスにそれぞれモデルを読み込ませ、リクエストを空いているワーカーへ振り分ける
+
+- デコード済みフレームは pickle せず、ワーカーごとの共有メモリ(multiprocessing.shared_memory)へ
+  コピーして受け渡す（パイプで送るのは形状・設定などの小さなメッセージのみ）
+- 検出ログはワーカーでは書かず、呼び出し側（APIプロセス）でまとめて書く
+"""
+
+import logging
+import multiprocessing as mp
+import queue
+import threading
+import time
+import traceback
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    既存の共有メモリに接続（ワーカー側）
+    作成・削除は親プロセスが管理するため、ワーカー側ではresource_trackerの管理対象にしない
+    （3.12以前はspawnした子プロセスが親のresource_trackerを共有するため、登録は重複しても無害）
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # Python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(
+    conn,
+    detector_kwargs: Dict[str, Any],
+    warmup_resolutions: List[Tuple[int, int]],
+    warmup_runs: int
+) -> None:
+    """
+    ワーカープロセス本体
+    メッセージ: (共有メモリ名, shape, dtype, mode, config, filename, ground_truth, prior_bbox)
+    起動完了: ("ready", {"available_modes": 使用できる検出モード, "yolo_backend": YOLOの推論バックエンド})
+    応答: ("ok", DetectionResult) / ("error", (例外クラス名, メッセージ, トレースバック))
+    （例外オブジェクトはpickleできない状態を持つ場合があるため文字列で返す）
+    """
+    # spawnで起動するため、ここで検出器関連をimportする
+    from detector import BentoBoxDetector
+    from log_sink import create_log_sink
+
+    logging.basicConfig(level=logging.INFO)
+    detector = BentoBoxDetector(**detector_kwargs, log_sink=create_log_sink("none", "."))
+    if warmup_resolutions:
+        try:
+            detector.warm_up(warmup_resolutions, runs=warmup_runs)
+        except Exception as e:
+            logger.error(f"ワーカーのウォームアップエラー: {e}")
+    conn.send(("ready", {"available_modes": detector.available_modes(), "yolo_backend": detector.yolo_backend}))
+
+    attached: Dict[str, shared_memory.SharedMemory] = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        shm_name, shape, dtype, mode, config, filename, ground_truth, prior_bbox = message
+        try:
+            if shm_name not in attached:
+                # バッファが作り直された場合は古い接続を閉じる
+                for old in attached.values():
+                    old.close()
+                attached = {shm_name: _attach_shared_memory(shm_name)}
+            image = np.ndarray(shape, dtype=dtype, buffer=attached[shm_name].buf)
+            result = detector.detect_array(
+                image, mode=mode, ground_truth=ground_truth, filename=filename,
+                config=config, prior_bbox=prior_bbox
+            )
+            conn.send(("ok", result))
+        except Exception as e:
+            conn.send(("error", (type(e).__name__, str(e), traceback.format_exc())))
+
+    for shm in attached.values():
+        shm.close()
+
+
+class _Worker:
+    """ワーカープロセス1つ分（プロセス・パイプ・共有メモリ）"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.shm: Optional[shared_memory.SharedMemory] = None
+
+    def ensure_buffer(self, nbytes: int) -> shared_memory.SharedMemory:
+        """フレームが収まる共有メモリを確保（足りなければ作り直す）"""
+        if self.shm is None or self.shm.size < nbytes:
+            self.release_buffer()
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        return self.shm
+
+    def release_buffer(self) -> None:
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+
+class DetectorWorkerPool:
+    """検出ワーカープロセスのプール"""
+
+    def __init__(
+        self,
+        num_workers: int,
+        detector_kwargs: Dict[str, Any],
+        warmup_resolutions: Optional[List[Tuple[int, int]]] = None,
+        warmup_runs: int = 3,
+        start_timeout: float = 300.0,
+        acquire_timeout: float = 30.0,
+        request_timeout: float = 60.0
+    ):
+        """
+        初期化（ワーカープロセスを起動する）
+
+        Args:
+            num_workers: ワーカープロセス数
+            detector_kwargs: 各ワーカーの BentoBoxDetector に渡す引数（log_sinkを除く）
+            warmup_resolutions: 起動時にウォームアップする解像度（省略時はウォームアップしない）
+            warmup_runs: ウォームアップの実行回数
+            start_timeout: ワーカー起動（モデル読み込み・ウォームアップ）の待ち時間上限(秒)
+            acquire_timeout: 空きワーカーを待つ時間の既定の上限(秒)
+            request_timeout: 1回の検出の応答を待つ時間の上限(秒)。超えたワーカーは停止して再起動する
+        """
+        self.num_workers = max(1, num_workers)
+        self.detector_kwargs = detector_kwargs
+        self.warmup_resolutions = warmup_resolutions or []
+        self.warmup_runs = warmup_runs
+        self.start_timeout = start_timeout
+        self.acquire_timeout = acquire_timeout
+        self.request_timeout = request_timeout
+
+        # torch等を安全に扱うためforkではなくspawnで起動
+        self._context = mp.get_context("spawn")
+        self._workers = [_Worker(i) for i in range(self.num_workers)]
+        self._idle: "queue.Queue[int]" = queue.Queue()
+        self._ready = threading.Event()
+        self._closed = False
+        self.detector_info: Dict[str, Any] = {}
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0, "restarts": 0}
+        self._stats_lock = threading.Lock()
+
+        for worker in self._workers:
+            self._spawn(worker)
+        threading.Thread(target=self._wait_started, name="detector-pool-start", daemon=True).start()
+
+    def _spawn(self, worker: _Worker) -> None:
+        """ワーカープロセスを起動"""
+        parent_conn, child_conn = self._context.Pipe()
+        worker.conn = parent_conn
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.detector_kwargs, self.warmup_resolutions, self.warmup_runs),
+            name=f"detector-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+
+    def _wait_started(self) -> None:
+        """全ワーカーの起動完了を待って受付を開始"""
+        for worker in self._workers:
+            if self._wait_worker_ready(worker):
+                self._idle.put(worker.index)
+        self._ready.set()
+        logger.info(f"検出ワーカープール起動完了: {self._idle.qsize()}/{self.num_workers}プロセス")
+
+    def _wait_worker_ready(self, worker: _Worker) -> bool:
+        """ワーカー1つの起動完了メッセージを待つ"""
+        try:
+            if worker.conn.poll(self.start_timeout):
+                status, info = worker.conn.recv()
+                if status == "ready":
+                    # ワーカーは同じ引数で検出器を生成するため、使用できるモード・バックエンドも同じ
+                    self.detector_info = info
+                    return True
+                return False
+        except (EOFError, OSError):
+            pass
+        logger.error(f"検出ワーカー{worker.index}の起動に失敗しました")
+        return False
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """全ワーカーの起動完了を待つ"""
+        return self._ready.wait(timeout)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    @property
+    def idle_workers(self) -> int:
+        return self._idle.qsize()
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def detect(
+        self,
+        image: np.ndarray,
+        mode: str = "hybrid",
+        config=None,
+        filename: str = "image.jpg",
+        ground_truth: Optional[Dict[str, float]] = None,
+        timeout: Optional[float] = None,
+        prior_bbox: Optional[List[int]] = None
+    ):
+        """
+        空いているワーカーで検出（空きが出るまでブロック）
+
+        Args:
+            image: デコード済み画像(BGR)
+            mode: 検出モード
+            config: 検出設定 DetectionConfig（省略時はワーカーの既定の設定）
+            filename: 結果に記録するファイル名
+            ground_truth: 正解データ（誤差計算用）
+            timeout: 空きワーカーを待つ時間上限(秒、省略時は acquire_timeout)
+            prior_bbox: 前フレームの [x, y, w, h]（opencvモードのトラッキング用）
+
+        Returns:
+            DetectionResult
+
+        Raises:
+            TimeoutError: 空きワーカーがない、またはワーカーが request_timeout 以内に応答しない
+            RuntimeError: ワーカーが異常終了した、または検出中に例外が発生した
+        """
+        if self._closed:
+            raise RuntimeError("検出ワーカープールは停止しています")
+
+        try:
+            index = self._idle.get(timeout=timeout if timeout is not None else self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError("空いている検出ワーカーがありません")
+
+        worker = self._workers[index]
+        self._count("requests")
+        healthy = True
+        try:
+            image = np.ascontiguousarray(image)
+            shm = worker.ensure_buffer(image.nbytes)
+            np.copyto(np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf), image)
+
+            worker.conn.send((
+                shm.name, image.shape, image.dtype.str, mode, config, filename, ground_truth, prior_bbox
+            ))
+            # ハング（デッドロック・メモリ逼迫など）したワーカーでスレッドを占有し続けないよう応答待ちに上限を設ける
+            if not worker.conn.poll(self.request_timeout):
+                healthy = False
+                self._count("timeouts")
+                raise TimeoutError(f"検出ワーカー{index}が{self.request_timeout:g}秒以内に応答しません")
+            status, payload = worker.conn.recv()
+        except TimeoutError:
+            raise
+        except (EOFError, OSError, BrokenPipeError) as e:
+            healthy = False
+            self._count("errors")
+            raise RuntimeError(f"検出ワーカー{index}が応答しません: {e}")
+        finally:
+            if healthy:
+                self._idle.put(index)
+            else:
+                threading.Thread(target=self._restart, args=(worker,), daemon=True).start()
+
+        if status == "error":
+            self._count("errors")
+            error_type, message, worker_traceback = payload
+            logger.error(f"検出ワーカー{index}で例外が発生しました:\n{worker_traceback}")
+            raise RuntimeError(f"{error_type}: {message}")
+        return payload
+
+    def _restart(self, worker: _Worker) -> None:
+        """異常終了・応答しないワーカーを停止し、再起動して受付に戻す"""
+        if self._closed:
+            return
+        logger.warning(f"検出ワーカー{worker.index}を再起動します")
+        self._count("restarts")
+        if worker.process is not None and worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(5.0)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+        worker.conn.close()
+        worker.release_buffer()
+        self._spawn(worker)
+        if self._wait_worker_ready(worker):
+            self._idle.put(worker.index)
+
+    def close(self, timeout: float = 10.0) -> None:
+        """全ワーカーを停止して共有メモリを解放"""
+        if self._closed:
+            return
+        self._closed = True
+        deadline = time.time() + timeout
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+        for worker in self._workers:
+            worker.process.join(max(0.0, deadline - time.time()))
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.release_buffer()
+        logger.info("検出ワーカープールを停止しました")
@@ -104,6 +104,7 @@ type DetectionResult = {
   success: boolean;
   brightness: number;
   angle: number;
+  tilt_deg?: number | null;
   message: string;
   // 追加: 位置情報（バックエンドから返される）
   position_info?: {
@@ -421,43 +422,40 @@ const PackingGuideScreen: React.FC<Props> = ({ navigation, route }) => {
     const targetUri = imageUri || capturedImage;
     
     try {
-      // 画像をBase64に変換
-      const base64Image = await FileSystem.readAsStringAsync(targetUri!, {
-        encoding: FileSystem.EncodingType.Base64,
-      });
-      
-      // FastAPIの動的サイズ対応エンドポイントを呼び出し
-      const endpoint = selectedBento ? '/detect/base64' : '/detect/base64';
-      const requestBody: any = {
-        image_base64: base64Image,
+      // 検出オプションはクエリパラメータで指定
+      const params: Record<string, string> = {
         filename: `bento_${Date.now()}.jpg`,
         mode: 'hybrid',
-        confidence_threshold: 0.5,
+        confidence_threshold: '0.5',
       };
 
       // 選択された弁当のサイズ情報を追加
       if (selectedBento && selectedBento.width && selectedBento.length) {
-        requestBody.bento_width_mm = parseFloat(selectedBento.width) * 10; // cm→mm変換
-        requestBody.bento_height_mm = parseFloat(selectedBento.length) * 10; // cm→mm変換
+        params.bento_width_mm = String(parseFloat(selectedBento.width) * 10); // cm→mm変換
+        params.bento_height_mm = String(parseFloat(selectedBento.length) * 10); // cm→mm変換
         console.log('📏 選択弁当サイズ:', {
-          width: requestBody.bento_width_mm,
-          height: requestBody.bento_height_mm
+          width: params.bento_width_mm,
+          height: params.bento_height_mm
         });
       }
-      
-      const response = await fetch(`${AI_DETECTION_API_URL}${endpoint}`, {
-        method: 'POST',
+      const query = Object.entries(params)
+        .map(([key, value]) => `${key}=${encodeURIComponent(value)}`)
+        .join('&');
+
+      // 画像ファイルをバイナリのまま送信（Base64化によるサイズ増加・JSON解析を避ける）
+      const response = await FileSystem.uploadAsync(`${AI_DETECTION_API_URL}/detect/raw?${query}`, targetUri!, {
+        httpMethod: 'POST',
+        uploadType: FileSystem.FileSystemUploadType.BINARY_CONTENT,
         headers: {
-          'Content-Type': 'application/json',
+          'Content-Type': 'application/octet-stream',
         },
-        body: JSON.stringify(requestBody),
       });
 
-      if (!response.ok) {
+      if (response.status < 200 || response.status >= 300) {
         throw new Error(`API Error: ${response.status}`);
       }
 
-      const data: DetectionResult = await response.json();
+      const data: DetectionResult = JSON.parse(response.body);
       console.log('🔍 検出結果:', JSON.stringify(data, null, 2));
       
       // 画像をトリミング（検出成功/失敗に関わらず、常に黄色い枠を基準にする）